@@ -0,0 +1,134 @@
+"""Pool of headless Blender workers draining the bvtk-bridge inbox.
+
+Each worker runs ``bvtk-json-autoload.py`` in batch mode (``blender -b``):
+it claims plans from the inbox, builds the BVTK node tree without a UI,
+updates the VTK pipeline and renders ``processed/<id>.png``. Workers are
+restarted when they exit; Ctrl-C / SIGTERM stops them and their unfinished
+claims go back to the inbox.
+
+With ``--frames PLAN --range START:END[:STEP]`` the workers instead render
+an animation of the numbered series the plan's readers point at, each taking
+every N-th frame, into ``processed/<plan id>-frames/frame_<n>.png``.
+
+Usage::
+
+    python docker-version/bvtk-batch-render.py --workers 4
+    python docker-version/bvtk-batch-render.py --workers 2 --blender /opt/blender/blender --once
+    python docker-version/bvtk-batch-render.py --workers 4 --frames bvtk-bridge/processed/test.json --range 0:99
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+
+AUTOLOAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bvtk-json-autoload.py")
+
+
+def worker_command(blender: str, addons: str, once: bool, poll: float, frames=None):
+    cmd = [blender, "-b", "--factory-startup"]
+    if addons:
+        cmd += ["--addons", addons]
+    cmd += ["--python-exit-code", "1", "--python", AUTOLOAD, "--"]
+    if frames is not None:
+        plan, start, end, step, output = frames
+        cmd += ["--frames", plan, "--start", str(start), "--end", str(end), "--step", str(step)]
+        if output:
+            cmd += ["--output", output]
+        return cmd
+    cmd += ["--batch", "--poll", str(poll)]
+    if once:
+        cmd.append("--once")
+    return cmd
+
+
+def parse_range(text: str):
+    parts = [int(p) for p in text.split(":")]
+    if len(parts) not in (2, 3):
+        raise argparse.ArgumentTypeError("expected START:END or START:END:STEP")
+    return parts[0], parts[1], parts[2] if len(parts) == 3 else 1
+
+
+def worker_env(slot: int, workers: int) -> dict:
+    env = dict(os.environ)
+    # A fixed id per slot lets a restarted worker take back its own claims
+    env["BVTK_WORKER_ID"] = f"{socket.gethostname()}-batch-{slot}"
+    # Only the interactive Blender serves the socket bridge
+    env["BVTK_BRIDGE_ADDR"] = ""
+    env.setdefault("BVTK_RENDER_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+    return env
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Blender executable")
+    parser.add_argument("--addons", default="BVtkNodes", help="Comma separated add-ons to enable in the workers")
+    parser.add_argument("--once", action="store_true", help="Stop each worker once the inbox is empty")
+    parser.add_argument("--poll", type=float, default=0.5, help="Seconds between inbox scans when idle")
+    parser.add_argument("--frames", metavar="PLAN", help="Render an animation of the plan's numbered series instead")
+    parser.add_argument("--range", type=parse_range, default=(0, 0, 1), help="Frames START:END[:STEP] (inclusive)")
+    parser.add_argument("--output", default="", help="Directory for frame images")
+    args = parser.parse_args(argv)
+
+    def command(slot: int):
+        if not args.frames:
+            return worker_command(args.blender, args.addons, args.once, args.poll)
+        start, end, step = args.range
+        # Interleave so every worker moves forward through the series (prefetch follows the stride)
+        frames = (os.path.abspath(args.frames), start + slot * step, end, step * args.workers, args.output)
+        return worker_command(args.blender, args.addons, True, args.poll, frames)
+
+    once = args.once or bool(args.frames)
+    procs, started, failures = {}, {}, {}
+
+    def spawn(slot: int):
+        procs[slot] = subprocess.Popen(command(slot), env=worker_env(slot, args.workers))
+        started[slot] = time.monotonic()
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    for slot in range(args.workers):
+        spawn(slot)
+    print(f"[bvtk-batch] {args.workers} workers: {' '.join(command(0))}")
+    try:
+        while procs:
+            time.sleep(1.0)
+            for slot, proc in list(procs.items()):
+                code = proc.poll()
+                if code is None:
+                    continue
+                if (once and code == 0) or args.frames:
+                    # A frame range is not retried: a failing frame would fail again
+                    if code:
+                        print(f"[bvtk-batch] worker {slot} exited with {code}", file=sys.stderr)
+                    del procs[slot]
+                    continue
+                # Back off when a worker keeps dying right after start (missing add-on, bad binary)
+                failures[slot] = failures.get(slot, 0) + 1 if time.monotonic() - started[slot] < 10 else 0
+                delay = min(60, 2 ** failures[slot]) if failures[slot] else 0
+                print(f"[bvtk-batch] worker {slot} exited with {code}; restarting in {delay}s", file=sys.stderr)
+                time.sleep(delay)
+                spawn(slot)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in procs.values():
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in procs.values():
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
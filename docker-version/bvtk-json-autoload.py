@@ -4,16 +4,31 @@ bl_info = {
     "version": (2, 0, 0),
     "blender": (4, 0, 0),
     "location": "Node Editor",
-    "description": "Auto-import BVTKNodes JSON files from an inbox directory",
+    "description": "Auto-import BVTKNodes JSON and Blender actions plans from an inbox directory",
     "category": "System",
 }
 
 
+import bmesh
 import bpy
+import hashlib
+import hmac
+import json
+import math
 import os
+import queue
+import re
 import shutil
+import socket
+import struct
+import sys
+import threading
+import time
 import traceback
+import uuid
+from collections import OrderedDict
 from bpy.app.handlers import persistent
+from mathutils import Vector
 
 # PROJECT_ROOT = "/app/connect"
 PROJECT_ROOT = os.path.expanduser(
@@ -22,48 +37,1262 @@ PROJECT_ROOT = os.path.expanduser(
 INBOX = os.path.join(PROJECT_ROOT, "inbox/")
 PROCESSED = os.path.join(PROJECT_ROOT, "processed/")
 FAILED = os.path.join(PROJECT_ROOT, "failed/")
+# Priority lanes inbox/high|normal|bulk, drained by lane then age; files put
+# directly in inbox/ count as "normal"
+LANES = ("high", "normal", "bulk")
+# <plan id>.json import status records, read back by the pipes
+STATUS = os.path.join(PROJECT_ROOT, "status/")
+# connect/ holds the shared `schemas` package (plan patches)
+CONNECT_ROOT = os.path.dirname(os.path.normpath(PROJECT_ROOT))
+# Several Blender processes (or machines on shared storage) may drain the same
+# inbox: each claims a file by renaming it into its own inbox/.claimed-<worker>/
+# and keeps a .lease there fresh; claims of a worker whose lease is older than
+# LEASE_TIMEOUT go back to the inbox.
+WORKER_ID = os.environ.get("BVTK_WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+CLAIM_PREFIX = ".claimed-"
+CLAIMS = os.path.join(INBOX, CLAIM_PREFIX + WORKER_ID)
+LEASE_TIMEOUT = float(os.environ.get("BVTK_LEASE_TIMEOUT", "120"))
+# Last node tree this worker applied; base for incoming patches
+LAST_PLAN = os.path.join(PROCESSED, f".last_plan-{WORKER_ID}.json")
+# Socket bridge next to the inbox: "host:port" or "unix:/path", "" disables it.
+# Plans can run Python (BVTK custom_code) and import arbitrary files, so every
+# frame must carry BRIDGE_TOKEN; without a token the bridge stays off. Only
+# with a token set, use 0.0.0.0:8766 when Open-WebUI runs in Docker
+# (host.docker.internal:8766).
+BRIDGE_ADDR = os.environ.get("BVTK_BRIDGE_ADDR", "127.0.0.1:8766")
+BRIDGE_TOKEN = os.environ.get("BVTK_BRIDGE_TOKEN", "")
+BRIDGE_MAX_FRAME = 64 << 20
+# Seconds a client waits for its ack before getting "pending" (Blender busy or not draining)
+BRIDGE_ACK_TIMEOUT = float(os.environ.get("BVTK_BRIDGE_ACK_TIMEOUT", "120"))
+# Headless batch mode (blender -b --python bvtk-json-autoload.py -- --batch):
+# node trees are built through the data API and a preview is rendered to
+# processed/<id>.png. See bvtk-batch-render.py for the worker pool.
+RENDER_PREVIEWS = os.environ.get("BVTK_RENDER_PREVIEWS", "1") != "0"
+RENDER_ENGINE = os.environ.get("BVTK_RENDER_ENGINE", "CYCLES")
+RENDER_SIZE = os.environ.get("BVTK_RENDER_SIZE", "640x480")
+RENDER_SAMPLES = int(os.environ.get("BVTK_RENDER_SAMPLES", "16"))
+RENDER_THREADS = int(os.environ.get("BVTK_RENDER_THREADS", "0"))
+# Parsed reader outputs shared across imports, keyed by file path/mtime and
+# reader settings; 0 disables the cache
+READER_CACHE_MB = float(os.environ.get("BVTK_READER_CACHE_MB", "1024"))
+CACHED_READERS = (
+    "vtkPolyDataReader", "vtkUnstructuredGridReader", "vtkStructuredGridReader",
+    "vtkStructuredPointsReader", "vtkRectilinearGridReader", "vtkDataSetReader",
+    "vtkXMLPolyDataReader", "vtkXMLUnstructuredGridReader", "vtkXMLImageDataReader",
+    "vtkXMLStructuredGridReader", "vtkXMLRectilinearGridReader",
+    "vtkSTLReader", "vtkPLYReader", "vtkOBJReader",
+)
+# Hidden node-group templates ("." names, fake user) keyed by topology: a plan
+# with a known topology clones its template and only sets changed properties.
+# At most TEMPLATE_CACHE templates are kept (least recently used dropped).
+# Headless mode only, where trees are built through the data API anyway; the
+# GUI keeps importing through BVTK's own operator.
+TEMPLATE_PREFIX = ".bvtk-template-"
+TEMPLATE_CACHE = int(os.environ.get("BVTK_TEMPLATE_CACHE", "32"))
+# Frames of a numbered series (particle_000000000000000.vtk, ...) read ahead
+# into the reader cache, with the stride the timeline is moving at
+PREFETCH_FRAMES = int(os.environ.get("BVTK_PREFETCH_FRAMES", "4"))
+_SERIES_RE = re.compile(r"^(.*?)(\d+)(\.[^.]+)$")
+# Plans found together in the inbox are imported in one pass of up to
+# BATCH_MAX files: node updates, the view-layer evaluation and the undo push run
+# once at the end, and of consecutive full node trees only the last is
+# imported. 1 imports them one by one.
+BATCH_MAX = int(os.environ.get("BVTK_BATCH_MAX", "32"))
 
 
 def ensure_dirs():
-    for d in (INBOX, PROCESSED, FAILED):
+    for d in (INBOX, PROCESSED, FAILED, STATUS):
         os.makedirs(d, exist_ok=True)
+    for lane in LANES:
+        os.makedirs(os.path.join(INBOX, lane), exist_ok=True)
+
+
+def _plan_patch():
+    if CONNECT_ROOT not in sys.path:
+        sys.path.append(CONNECT_ROOT)
+    try:
+        from schemas import plan_patch
+    except ImportError:
+        return None
+    return plan_patch
 
 
-def _import_bvtk_json(path: str) -> None:
+def _node_editor():
     # Require a Node Editor area to be available
     win = bpy.context.window
     if not win:
         raise RuntimeError("No active window context available")
-    area = None
-    region = None
     for a in win.screen.areas:
         if a.type == "NODE_EDITOR":
-            area = a
             region = next((r for r in a.regions if r.type == "WINDOW"), None)
-            break
-    if area is None or region is None:
-        raise RuntimeError(
-            "No NODE_EDITOR area found. Open a Node Editor and try again."
+            if region is not None:
+                return win, a, region
+    raise RuntimeError(
+        "No NODE_EDITOR area found. Open a Node Editor and try again."
+    )
+
+
+def _load_last_plan():
+    try:
+        with open(LAST_PLAN, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_last_plan(plan: dict, tree_name: str) -> None:
+    tmp = LAST_PLAN + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"tree": tree_name, "plan": plan}, f)
+    os.replace(tmp, LAST_PLAN)
+
+
+def _ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+def _override() -> dict:
+    """temp_override() arguments for a Node Editor; nothing in background mode."""
+    if bpy.app.background:
+        return {}
+    win, area, region = _node_editor()
+    return {"window": win, "area": area, "region": region}
+
+
+# Collects deferred work while import_batch() runs, None otherwise
+_batch = None
+
+
+def _update_nodes(tree, names, override: dict) -> None:
+    if _batch is not None:
+        _batch["trees"].setdefault(tree.name, OrderedDict()).update(dict.fromkeys(names))
+        _batch["override"] = override
+        return
+    # Updating a sink pulls its upstream chain; untouched branches keep their VTK output
+    with bpy.context.temp_override(**override):
+        for name in names:
+            node_path = f"bpy.data.node_groups[{tree.name!r}].nodes[{name!r}]"
+            try:
+                bpy.ops.node.bvtk_node_update(node_path=node_path)
+            except Exception:
+                traceback.print_exc()
+
+
+def _evaluate(undo_message: str = "") -> None:
+    """Evaluate the view layer once and, with a UI, push one undo step (at the end of a batch if one runs)."""
+    if _batch is not None:
+        _batch["evaluate"] = True
+        if undo_message:
+            _batch["undo"].append(undo_message)
+        return
+    bpy.context.view_layer.update()
+    if undo_message and not bpy.app.background:
+        try:
+            bpy.ops.ed.undo_push(message=undo_message)
+        except RuntimeError:
+            traceback.print_exc()
+
+
+def _reset_scene() -> None:
+    """Drop the previous plan's objects and node trees (batch mode renders one plan per scene)."""
+    for ob in list(bpy.data.objects):
+        bpy.data.objects.remove(ob, do_unlink=True)
+    for datablocks in (bpy.data.meshes, bpy.data.cameras, bpy.data.lights, bpy.data.textures):
+        for block in list(datablocks):
+            if block.users == 0:
+                datablocks.remove(block)
+    for tree in list(bpy.data.node_groups):
+        if tree.bl_idname == "BVTK_NodeTreeType" and not tree.name.startswith(TEMPLATE_PREFIX):
+            bpy.data.node_groups.remove(tree)
+
+
+def _build_tree(data: dict, name: str = "NodeTree"):
+    """Create a BVTK node tree from ``{nodes, links}`` without any UI context."""
+    tree = bpy.data.node_groups.new(name, "BVTK_NodeTreeType")
+    for spec in data.get("nodes") or []:
+        node = tree.nodes.new(spec["bl_idname"])
+        node.name = spec["name"]
+        _set_props(node, spec)
+    for link in data.get("links") or []:
+        tree.links.new(
+            _socket(tree.nodes[link["from_node_name"]].outputs, link["from_socket_identifier"]),
+            _socket(tree.nodes[link["to_node_name"]].inputs, link["to_socket_identifier"]),
         )
+    return tree
 
-    with bpy.context.temp_override(window=win, area=area, region=region):
-        bpy.ops.node.bvtk_node_tree_import(filepath=path, confirm=True)
 
+def topology_signature(data: dict) -> str:
+    """Hash of the node names/types and links of a plan, ignoring property values."""
+    nodes = sorted((n["name"], n["bl_idname"]) for n in data.get("nodes") or [])
+    links = sorted((l["from_node_name"], l["from_socket_identifier"], l["to_node_name"], l["to_socket_identifier"])
+                   for l in data.get("links") or [])
+    return hashlib.sha1(json.dumps([nodes, links]).encode("utf-8")).hexdigest()[:16]
 
-def scan_once(path: str) -> float:
-    ensure_dirs()
+
+def _find_template(data: dict):
+    if TEMPLATE_CACHE <= 0:
+        return None
+    template = bpy.data.node_groups.get(TEMPLATE_PREFIX + topology_signature(data))
+    if template is not None:
+        template["bvtk_last_used"] = time.time()
+    return template
+
+
+def _store_template(tree, data: dict) -> None:
+    """Keep a hidden copy of a freshly imported tree for the next plan with the same topology."""
+    if TEMPLATE_CACHE <= 0:
+        return
+    template = tree.copy()
+    template.name = TEMPLATE_PREFIX + topology_signature(data)
+    template.use_fake_user = True
+    template["bvtk_plan"] = json.dumps({n["name"]: n for n in data.get("nodes") or []})
+    template["bvtk_last_used"] = time.time()
+    templates = sorted((t for t in bpy.data.node_groups if t.name.startswith(TEMPLATE_PREFIX)),
+                       key=lambda t: t.get("bvtk_last_used", 0.0))
+    for old in templates[:max(0, len(templates) - TEMPLATE_CACHE)]:
+        bpy.data.node_groups.remove(old)
+
+
+def _instantiate_template(template, data: dict, name: str):
+    """Clone ``template`` and set only the properties that differ from the plan it was built from."""
+    tree = template.copy()
+    tree.use_fake_user = False
+    for key in ("bvtk_plan", "bvtk_last_used"):
+        if key in tree:
+            del tree[key]
+    tree.name = name
+    base = json.loads(template.get("bvtk_plan", "{}"))
     try:
-        for name in list(os.listdir(path)):
-            src = os.path.join(path, name)
-            if not name.lower().endswith(".json"):
-                shutil.move(src, os.path.join(FAILED, name))
-                continue
+        for spec in data.get("nodes") or []:
+            before = base.get(spec["name"], {})
+            node = tree.nodes[spec["name"]]
+            changed = {k: v for k, v in spec.items() if before.get(k) != v}
+            if changed:
+                _set_props(node, changed)
+            for key in before.keys() - spec.keys():
+                # Set in the template's plan, left out of this one: back to the default
+                try:
+                    node.property_unset(key)
+                except (AttributeError, TypeError) as e:
+                    print(f"[bvtk-autoload] {node.name}.{key}: {e}")
+    except KeyError:
+        # The template no longer matches (renamed nodes): rebuild it next time
+        bpy.data.node_groups.remove(tree)
+        bpy.data.node_groups.remove(template)
+        return None
+    return tree
+
+
+def _tree_from_plan(data: dict, name: str = "NodeTree"):
+    """``(tree, template hit)``: a clone of the matching template, else a tree built through the data API."""
+    template = _find_template(data)
+    tree = _instantiate_template(template, data, name) if template is not None else None
+    if tree is not None:
+        return tree, True
+    tree = _build_tree(data, name)
+    _store_template(tree, data)
+    return tree, False
+
+
+def _sink_names(data: dict) -> list:
+    feeding = {link["from_node_name"] for link in data.get("links") or []}
+    return [n["name"] for n in data.get("nodes") or [] if n["name"] not in feeding]
+
+
+def _import_bvtk_json(path: str, data=None, info=None) -> None:
+    info = {} if info is None else info
+    if isinstance(data, dict):
+        info.update(kind="node_tree", nodes=len(data.get("nodes") or []), links=len(data.get("links") or []))
+    timings = info.setdefault("timings", {})
+    started = time.perf_counter()
+    if bpy.app.background:
+        if not isinstance(data, dict) or not isinstance(data.get("nodes"), list):
+            raise ValueError("Headless mode imports BVTK node trees ({nodes, links}) only")
+        _reset_scene()
+        tree, hit = _tree_from_plan(data)
+        info["template"] = "hit" if hit else "miss"
+        timings["import_ms"] = _ms(started)
+        started = time.perf_counter()
+        _update_nodes(tree, _sink_names(data), {})
+        timings["update_ms"] = _ms(started)
+    else:
+        override = _override()
+        with bpy.context.temp_override(**override):
+            bpy.ops.node.bvtk_node_tree_import(filepath=path, confirm=True)
+        timings["import_ms"] = _ms(started)
+        tree = override["area"].spaces.active.node_tree
+    pp = _plan_patch()
+    if pp is not None and pp.is_node_tree(data):
+        _save_last_plan(data, tree.name if tree else "")
+
+
+def _set_props(node, values: dict) -> None:
+    for key, value in values.items():
+        if key in ("bl_idname", "name"):
+            continue
+        try:
+            setattr(node, key, value)
+        except (AttributeError, TypeError, ValueError) as e:
+            print(f"[bvtk-autoload] {node.name}.{key}: {e}")
+
+
+def _socket(sockets, identifier: str):
+    for sock in sockets:
+        if sock.identifier == identifier:
+            return sock
+    raise KeyError(f"no socket {identifier!r}")
+
+
+def _find_link(tree, spec: dict):
+    for link in tree.links:
+        if (link.from_node.name == spec["from_node_name"]
+                and link.from_socket.identifier == spec["from_socket_identifier"]
+                and link.to_node.name == spec["to_node_name"]
+                and link.to_socket.identifier == spec["to_socket_identifier"]):
+            return link
+    return None
+
+
+def _apply_bvtk_patch(patch: dict, pp, info=None) -> None:
+    """Apply a plan patch to the live node tree and re-run only the affected nodes."""
+    info = {} if info is None else info
+    timings = info.setdefault("timings", {})
+    info.update(kind="patch", ops=len(patch.get("ops") or []))
+    last = _load_last_plan()
+    if last is None or (patch.get("base") and pp.plan_hash(last["plan"]) != patch["base"]):
+        # Another worker (or a restart) holds the base: the sender resends the full tree
+        info["needs_full"] = True
+    if last is None:
+        raise RuntimeError("No node tree imported yet; a full tree is needed before patches")
+    new_plan = pp.apply(last["plan"], patch)  # raises if the base hash does not match
+    info.update(nodes=len(new_plan["nodes"]), links=len(new_plan["links"]))
+
+    started = time.perf_counter()
+    override = _override()
+    tree = bpy.data.node_groups.get(last.get("tree") or "")
+    if tree is None and override:
+        tree = override["area"].spaces.active.node_tree
+    if tree is None:
+        raise RuntimeError(f"Node tree {last.get('tree')!r} not found")
+    for op in patch["ops"]:
+        kind = op["op"]
+        if kind == "remove_link":
+            link = _find_link(tree, op["link"])
+            if link is not None:
+                tree.links.remove(link)
+        elif kind == "remove_node":
+            node = tree.nodes.get(op["name"])
+            if node is not None:
+                tree.nodes.remove(node)
+        elif kind == "add_node":
+            node = tree.nodes.new(op["node"]["bl_idname"])
+            node.name = op["node"]["name"]
+            _set_props(node, op["node"])
+        elif kind == "update_node":
+            node = tree.nodes[op["name"]]
+            _set_props(node, op.get("set") or {})
+            for key in op.get("unset") or []:
+                try:
+                    node.property_unset(key)
+                except (AttributeError, TypeError):
+                    pass
+        else:
+            link = op["link"]
+            tree.links.new(
+                _socket(tree.nodes[link["from_node_name"]].outputs, link["from_socket_identifier"]),
+                _socket(tree.nodes[link["to_node_name"]].inputs, link["to_socket_identifier"]),
+            )
+    _save_last_plan(new_plan, tree.name)
+    timings["import_ms"] = _ms(started)
+
+    # Updating a sink pulls its upstream chain; untouched branches keep their VTK output
+    started = time.perf_counter()
+    info["updated"] = pp.sinks(new_plan, pp.affected_nodes(new_plan, patch))
+    _update_nodes(tree, info["updated"], override)
+    timings["update_ms"] = _ms(started)
+
+
+def _primitive_mesh(name: str, primitive: str):
+    """Mesh of a primitive built with bmesh, same size as the ``primitive_*_add`` defaults."""
+    bm = bmesh.new()
+    try:
+        if primitive == "CUBE":
+            bmesh.ops.create_cube(bm, size=2.0, calc_uvs=True)
+        elif primitive == "PLANE":
+            bmesh.ops.create_grid(bm, x_segments=1, y_segments=1, size=1.0, calc_uvs=True)
+        elif primitive == "UV_SPHERE":
+            bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, radius=1.0, calc_uvs=True)
+        else:
+            raise ValueError(f"Unsupported primitive {primitive!r}")
+        mesh = bpy.data.meshes.new(name)
+        bm.to_mesh(mesh)
+    finally:
+        bm.free()
+    return mesh
+
+
+_IMPORTERS = {
+    "OBJ": lambda path: bpy.ops.wm.obj_import(filepath=path),
+    "FBX": lambda path: bpy.ops.import_scene.fbx(filepath=path),
+    "GLTF": lambda path: bpy.ops.import_scene.gltf(filepath=path),
+    "GLB": lambda path: bpy.ops.import_scene.gltf(filepath=path),
+}
+
+
+def _run_actions(data: dict, info=None) -> None:
+    """Execute an actions plan (``schemas.blender_actions``) through ``bpy.data``/``bmesh``.
+
+    Nothing is evaluated until the whole plan has run: the view layer is
+    updated once and, with a UI, one undo step is pushed. If an action fails,
+    the datablocks created by the earlier ones are removed again.
+    """
+    info = {} if info is None else info
+    timings = info.setdefault("timings", {})
+    actions = data.get("actions") or []
+    info.update(kind="actions", actions=len(actions))
+    started = time.perf_counter()
+    if bpy.app.background:
+        _reset_scene()
+    scene = bpy.context.scene
+    # Plan names -> datablocks; Blender may have suffixed the real names (.001)
+    objects, textures = {}, {}
+    created = []
+
+    def _object(name):
+        ob = objects.get(name) or bpy.data.objects.get(name)
+        if ob is None:
+            raise KeyError(f"No object {name!r}")
+        return ob
+
+    try:
+        for action in actions:
+            kind = action.get("type")
+            if kind == "create_object":
+                name = action.get("name") or action["primitive"].title()
+                mesh = _primitive_mesh(name, action["primitive"])
+                created.append((bpy.data.meshes, mesh))
+                ob = bpy.data.objects.new(name, mesh)
+                created.append((bpy.data.objects, ob))
+                for key in ("location", "rotation", "scale"):
+                    if action.get(key) is not None:
+                        setattr(ob, "rotation_euler" if key == "rotation" else key, action[key])
+                scene.collection.objects.link(ob)
+                objects[name] = ob
+            elif kind == "add_modifier":
+                ob = _object(action["object"])
+                mod = ob.modifiers.new(action["modifier"].title(), action["modifier"])
+                values = {}
+                if action.get("levels") is not None:
+                    values.update(levels=action["levels"], render_levels=action["levels"])
+                if action.get("strength") is not None:
+                    values["strength"] = action["strength"]
+                if action.get("texture"):
+                    values["texture"] = textures.get(action["texture"]) or bpy.data.textures.get(action["texture"])
+                    if values["texture"] is None:
+                        raise KeyError(f"No texture {action['texture']!r}")
+                _set_props(mod, values)
+            elif kind == "set_shade_smooth":
+                mesh = _object(action["object"]).data
+                mesh.polygons.foreach_set("use_smooth", [True] * len(mesh.polygons))
+            elif kind == "create_texture":
+                tex = bpy.data.textures.new(action["name"], action["kind"])
+                created.append((bpy.data.textures, tex))
+                _set_props(tex, action.get("params") or {})
+                textures[action["name"]] = tex
+            elif kind == "import_file":
+                # No data-API importers: these go through their operators
+                before = set(bpy.data.objects)
+                _IMPORTERS[action["kind"]](action["path"])
+                new = [ob for ob in bpy.data.objects if ob not in before]
+                created.extend((bpy.data.objects, ob) for ob in new)
+                objects.update((ob.name, ob) for ob in new)
+                if action.get("into_collection"):
+                    coll = bpy.data.collections.get(action["into_collection"])
+                    if coll is None:
+                        coll = bpy.data.collections.new(action["into_collection"])
+                        created.append((bpy.data.collections, coll))
+                        scene.collection.children.link(coll)
+                    for ob in new:
+                        for old in list(ob.users_collection):
+                            old.objects.unlink(ob)
+                        coll.objects.link(ob)
+            else:
+                raise ValueError(f"Unknown action type {kind!r}")
+    except Exception:
+        for datablocks, block in reversed(created):
+            try:
+                datablocks.remove(block)
+            except ReferenceError:
+                pass  # already freed with its owner
+        raise
+    info["objects"] = sorted(ob.name for ob in objects.values())
+    timings["import_ms"] = _ms(started)
+
+    started = time.perf_counter()
+    _evaluate(f"BVTK actions ({len(actions)})")
+    timings["update_ms"] = _ms(started)
+
+
+def _process(path: str, info=None, data=None) -> None:
+    """Import one plan file (``data``: its already parsed JSON); phase timings and counts are recorded in ``info``."""
+    info = {} if info is None else info
+    if data is None:
+        started = time.perf_counter()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        info.setdefault("timings", {})["read_ms"] = _ms(started)
+    pp = _plan_patch()
+    if isinstance(data, dict) and isinstance(data.get("actions"), list):
+        _run_actions(data, info)
+    elif isinstance(data, dict) and data.get("kind") == "bvtk_patch":
+        if pp is None:
+            raise RuntimeError(f"schemas.plan_patch not importable from {CONNECT_ROOT}")
+        _apply_bvtk_patch(data, pp, info)
+    else:
+        _import_bvtk_json(path, data, info)
+
+
+def _frame_camera(scene, objects) -> None:
+    corners = [ob.matrix_world @ Vector(c) for ob in objects for c in ob.bound_box]
+    lo = Vector([min(c[i] for c in corners) for i in range(3)])
+    hi = Vector([max(c[i] for c in corners) for i in range(3)])
+    center, radius = (lo + hi) / 2, max((hi - lo).length / 2, 1e-3)
+
+    cam = scene.camera
+    if cam is None:
+        cam = bpy.data.objects.new("PreviewCamera", bpy.data.cameras.new("PreviewCamera"))
+        scene.collection.objects.link(cam)
+        scene.camera = cam
+    distance = radius / math.sin(min(cam.data.angle_x, cam.data.angle_y) / 2) * 1.1
+    cam.location = center + Vector((1.0, -1.0, 0.8)).normalized() * distance
+    cam.rotation_euler = (center - cam.location).to_track_quat("-Z", "Y").to_euler()
+    cam.data.clip_start = max(distance - radius * 2, distance * 1e-3)
+    cam.data.clip_end = distance + radius * 2
+
+    if not any(ob.type == "LIGHT" for ob in scene.objects):
+        sun = bpy.data.objects.new("PreviewSun", bpy.data.lights.new("PreviewSun", "SUN"))
+        sun.rotation_euler = cam.rotation_euler
+        scene.collection.objects.link(sun)
+
+
+def _render_preview(path: str) -> None:
+    """Render the meshes produced by the current plan to ``path`` (PNG)."""
+    scene = bpy.context.scene
+    meshes = [ob for ob in scene.objects if ob.type == "MESH" and not ob.hide_render]
+    if not meshes:
+        raise RuntimeError("Nothing to render: the plan produced no mesh")
+    _frame_camera(scene, meshes)
+    render = scene.render
+    render.engine = RENDER_ENGINE
+    if RENDER_ENGINE == "CYCLES":
+        scene.cycles.samples = RENDER_SAMPLES
+        scene.cycles.device = "CPU"
+    if RENDER_THREADS:
+        render.threads_mode = "FIXED"
+        render.threads = RENDER_THREADS
+    render.resolution_x, render.resolution_y = (int(v) for v in RENDER_SIZE.lower().split("x"))
+    render.resolution_percentage = 100
+    render.image_settings.file_format = "PNG"
+    render.filepath = path
+    bpy.ops.render.render(write_still=True)
+
+
+def _write_status(record: dict) -> None:
+    os.makedirs(STATUS, exist_ok=True)
+    tmp = os.path.join(STATUS, f".{record['id']}.json.part")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    os.replace(tmp, os.path.join(STATUS, f"{record['id']}.json"))
+
+
+def _start_import(src: str, name: str, source: str, queue_ms=None, lane: str = "normal", data=None):
+    """Import ``src`` and return ``(record, dest)``; the file is left where it is."""
+    record = {"id": os.path.splitext(name)[0], "name": name, "source": source, "worker": WORKER_ID, "lane": lane,
+              "status": "processing", "ok": None, "started": time.time(), "timings": {}}
+    if queue_ms is not None:
+        record["timings"]["queue_ms"] = queue_ms
+    _write_status(record)
+    started = time.perf_counter()
+    info = {}
+    try:
+        _process(src, info, data)
+        record.update(ok=True, status="processed")
+        dest = os.path.join(PROCESSED, name)
+        if bpy.app.background and RENDER_PREVIEWS:
+            _write_status(dict(record, status="rendering", ok=None))
+            preview = os.path.join(PROCESSED, f"{record['id']}.png")
+            rendered = time.perf_counter()
+            try:
+                _render_preview(preview)
+                info["preview"] = preview
+            except Exception as e:
+                traceback.print_exc()
+                info["preview_error"] = f"{type(e).__name__}: {e}"
+            info.setdefault("timings", {})["render_ms"] = _ms(rendered)
+    except Exception as e:
+        traceback.print_exc()
+        record.update(ok=False, status="failed", error=f"{type(e).__name__}: {e}",
+                      traceback=traceback.format_exc())
+        dest = os.path.join(FAILED, name)
+    record["timings"].update(info.pop("timings", {}))
+    record["timings"]["total_ms"] = _ms(started)
+    record.update(info)
+    return record, dest
+
+
+def _finish_import(src: str, record: dict, dest: str) -> dict:
+    """File the plan under processed/ or failed/ and write its final status."""
+    if os.path.abspath(src) != os.path.abspath(dest):
+        shutil.move(src, dest)
+    record.update(path=dest, finished=time.time())
+    if _reader_cache is not None:
+        record["reader_cache"] = _reader_cache.stats()
+    _write_status(record)
+    return record
+
+
+def _run_import(src: str, name: str, source: str, queue_ms=None, lane: str = "normal") -> dict:
+    """Import ``src``, file it under processed/ or failed/ as ``name`` and record its status."""
+    record, dest = _start_import(src, name, source, queue_ms, lane)
+    return _finish_import(src, record, dest)
+
+
+def _flush_batch(pending: dict) -> None:
+    for tree_name, names in pending["trees"].items():
+        tree = bpy.data.node_groups.get(tree_name)
+        if tree is not None:
+            # A later plan in the batch may have replaced the tree: skip nodes that are gone
+            _update_nodes(tree, [n for n in names if n in tree.nodes], pending["override"])
+    if pending["evaluate"]:
+        undo = pending["undo"]
+        _evaluate(undo[0] if len(undo) == 1 else f"BVTK batch ({len(undo)} plans)" if undo else "")
+
+
+def _read_plan(path: str):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # _process reads it again and reports the error
+
+
+def _coalesce(plans: list) -> list:
+    """Group claimed plans into runs of ``(plan, parsed JSON)``.
+
+    Consecutive full node trees share a run (each full import replaces the
+    editor's node tree, so only one of them needs importing); any other plan
+    is a run of its own.
+    """
+    runs, previous_full = [], False
+    for plan in plans:
+        data = _read_plan(plan[0])
+        full = isinstance(data, dict) and isinstance(data.get("nodes"), list)
+        if full and previous_full:
+            runs[-1].append((plan, data))
+        else:
+            runs.append([(plan, data)])
+        previous_full = full
+    return runs
+
+
+def _supersede(src: str, name: str, source: str, by: str, queue_ms=None, lane: str = "normal") -> dict:
+    """File a plan that a later full node tree in the same batch replaces, without importing it."""
+    record = {"id": os.path.splitext(name)[0], "name": name, "source": source, "worker": WORKER_ID, "lane": lane,
+              "status": "superseded", "ok": True, "superseded_by": by, "started": time.time(), "timings": {}}
+    if queue_ms is not None:
+        record["timings"]["queue_ms"] = queue_ms
+    return _finish_import(src, record, os.path.join(PROCESSED, name))
+
+
+def import_batch(plans, source: str = "inbox") -> list:
+    """Import claimed ``(path, name, queue_ms, lane)`` plans in one pass.
+
+    Of consecutive full node trees the newest is imported first; only if it
+    fails is the next older one tried, and so on. Once one succeeds, the older
+    ones are filed as ``superseded`` by it; failed ones are filed as failed.
+    Every imported plan is judged on its own, but the node updates they ask
+    for (merged per tree), the view-layer evaluation and the undo push are
+    held back and run once after the last one; then all files are filed and
+    their final status records written. Records carry
+    ``batch: {plans, superseded, update_ms}`` for the shared pass.
+    """
+    global _batch
+    runs = _coalesce(list(plans))
+    done, superseded = [], []
+    _batch = {"trees": OrderedDict(), "override": {}, "evaluate": False, "undo": []}
+    try:
+        for run in runs:
+            for i in range(len(run) - 1, -1, -1):
+                (src, name, queue_ms, lane), data = run[i]
+                record, dest = _start_import(src, name, source, queue_ms, lane, data)
+                done.append((src, record, dest))
+                if record["ok"]:
+                    superseded.extend((plan, record["id"]) for plan, _ in run[:i])
+                    break
+    finally:
+        pending, _batch = _batch, None
+    started = time.perf_counter()
+    try:
+        _flush_batch(pending)
+    except Exception:
+        # The plans are already judged; a failing update must not keep them in the inbox
+        traceback.print_exc()
+    batch = {"plans": len(done), "superseded": len(superseded), "update_ms": _ms(started)}
+    print(f"[bvtk-autoload] imported {len(done)} plans ({len(superseded)} superseded), "
+          f"shared update {batch['update_ms']:g} ms")
+    skipped = [_supersede(src, name, source, by, queue_ms, lane) for (src, name, queue_ms, lane), by in superseded]
+    return skipped + [_finish_import(src, dict(record, batch=batch), dest) for src, record, dest in done]
+
+
+class ReaderCache:
+    """Process-wide LRU of parsed reader outputs, bounded by their VTK memory size.
+
+    Entries are keyed by ``(reader class, real path, mtime, size, settings)``;
+    callers get a shallow copy, so the arrays are shared and never re-parsed.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(reader: str, path: str, settings) -> tuple:
+        st = os.stat(path)
+        return (reader, os.path.realpath(path), st.st_mtime_ns, st.st_size, settings)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            data = entry[0]
+        copy = data.NewInstance()
+        copy.ShallowCopy(data)
+        return copy
+
+    def put(self, key, data) -> None:
+        size = data.GetActualMemorySize() * 1024
+        if size > self.max_bytes:
+            return
+        copy = data.NewInstance()
+        copy.ShallowCopy(data)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (copy, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "mb": round(self.bytes / 2**20, 1),
+                    "max_mb": round(self.max_bytes / 2**20, 1), "hits": self.hits, "misses": self.misses}
+
+
+_reader_cache = None
+_prefetcher = None
+_original_readers = {}
+
+
+def series_frame(path: str):
+    """Frame number of a numbered series file (the last digit run before the extension), else None."""
+    m = _SERIES_RE.match(os.path.basename(path or ""))
+    return int(m.group(2)) if m else None
+
+
+def frame_path(path: str, frame: int):
+    """``path`` with its frame number replaced by ``frame`` (same zero padding)."""
+    m = _SERIES_RE.match(os.path.basename(path or ""))
+    if m is None or frame < 0:
+        return None
+    return os.path.join(os.path.dirname(path), f"{m.group(1)}{str(frame).zfill(len(m.group(2)))}{m.group(3)}")
+
+
+def _settings_key(calls: dict) -> tuple:
+    return tuple(sorted((attr, repr(args)) for attr, args in calls.items()))
+
+
+class _Prefetcher(threading.Thread):
+    """Parses the next frames of a series into the reader cache off the main thread."""
+
+    def __init__(self, frames: int):
+        super().__init__(name="bvtk-prefetch", daemon=True)
+        self.frames = frames
+        self.jobs = queue.Queue()
+        self.pending = set()
+        self.last = {}
+        self.done = threading.Condition()
+
+    def schedule(self, name: str, real, calls: dict) -> None:
+        path = calls.get("SetFileName", ("",))[0]
+        frame = series_frame(path)
+        if frame is None:
+            return
+        series = (name, frame_path(path, 0))
+        # Follow the timeline: forwards, backwards, or every n-th frame
+        step = (frame - self.last.get(series, frame - 1)) or 1
+        self.last[series] = frame
+        for i in range(1, self.frames + 1):
+            nxt = frame_path(path, frame + step * i)
+            if nxt is None or not os.path.exists(nxt):
+                break
+            ahead = dict(calls, SetFileName=(nxt,))
+            key = ReaderCache.key(name, nxt, _settings_key(ahead))
+            with self.done:
+                if key in self.pending or key in _reader_cache:
+                    continue
+                self.pending.add(key)
+            self.jobs.put((key, real, ahead))
+
+    def wait_for(self, key, timeout: float = 60.0) -> None:
+        """Block until an in-flight prefetch of ``key`` finished (instead of parsing it twice)."""
+        with self.done:
+            self.done.wait_for(lambda: key not in self.pending, timeout)
+
+    def run(self):
+        while True:
+            key, real, calls = self.jobs.get()
             try:
-                _import_bvtk_json(src)
-                shutil.move(src, os.path.join(PROCESSED, name))
+                reader = real()
+                for attr, args in calls.items():
+                    getattr(reader, attr)(*args)
+                reader.Update()
+                if _reader_cache is not None:
+                    _reader_cache.put(key, reader.GetOutputDataObject(0))
             except Exception:
                 traceback.print_exc()
-                shutil.move(src, os.path.join(FAILED, name))
+            finally:
+                with self.done:
+                    self.pending.discard(key)
+                    self.done.notify_all()
+
+
+def _cached_reader_class(name: str, real):
+    """A pipeline source standing in for reader class ``real`` that serves parsed outputs from the cache."""
+    import vtk
+    from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
+
+    class CachedReader(VTKPythonAlgorithmBase):
+        def __init__(self):
+            VTKPythonAlgorithmBase.__init__(self, nInputPorts=0, nOutputPorts=1, outputType="vtkDataObject")
+            self.__dict__["_reader"] = real()
+            self.__dict__["_calls"] = {}
+
+        def __getattr__(self, attr):
+            target = getattr(self.__dict__["_reader"], attr)
+            if attr.startswith("Set") and callable(target):
+                def setter(*args):
+                    # Every setting is part of the key; the pipeline re-executes on change
+                    self._calls[attr] = args
+                    self.Modified()
+                    return target(*args)
+                return setter
+            return target
+
+        def GetOutput(self, port=0):
+            return self.GetOutputDataObject(port)
+
+        def GetClassName(self):
+            return name
+
+        def _read(self):
+            path = self._reader.GetFileName()
+            key = ReaderCache.key(name, path, _settings_key(self._calls))
+            last = self.__dict__.get("_last")
+            if last is not None and last[0] == key:
+                return last[1]
+            if _prefetcher is not None:
+                _prefetcher.wait_for(key)
+            data = _reader_cache.get(key)
+            if data is None:
+                self._reader.Modified()
+                self._reader.Update()
+                data = self._reader.GetOutputDataObject(0)
+                _reader_cache.put(key, data)
+            if _prefetcher is not None:
+                _prefetcher.schedule(name, real, self._calls)
+            self.__dict__["_last"] = (key, data)
+            return data
+
+        def RequestDataObject(self, request, inInfo, outInfo):
+            data = self._read()
+            info = outInfo.GetInformationObject(0)
+            out = info.Get(vtk.vtkDataObject.DATA_OBJECT())
+            if out is None or out.GetClassName() != data.GetClassName():
+                info.Set(vtk.vtkDataObject.DATA_OBJECT(), data.NewInstance())
+            return 1
+
+        def RequestInformation(self, request, inInfo, outInfo):
+            data = self._read()
+            if hasattr(data, "GetExtent"):
+                outInfo.GetInformationObject(0).Set(
+                    vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT(), data.GetExtent(), 6)
+            return 1
+
+        def RequestData(self, request, inInfo, outInfo):
+            outInfo.GetInformationObject(0).Get(vtk.vtkDataObject.DATA_OBJECT()).ShallowCopy(self._read())
+            return 1
+
+    CachedReader.__name__ = CachedReader.__qualname__ = f"Cached{name[0].upper()}{name[1:]}"
+    return CachedReader
+
+
+def install_reader_cache() -> None:
+    """Swap the file readers in the ``vtk`` namespace BVTK instantiates from for cached stand-ins."""
+    global _reader_cache, _prefetcher
+    if _reader_cache is not None or READER_CACHE_MB <= 0:
+        return
+    try:
+        import vtk
+    except ImportError:
+        return
+    _reader_cache = ReaderCache(int(READER_CACHE_MB * 2**20))
+    if PREFETCH_FRAMES > 0:
+        _prefetcher = _Prefetcher(PREFETCH_FRAMES)
+        _prefetcher.start()
+    for name in CACHED_READERS:
+        real = getattr(vtk, name, None)
+        if real is None:
+            continue
+        _original_readers[name] = real
+        setattr(vtk, name, _cached_reader_class(name, real))
+
+
+def uninstall_reader_cache() -> None:
+    global _reader_cache, _prefetcher
+    if _reader_cache is None:
+        return
+    import vtk
+
+    for name, real in _original_readers.items():
+        setattr(vtk, name, real)
+    _original_readers.clear()
+    _reader_cache.clear()
+    _reader_cache = None
+    # The thread exits with the process; it only fills a cache nobody reads now
+    _prefetcher = None
+
+
+def _recv_exact(conn, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = conn.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("client closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+
+def _read_frame(conn) -> dict:
+    (size,) = struct.unpack(">I", _recv_exact(conn, 4))
+    if size > BRIDGE_MAX_FRAME:
+        raise ValueError(f"frame of {size} bytes is too large")
+    return json.loads(_recv_exact(conn, size).decode("utf-8"))
+
+
+def _write_frame(conn, obj: dict) -> None:
+    data = json.dumps(obj).encode("utf-8")
+    conn.sendall(struct.pack(">I", len(data)) + data)
+
+
+class _BridgeServer(threading.Thread):
+    """Accepts length-prefixed JSON plans; bpy work is left to the main-thread timer."""
+
+    def __init__(self, addr: str):
+        super().__init__(name="bvtk-bridge", daemon=True)
+        self.jobs = queue.Queue()
+        self.unix_path = None
+        if addr.startswith("unix:"):
+            self.unix_path = addr[len("unix:"):]
+            if os.path.exists(self.unix_path):
+                os.unlink(self.unix_path)
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.bind(self.unix_path)
+        else:
+            host, _, port = addr.rpartition(":")
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.sock.bind((host or "127.0.0.1", int(port)))
+        self.sock.listen(8)
+
+    def run(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            try:
+                while True:
+                    msg = _read_frame(conn)
+                    if not hmac.compare_digest(str(msg.pop("token", "")).encode("utf-8"), BRIDGE_TOKEN.encode("utf-8")):
+                        _write_frame(conn, {"ok": False, "status": "rejected", "error": "missing or wrong bridge token"})
+                        return
+                    if msg.get("ping"):
+                        _write_frame(conn, {"ok": True, "status": "pong"})
+                        continue
+                    job = {"msg": msg, "received": time.perf_counter(), "done": threading.Event()}
+                    self.jobs.put(job)
+                    if not job["done"].wait(BRIDGE_ACK_TIMEOUT):
+                        # Still queued: Blender imports it later, the status record tells the outcome
+                        _write_frame(conn, {"ok": None, "status": "pending",
+                                            "error": f"no import within {BRIDGE_ACK_TIMEOUT:g}s"})
+                        return
+                    _write_frame(conn, job["ack"])
+            except (OSError, ValueError, struct.error):
+                return
+
+    def close(self):
+        self.sock.close()
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
+
+
+_bridge = None
+
+
+def _handle_bridge_message(msg: dict, received: float) -> dict:
+    # Client-chosen names stay plain files in processed/ (no paths, no dot-files)
+    name = os.path.basename(str(msg.get("name") or "")).lstrip(".") or f"bridge-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    if not name.lower().endswith(".json"):
+        name += ".json"
+    try:
+        data = json.dumps(msg["plan"])
+        while True:
+            # Never overwrite an earlier plan (and its status record) of the same name
+            path = os.path.join(PROCESSED, name)
+            try:
+                with open(path, "x", encoding="utf-8") as f:
+                    f.write(data)
+                break
+            except FileExistsError:
+                name = f"{os.path.splitext(name)[0]}-{uuid.uuid4().hex[:6]}.json"
+    except (KeyError, OSError, TypeError, ValueError) as e:
+        return {"id": os.path.splitext(name)[0], "name": name, "ok": False, "status": "failed", "error": str(e)}
+    lane = msg.get("priority") if msg.get("priority") in LANES else "high"
+    return _run_import(path, name, "bridge", queue_ms=_ms(received), lane=lane)
+
+
+def drain_bridge() -> float:
+    if _bridge is None:
+        return None
+    while True:
+        try:
+            job = _bridge.jobs.get_nowait()
+        except queue.Empty:
+            return 0.05
+        job["ack"] = _handle_bridge_message(job["msg"], job["received"])
+        job["done"].set()
+
+
+def start_bridge() -> None:
+    global _bridge
+    if _bridge is not None or not BRIDGE_ADDR:
+        return
+    if not BRIDGE_TOKEN:
+        print("[bvtk-autoload] socket bridge disabled: set BVTK_BRIDGE_TOKEN to enable it")
+        return
+    ensure_dirs()
+    try:
+        _bridge = _BridgeServer(BRIDGE_ADDR)
+    except OSError as e:
+        print(f"[bvtk-autoload] socket bridge disabled ({BRIDGE_ADDR}): {e}")
+        return
+    _bridge.start()
+    bpy.app.timers.register(drain_bridge, first_interval=0.05, persistent=True)
+
+
+def stop_bridge() -> None:
+    global _bridge
+    if _bridge is not None:
+        _bridge.close()
+        _bridge = None
+
+
+def _touch_lease() -> None:
+    os.makedirs(CLAIMS, exist_ok=True)
+    lease = os.path.join(CLAIMS, ".lease")
+    with open(lease, "a"):
+        pass
+    os.utime(lease, None)
+
+
+class _LeaseKeeper(threading.Thread):
+    """Refreshes this worker's lease even while the main thread is busy importing."""
+
+    def __init__(self):
+        super().__init__(name="bvtk-lease", daemon=True)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(LEASE_TIMEOUT / 4):
+            try:
+                _touch_lease()
+            except OSError:
+                traceback.print_exc()
+
+
+_lease_keeper = None
+
+
+def pending_plans(root: str = INBOX):
+    """``(rank, mtime, lane, path, name)`` of waiting inbox files, by lane priority then age."""
+    found = []
+    for rank, lane in enumerate(LANES):
+        dirs = [os.path.join(root, lane)] + ([root] if lane == "normal" else [])
+        for d in dirs:
+            try:
+                names = os.listdir(d)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                if name.startswith(".") or name.endswith(".part") or name in LANES:
+                    # Dotfiles are still being written (save_validated_actions renames into place)
+                    continue
+                path = os.path.join(d, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if not os.path.isdir(path):
+                    found.append((rank, st.st_mtime, lane, path, name))
+    found.sort(key=lambda f: f[:2])
+    return found
+
+
+def claim(src: str, lane: str, name: str):
+    """Atomically move an inbox file into this worker's claim directory; None if another worker won."""
+    dst = os.path.join(CLAIMS, lane, name)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.rename(src, dst)
+    except FileNotFoundError:
+        return None
+    return dst
+
+
+def _release(claim_dir: str) -> int:
+    """Put the files of a claim directory back into their inbox lanes."""
+    released = 0
+    for lane in LANES:
+        lane_dir = os.path.join(claim_dir, lane)
+        if not os.path.isdir(lane_dir):
+            continue
+        for name in os.listdir(lane_dir):
+            try:
+                os.rename(os.path.join(lane_dir, name), os.path.join(INBOX, lane, name))
+                released += 1
+            except FileNotFoundError:
+                pass
+    return released
+
+
+def _remove_claim_dir(claim_dir: str) -> None:
+    lease = os.path.join(claim_dir, ".lease")
+    if os.path.exists(lease):
+        os.remove(lease)
+    for lane in LANES:
+        if os.path.isdir(os.path.join(claim_dir, lane)):
+            os.rmdir(os.path.join(claim_dir, lane))
+    os.rmdir(claim_dir)
+
+
+def recover_stale_claims() -> int:
+    """Return files claimed by workers whose lease expired to the inbox."""
+    recovered = 0
+    now = time.time()
+    for entry in os.listdir(INBOX):
+        claim_dir = os.path.join(INBOX, entry)
+        if not entry.startswith(CLAIM_PREFIX) or os.path.normpath(claim_dir) == os.path.normpath(CLAIMS):
+            continue
+        lease = os.path.join(claim_dir, ".lease")
+        try:
+            age = now - os.stat(lease if os.path.exists(lease) else claim_dir).st_mtime
+            if age < LEASE_TIMEOUT:
+                continue
+            recovered += _release(claim_dir)
+            _remove_claim_dir(claim_dir)
+        except OSError:
+            # Another worker is recovering it, or the owner came back
+            continue
+        print(f"[bvtk-autoload] recovered claims of {entry[len(CLAIM_PREFIX):]} (lease {age:.0f}s old)")
+    return recovered
+
+
+def start_worker() -> None:
+    global _lease_keeper
+    ensure_dirs()
+    # Files left claimed by a previous run of this worker id are ours to redo
+    if os.path.isdir(CLAIMS):
+        _release(CLAIMS)
+    _touch_lease()
+    if _lease_keeper is None:
+        _lease_keeper = _LeaseKeeper()
+        _lease_keeper.start()
+
+
+def stop_worker() -> None:
+    global _lease_keeper
+    if _lease_keeper is not None:
+        _lease_keeper.stopped.set()
+        _lease_keeper = None
+    try:
+        _release(CLAIMS)
+        _remove_claim_dir(CLAIMS)
+    except OSError:
+        pass
+
+
+def scan_once(path: str) -> float:
+    ensure_dirs()
+    # Headless workers reset the scene and render every plan: those go one at a time
+    limit = 1 if bpy.app.background else max(1, BATCH_MAX)
+    try:
+        while True:
+            batch = []
+            for _, mtime, lane, src, name in pending_plans(path):
+                if not name.lower().endswith(".json"):
+                    try:
+                        shutil.move(src, os.path.join(FAILED, name))
+                    except FileNotFoundError:
+                        pass
+                    continue
+                claimed = claim(src, lane, name)
+                if claimed is None:
+                    continue
+                batch.append((claimed, name, round(max(0.0, time.time() - mtime) * 1000, 1), lane))
+                if len(batch) >= limit:
+                    break
+            if not batch:
+                break
+            if len(batch) == 1:
+                claimed, name, queue_ms, lane = batch[0]
+                _run_import(claimed, name, "inbox", queue_ms=queue_ms, lane=lane)
+            else:
+                import_batch(batch)
+            # Re-list so plans that arrived meanwhile (high priority first) go next
+        recover_stale_claims()
     finally:
         return 1.0
 
@@ -72,9 +1301,12 @@ def scan_once(path: str) -> float:
 def register_timer(dummy=None):
     ensure_dirs()
 
+    start_worker()
+    install_reader_cache()
     bpy.app.timers.register(
         lambda: scan_once(INBOX), first_interval=2.0, persistent=True
     )
+    start_bridge()
 
 
 def register():
@@ -82,4 +1314,92 @@ def register():
 
 
 def unregister():
-    pass
+    stop_bridge()
+    stop_worker()
+    uninstall_reader_cache()
+
+
+def render_frames(plan_path: str, start: int, end: int, step: int = 1, output: str = "") -> int:
+    """Render frames ``start..end`` of the numbered series the plan's readers point at.
+
+    Every reader whose ``m_FileName`` is a numbered file is moved to each frame
+    in turn; images go to ``output`` (default ``processed/<plan id>-frames/``)
+    as ``frame_<n>.png``. Readers read ahead through the prefetcher.
+    """
+    with open(plan_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    _reset_scene()
+    tree, _ = _tree_from_plan(data)
+    sinks = _sink_names(data)
+    readers = {n.name: n.m_FileName for n in tree.nodes
+               if series_frame(getattr(n, "m_FileName", "")) is not None}
+    if not readers:
+        print(f"[bvtk-autoload] {plan_path}: no reader points at a numbered series")
+        return 1
+    output = output or os.path.join(PROCESSED, f"{os.path.splitext(os.path.basename(plan_path))[0]}-frames")
+    os.makedirs(output, exist_ok=True)
+    for frame in range(start, end + 1, step):
+        paths = {name: frame_path(path, frame) for name, path in readers.items()}
+        missing = [p for p in paths.values() if not os.path.exists(p)]
+        if missing:
+            print(f"[bvtk-autoload] frame {frame}: missing {missing[0]}, skipped")
+            continue
+        started = time.perf_counter()
+        for name, path in paths.items():
+            tree.nodes[name].m_FileName = path
+        _update_nodes(tree, sinks, {})
+        image = os.path.join(output, f"frame_{frame:06d}.png")
+        _render_preview(image)
+        print(f"[bvtk-autoload] frame {frame} -> {image} ({_ms(started):g} ms)")
+    return 0
+
+
+def run_batch(argv) -> int:
+    """Headless worker loop: claim inbox plans, import, render previews.
+
+    ``blender -b --addons BVtkNodes --python bvtk-json-autoload.py -- --batch [--once] [--poll SECONDS]``
+    ``blender -b ... -- --frames PLAN.json --start 0 --end 99 [--step 1] [--output DIR]``
+    """
+    import argparse
+    import signal
+
+    parser = argparse.ArgumentParser(prog="bvtk-json-autoload.py --batch")
+    parser.add_argument("--batch", action="store_true")
+    parser.add_argument("--once", action="store_true", help="Exit when the inbox is empty")
+    parser.add_argument("--poll", type=float, default=0.5, help="Seconds between inbox scans when idle")
+    parser.add_argument("--frames", metavar="PLAN", help="Render a frame range of the plan's numbered series")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=0)
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--output", default="", help="Directory for frame images")
+    args = parser.parse_args(argv)
+    if args.frames:
+        install_reader_cache()
+        return render_frames(args.frames, args.start, args.end, args.step, args.output)
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    start_worker()
+    install_reader_cache()
+    print(f"[bvtk-autoload] batch worker {WORKER_ID} watching {INBOX}")
+    try:
+        while True:
+            if pending_plans(INBOX):
+                scan_once(INBOX)
+                continue
+            recover_stale_claims()
+            if args.once:
+                return 0
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        stop_worker()
+
+
+if __name__ == "__main__" and bpy.app.background:
+    _argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if "--batch" in _argv or "--frames" in _argv:
+        sys.exit(run_batch(_argv))
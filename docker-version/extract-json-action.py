@@ -6,9 +6,13 @@ license: MIT
 """
 
 from pydantic import BaseModel, Field
-from time import strftime
+from time import monotonic, perf_counter, strftime
 
+import asyncio
+import json
 import os
+import socket
+import struct
 
 def extract_text(text, text_begin, text_end):
     begin = text.rfind(text_begin)
@@ -21,12 +25,85 @@ def extract_text(text, text_begin, text_end):
     return text[begin:end]
 
 
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("bridge closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+
+def send_to_bridge(addr, name, plan, token, timeout=30.0):
+    """Send a plan to the Blender socket bridge (length-prefixed JSON) and return its ack.
+
+    Raises ConnectionError only if nothing was imported (not listening, token
+    rejected), so the caller can fall back to the inbox.
+    """
+    if addr.startswith("unix:"):
+        family, address = socket.AF_UNIX, addr[len("unix:"):]
+    else:
+        host, _, port = addr.rpartition(":")
+        family, address = socket.AF_INET, (host, int(port))
+    started = perf_counter()
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(0.25)
+    try:
+        sock.connect(address)
+        data = json.dumps({"token": token, "name": name, "plan": plan, "priority": "high"}).encode("utf-8")
+        sock.sendall(struct.pack(">I", len(data)) + data)
+    except OSError as e:
+        sock.close()
+        raise ConnectionError(str(e)) from e
+    with sock:
+        sock.settimeout(timeout)
+        try:
+            (size,) = struct.unpack(">I", _recv_exact(sock, 4))
+            ack = json.loads(_recv_exact(sock, size))
+        except (OSError, ValueError) as e:
+            ack = {"ok": None, "status": "pending", "error": str(e)}
+    if ack.get("status") == "rejected":
+        raise ConnectionError(ack.get("error") or "rejected by the bridge")
+    ack["roundtrip_ms"] = round((perf_counter() - started) * 1000, 1)
+    return ack
+
+
+def describe_status(record):
+    """One line for an import status record written by the autoload addon (bvtk-bridge/status/<id>.json)."""
+    if record.get("status") not in ("processed", "failed", "superseded"):
+        return "Blender is importing the plan…"
+    if record.get("status") == "superseded":
+        return f"Blender skipped the plan: a newer node tree ({record.get('superseded_by')}) replaced it in the same batch"
+    timings = record.get("timings") or {}
+    phases = ", ".join(f"{k[:-3]} {v:g} ms" for k, v in timings.items() if k != "total_ms")
+    total = f" in {timings['total_ms']:g} ms" if "total_ms" in timings else ""
+    detail = f" ({phases})" if phases else ""
+    if not record.get("ok"):
+        return f"Blender import failed{total}: {record.get('error', 'unknown error')}{detail}"
+    if record.get("kind") == "actions":
+        return f"Blender ran {record.get('actions', 0)} actions ({len(record.get('objects') or [])} objects){total}{detail}"
+    return f"Blender imported {record.get('nodes', 0)} nodes, {record.get('links', 0)} links{total}{detail}"
+
+
 class Action:
     class Valves(BaseModel):
         INBOX: str = Field(
             default = "/app/connect/bvtk-bridge/inbox",
             description = "testing"
         )
+        BRIDGE_ADDR: str = Field(
+            default = os.environ.get("BVTK_BRIDGE_ADDR", "host.docker.internal:8766"),
+            description = "Blender socket bridge (host:port or unix:/path); empty to always use the inbox"
+        )
+        BRIDGE_TOKEN: str = Field(
+            default = os.environ.get("BVTK_BRIDGE_TOKEN", ""),
+            description = "Shared secret of the socket bridge (BVTK_BRIDGE_TOKEN of the addon); empty to always use the inbox"
+        )
+        STATUS_TIMEOUT: float = Field(
+            default = 10.0,
+            description = "Seconds to wait for Blender's import status of an inbox file (0 = don't wait)"
+        )
 
     def __init__(self):
         self.valves = self.Valves()
@@ -54,16 +131,43 @@ class Action:
                 #              "content": f"{source}"}
                 # })
                 timestamp = strftime("%Y%m%d-%H%M%S")
-                path = os.path.join(self.valves.INBOX, f"{timestamp}.json")
+                if self.valves.BRIDGE_ADDR and self.valves.BRIDGE_TOKEN:
+                    try:
+                        # Blocking socket round trip: keep it off the event loop
+                        ack = await asyncio.to_thread(
+                            send_to_bridge, self.valves.BRIDGE_ADDR, f"{timestamp}.json", json.loads(source),
+                            self.valves.BRIDGE_TOKEN,
+                        )
+                        if ack.get("status") == "pending":
+                            message, level = f"Sent to Blender, no ack yet: {ack.get('error')}", "warning"
+                        else:
+                            message = f"{describe_status(ack)}; round trip {ack.get('roundtrip_ms')} ms"
+                            level = "info" if ack.get("ok") else "error"
+                        await __event_emitter__({
+                            "type": "notification",
+                            "data": {"type": level, "content": message}
+                        })
+                        return
+                    except (ConnectionError, ValueError):
+                        # Blender not listening (or not JSON): use the inbox
+                        pass
+                # A user is waiting on this one: the high-priority lane overtakes bulk jobs
+                lane_dir = os.path.join(self.valves.INBOX, "high")
+                os.makedirs(lane_dir, exist_ok=True)
+                path = os.path.join(lane_dir, f"{timestamp}.json")
                 # path = os.path.join(self.valves.INBOX, "test.json")
                 try:
-                    with open(path, "w", encoding="utf-8") as f:
+                    # Write under a dot-name and rename, so the addon never reads a half-written file
+                    tmp = os.path.join(lane_dir, f".{timestamp}.json.part")
+                    with open(tmp, "w", encoding="utf-8") as f:
                         f.write(source)
+                    os.replace(tmp, path)
                     await __event_emitter__({
                         "type": "notification",
                         "data": {"type": "info",
                                  "content": f"Successfully store the JSON in {path}"}
                     })
+                    await self._report_status(timestamp, __event_emitter__)
                 except Exception as e:
                     await __event_emitter__({
                         "type": "notification",
@@ -82,3 +186,42 @@ class Action:
                 "data": {"type": "error",
                          "content": f"Action failed:\n{str(e)}"}
             })
+
+    async def _report_status(self, plan_id, __event_emitter__):
+        """Stream the addon's status record for an inbox file into the chat until it is final."""
+        timeout = self.valves.STATUS_TIMEOUT
+        if timeout <= 0:
+            return
+        status_path = os.path.join(os.path.dirname(os.path.normpath(self.valves.INBOX)), "status", f"{plan_id}.json")
+        deadline = monotonic() + timeout
+        last = None
+        await __event_emitter__({
+            "type": "status",
+            "data": {"description": "Waiting for Blender…", "done": False}
+        })
+        while monotonic() < deadline:
+            try:
+                with open(status_path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                record = None
+            if record is not None and record.get("status") != last:
+                last = record.get("status")
+                final = last in ("processed", "failed", "superseded")
+                await __event_emitter__({
+                    "type": "status",
+                    "data": {"description": describe_status(record), "done": final}
+                })
+                if final:
+                    if not record.get("ok"):
+                        await __event_emitter__({
+                            "type": "notification",
+                            "data": {"type": "error", "content": describe_status(record)}
+                        })
+                    return
+            await asyncio.sleep(0.1)
+        await __event_emitter__({
+            "type": "status",
+            "data": {"description": f"No import status from Blender after {timeout:g}s (is the autoload addon running?)",
+                     "done": True}
+        })
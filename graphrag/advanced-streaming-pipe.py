@@ -1,6 +1,7 @@
 import subprocess
 from pydantic import BaseModel, Field
 import os
+import sys
 import json
 import time
 import threading
@@ -20,8 +21,8 @@ def _import_schema_utils():
             # Add project root for relative import when running from OpenWebUI
             from pathlib import Path
             project_root = os.environ.get("CONNECT_PROJECT_ROOT") or str(Path(__file__).resolve().parents[1])
-            if project_root not in os.sys.path:
-                os.sys.path.append(project_root)
+            if project_root not in sys.path:
+                sys.path.append(project_root)
             from schemas.blender_actions import (  # type: ignore
                 try_extract_json_from_text,
                 parse_actions_json,
@@ -59,8 +60,9 @@ def _import_schema_utils():
                     raise ValueError("JSON must contain an 'actions' list")
                 return data
 
-            def _save_validated_actions(plan, inbox_dir: str, prefix: str = "task"):
+            def _save_validated_actions(plan, inbox_dir: str, prefix: str = "task", priority: str = "normal"):
                 from time import strftime
+                inbox_dir = os.path.join(inbox_dir, priority)
                 os.makedirs(inbox_dir, exist_ok=True)
                 ts = strftime("%Y%m%d-%H%M%S")
                 path = os.path.join(inbox_dir, f"{prefix}-{ts}.json")
@@ -78,6 +80,33 @@ def _import_schema_utils():
 try_extract_json_from_text, parse_actions_json, save_validated_actions = _import_schema_utils()
 
 
+def _import_optional(module: str, attr: str):
+    """从项目根目录下的包（retrieval / indexing）导入可选组件；不可用时返回 None"""
+    import importlib
+
+    try:
+        return getattr(importlib.import_module(module), attr)
+    except Exception:
+        try:
+            from pathlib import Path
+            project_root = os.environ.get("CONNECT_PROJECT_ROOT") or str(Path(__file__).resolve().parents[1])
+            if project_root not in sys.path:
+                sys.path.append(project_root)
+            return getattr(importlib.import_module(module), attr)
+        except Exception:
+            return None
+
+
+load_catalog = _import_optional("retrieval.catalog", "load_catalog")
+acquire_snapshot = _import_optional("indexing.snapshots", "acquire")
+worker_request = _import_optional("retrieval.worker", "request")
+refers_back = _import_optional("retrieval.conversation", "refers_back")
+history_summary = _import_optional("retrieval.conversation", "history_summary")
+watch_status = _import_optional("schemas.import_status", "watch_status")
+format_status = _import_optional("schemas.import_status", "format_status")
+plan_id = _import_optional("schemas.import_status", "plan_id")
+
+
 def _extract_valid_actions_json(text: str):
     """从文本中尽可能稳健地提取一个符合 actions 架构的 JSON 字符串。
 
@@ -165,6 +194,14 @@ class Pipe:
             description="Directory to save detected Blender JSON actions",
         )
         FILE_PREFIX: str = Field(default="task", description="Saved JSON filename prefix")
+        INBOX_PRIORITY: str = Field(
+            default="high",
+            description="保存 JSON 的 inbox 通道（high / normal / bulk），交互请求优先于批量任务",
+        )
+        IMPORT_STATUS_TIMEOUT: float = Field(
+            default=10.0,
+            description="保存 JSON 后等待 Blender 导入状态的秒数，并写入回答（0 为不等待）",
+        )
         SAVE_JSON_FROM_OUTPUT: bool = Field(
             default=False,
             description="Detect JSON in graphrag stdout and save to inbox",
@@ -177,6 +214,29 @@ class Pipe:
             default=0.05,
             description="Delay between stream chunks in seconds"
         )
+        USE_SNAPSHOTS: bool = Field(
+            default=True,
+            description="Query the published index snapshot (RAG_ROOT/current) when one exists",
+        )
+        # Node catalog lookup
+        CATALOG_PREROUTE: bool = Field(
+            default=True,
+            description="Answer short node/property lookup questions (not build requests) from docs/bvtk_nodes.md before running GraphRAG",
+        )
+        CATALOG_PATH: str = Field(
+            default="",
+            description="Path to bvtk_nodes.md (empty = <project root>/docs/bvtk_nodes.md)",
+        )
+        # Global search through the query worker (pruned + cached map phase)
+        GLOBAL_WORKER_URL: str = Field(
+            default=os.environ.get("BVTK_WORKER_URL", ""),
+            description="retrieval.worker URL for global search (empty = graphrag CLI)",
+        )
+        GLOBAL_WORKER_TIMEOUT: float = Field(default=600.0, description="Seconds to wait for the worker")
+        MULTI_TURN: bool = Field(
+            default=True,
+            description="Prefix follow-up questions with a compact summary of the earlier turns",
+        )
 
     def __init__(self):
         self.valves = self.Valves()
@@ -186,6 +246,7 @@ class Pipe:
             {"id": "graphrag-basic-realtime", "name": "GraphRAG Basic Search (Real-time)"},
             {"id": "graphrag-local-realtime", "name": "GraphRAG Local Search (Real-time)"},
             {"id": "graphrag-global-realtime", "name": "GraphRAG Global Search (Real-time)"},
+            {"id": "bvtk-catalog-lookup", "name": "BVTK Node Catalog (Instant)"},
         ]
 
     def pipe(self, body: dict):
@@ -200,12 +261,38 @@ class Pipe:
         
         # 根据模型ID选择搜索方法
         model_id = body.get("model", "graphrag-basic-realtime")
+        is_streaming = body.get("stream", False)
+
+        # 节点目录查询：命中则直接回答，未命中再走 GraphRAG
+        if "catalog" in model_id or self.valves.CATALOG_PREROUTE:
+            answer = self._catalog_answer(question)
+            if answer:
+                if is_streaming:
+                    return self._single_chunk_stream(answer)
+                return {"answer": answer}
+
+        # 追问（"那它的输出端口呢"）：在问题前加上之前几轮的简要摘要；摘要在前、问题在后，保持提示前缀稳定
+        if self.valves.MULTI_TURN and refers_back is not None and refers_back(question):
+            summary = history_summary(messages)
+            if summary:
+                question = f"Conversation so far:\n{summary}\n\nFollow-up question: {question}"
+
         method = "basic"  # 默认方法
+        if "catalog" in model_id:
+            method = self.valves.DEFAULT_METHOD
         
         if "local" in model_id:
             method = "local"
         elif "global" in model_id:
             method = "global"
+
+        # 全局搜索优先交给 query worker（社区剪枝 + map 结果缓存），失败时回退到 CLI
+        if method == "global" and self.valves.GLOBAL_WORKER_URL:
+            answer = self._global_via_worker(question)
+            if answer:
+                if is_streaming:
+                    return self._single_chunk_stream(answer)
+                return {"answer": answer}
         
         # 构建命令
         cmd = [
@@ -217,8 +304,6 @@ class Pipe:
         ]
         
         # 检查是否需要流式输出
-        is_streaming = body.get("stream", False)
-        
         if is_streaming:
             # 返回高级流式响应
             return self._advanced_stream_response(cmd)
@@ -226,8 +311,53 @@ class Pipe:
             # 返回普通响应
             return self._get_response(cmd)
     
+    def _catalog_answer(self, question: str):
+        """在节点目录中查找；未命中或不可用时返回 None"""
+        if load_catalog is None:
+            return None
+        try:
+            result = load_catalog(self.valves.CATALOG_PATH or None).lookup(question)
+        except Exception as e:
+            print(f"[graphrag-pipe] catalog lookup failed: {e}")
+            return None
+        return result.to_markdown() if result else None
+
+    def _global_via_worker(self, question: str):
+        """通过 retrieval.worker 的 /global 回答；不可用时返回 None"""
+        if worker_request is None:
+            return None
+        try:
+            result = worker_request("/global", self.valves.GLOBAL_WORKER_URL,
+                                    timeout=self.valves.GLOBAL_WORKER_TIMEOUT, q=question)
+        except Exception as e:
+            print(f"[graphrag-pipe] global worker failed: {e}")
+            return None
+        print(f"[graphrag-pipe] global: {len(result.get('communities', []))}/{result.get('total_communities')} communities, "
+              f"map cache hits={result.get('map_cache_hits')} calls={result.get('map_calls')}")
+        return result.get("answer") or None
+
+    def _single_chunk_stream(self, text: str):
+        yield {"choices": [{"delta": {"content": text}, "finish_reason": None}]}
+        yield {"choices": [{"delta": {}, "finish_reason": "stop"}]}
+
+    def _acquire_snapshot(self, cmd):
+        """每次请求只解析一次索引快照并加租约；返回 (lease, cmd, env)"""
+        if not self.valves.USE_SNAPSHOTS or acquire_snapshot is None:
+            return None, cmd, None
+        root = os.path.join(os.path.expanduser(self.valves.GRAPHRAG_CWD), self.valves.RAG_ROOT)
+        try:
+            lease = acquire_snapshot(root)
+        except Exception as e:
+            print(f"[graphrag-pipe] snapshot lookup failed, using RAG_ROOT/output: {e}")
+            return None, cmd, None
+        if not lease.output_dir:
+            return lease, cmd, None
+        env = dict(os.environ, GRAPHRAG_OUTPUT_DIR=lease.output_dir)
+        return lease, cmd + ["--data", lease.output_dir], env
+
     def _advanced_stream_response(self, cmd):
         """高级流式输出，支持字符级别的实时显示"""
+        lease, cmd, env = self._acquire_snapshot(cmd)
         try:
             # 启动进程
             process = subprocess.Popen(
@@ -237,7 +367,8 @@ class Pipe:
                 text=True,
                 bufsize=1,
                 universal_newlines=True,
-                cwd=self.valves.GRAPHRAG_CWD
+                cwd=self.valves.GRAPHRAG_CWD,
+                env=env
             )
             
             # 创建输出队列
@@ -269,6 +400,7 @@ class Pipe:
             # 流式输出
             buffer = ""
             json_saved = False
+            saved_path = None
             while True:
                 try:
                     # 非阻塞获取输出
@@ -291,8 +423,9 @@ class Pipe:
                             candidate = _extract_valid_actions_json(buffer) or try_extract_json_from_text(buffer)
                             if candidate:
                                 plan = parse_actions_json(candidate)
-                                path = save_validated_actions(plan, self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX)
+                                path = save_validated_actions(plan, self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX, priority=self.valves.INBOX_PRIORITY)
                                 json_saved = True
+                                saved_path = path
                                 buffer += f"\n[Saved JSON to: {path}]\n"
                         except Exception:
                             pass
@@ -336,6 +469,18 @@ class Pipe:
                     }]
                 }
             
+            # 流式输出 Blender 的导入状态（导入中 → 成功/失败），避免用户重复提交
+            if saved_path:
+                for line in self._import_status_lines(saved_path):
+                    yield {
+                        "choices": [{
+                            "delta": {
+                                "content": f"\n[{line}]"
+                            },
+                            "finish_reason": None
+                        }]
+                    }
+
             # 发送完成信号
             yield {
                 "choices": [{
@@ -353,9 +498,13 @@ class Pipe:
                     "finish_reason": "stop"
                 }]
             }
+        finally:
+            if lease is not None:
+                lease.release()
     
     def _get_response(self, cmd):
         """获取完整响应"""
+        lease, cmd, env = self._acquire_snapshot(cmd)
         try:
             # 执行命令
             process = subprocess.Popen(
@@ -363,7 +512,8 @@ class Pipe:
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
-                cwd=self.valves.GRAPHRAG_CWD
+                cwd=self.valves.GRAPHRAG_CWD,
+                env=env
             )
             
             # 获取输出
@@ -378,6 +528,9 @@ class Pipe:
                 
         except Exception as e:
             answer = f"Error: {str(e)}"
+        finally:
+            if lease is not None:
+                lease.release()
 
         # 非流式路径：检测并保存 JSON，但仍原样返回回答文本
         if self.valves.SAVE_JSON_FROM_OUTPUT and isinstance(answer, str) and answer:
@@ -385,13 +538,28 @@ class Pipe:
                 candidate = _extract_valid_actions_json(answer) or try_extract_json_from_text(answer)
                 if candidate:
                     plan = parse_actions_json(candidate)
-                    path = save_validated_actions(plan, self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX)
+                    path = save_validated_actions(plan, self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX, priority=self.valves.INBOX_PRIORITY)
                     answer = f"{answer}\n\n[Saved JSON to: {path}]"
+                    lines = list(self._import_status_lines(path))
+                    if lines:
+                        answer = f"{answer}\n[{lines[-1]}]"
             except Exception:
                 pass
 
         return {"answer": answer}
 
+    def _import_status_lines(self, path):
+        """逐条产出 Blender 导入状态（schemas.import_status），超时则说明未被处理"""
+        timeout = self.valves.IMPORT_STATUS_TIMEOUT
+        if timeout <= 0 or watch_status is None:
+            return
+        seen = False
+        for record in watch_status(self.valves.INBOX_DIR, plan_id(path), timeout):
+            seen = True
+            yield format_status(record, timeout)
+        if not seen:
+            yield format_status(None, timeout)
+
     def get_pipe_info(self):
         """返回管道信息"""
         return {
@@ -399,5 +567,5 @@ class Pipe:
             "description": "Advanced streaming integration with character-level real-time output",
             "version": "2.0.0",
             "methods": ["basic", "local", "global"],
-            "features": ["streaming", "real-time", "character-level", "local-deployment", "typing-effect"]
+            "features": ["streaming", "real-time", "character-level", "local-deployment", "typing-effect", "catalog-lookup", "cached-global-map"]
         }
@@ -1,8 +1,11 @@
+import json
 import os
 import sys
 import subprocess
+import threading
+import queue
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 import requests
 from pydantic import BaseModel, Field
@@ -64,8 +67,9 @@ def _import_schema_utils():
                     raise ValueError("JSON must contain an 'actions' list")
                 return data
 
-            def _save_validated_actions(plan, inbox_dir: str, prefix: str = "task"):
+            def _save_validated_actions(plan, inbox_dir: str, prefix: str = "task", priority: str = "normal"):
                 from time import strftime
+                inbox_dir = os.path.join(inbox_dir, priority)
                 os.makedirs(inbox_dir, exist_ok=True)
                 ts = strftime("%Y%m%d-%H%M%S")
                 path = os.path.join(inbox_dir, f"{prefix}-{ts}.json")
@@ -83,6 +87,51 @@ def _import_schema_utils():
 try_extract_json_from_text, parse_actions_json, save_validated_actions = _import_schema_utils()
 
 
+def _import_optional(module: str, attr: str):
+    """Import ``attr`` from a project-root package (retrieval/indexing); None when unavailable."""
+    import importlib
+
+    try:
+        return getattr(importlib.import_module(module), attr)
+    except Exception:
+        try:
+            project_root = os.environ.get("CONNECT_PROJECT_ROOT") or str(Path(__file__).resolve().parents[1])
+            if project_root not in sys.path:
+                sys.path.append(project_root)
+            return getattr(importlib.import_module(module), attr)
+        except Exception:
+            return None
+
+
+load_examples = _import_optional("retrieval.examples", "load_examples")
+load_catalog = _import_optional("retrieval.catalog", "load_catalog")
+LookupResult = _import_optional("retrieval.catalog", "LookupResult")
+ConversationStore = _import_optional("retrieval.conversation", "ConversationStore")
+conversation_key = _import_optional("retrieval.conversation", "conversation_key")
+is_follow_up = _import_optional("retrieval.conversation", "is_follow_up")
+build_user_message = _import_optional("retrieval.conversation", "build_user_message")
+history_summary = _import_optional("retrieval.conversation", "history_summary")
+acquire_snapshot = _import_optional("indexing.snapshots", "acquire")
+pack_text = _import_optional("retrieval.context", "pack_text")
+count_tokens = _import_optional("retrieval.context", "count_tokens")
+plan_diff = _import_optional("schemas.plan_patch", "diff")
+is_node_tree = _import_optional("schemas.plan_patch", "is_node_tree")
+wait_for_status = _import_optional("schemas.import_status", "wait_for_status")
+format_status = _import_optional("schemas.import_status", "format_status")
+plan_id = _import_optional("schemas.import_status", "plan_id")
+
+
+def _parse_plan_json(json_str: str):
+    """Accept either an actions plan or a BVTK node tree ({links, nodes})."""
+    try:
+        return parse_actions_json(json_str)
+    except Exception:
+        data = json.loads(json_str)
+        if isinstance(data, dict) and isinstance(data.get("nodes"), list) and isinstance(data.get("links"), list):
+            return data
+        raise
+
+
 SYSTEM_INSTRUCTIONS = (
     "You are a tool that outputs ONLY JSON for Blender actions. "
     "Follow this schema strictly: {version:int, doc?:str, actions:list}. "
@@ -95,6 +144,18 @@ SYSTEM_INSTRUCTIONS = (
     "Output ONLY a single JSON object. No explanations."
 )
 
+NODE_TREE_INSTRUCTIONS = (
+    "You are a tool that outputs ONLY JSON for a BVTKNodes node tree. "
+    "Follow this schema strictly: {links:list, nodes:list}. "
+    "Each node has at least {bl_idname:str, name:str} plus any m_* properties to set. "
+    "Each link is {from_node_name:str, from_socket_identifier:str, to_node_name:str, to_socket_identifier:str}. "
+    "The templates below are complete working pipelines: start from the closest one, keep its "
+    "node names and socket identifiers, and only add, remove or change what the request needs.\n"
+    "Output ONLY a single JSON object. No explanations."
+)
+
+NO_CHANGES_ANSWER = "The updated plan matches the node tree already in Blender; nothing was sent."
+
 
 class Pipe:
     class Valves(BaseModel):
@@ -104,7 +165,13 @@ class Pipe:
         DEFAULT_METHOD: str = Field(default="basic")
         GRAPHRAG_CWD: str = Field(default=os.path.expanduser("~/Developments/simulation/graphrag"), description="Working directory for graphrag CLI")
         ENABLE_GRAPHRAG: bool = Field(default=True, description="If false, skip graphrag and send empty context to LLM")
+        USE_SNAPSHOTS: bool = Field(default=True, description="Query the published index snapshot (RAG_ROOT/current) when one exists")
         GRAPHRAG_EMITS_JSON: bool = Field(default=True, description="Treat GraphRAG stdout as final Blender JSON and save directly (no LLM)")
+        MULTI_TURN: bool = Field(default=True, description="Carry the previous plan and a conversation summary into follow-up requests")
+        PIPELINED: bool = Field(default=True, description="Run GraphRAG and a direct LLM call (catalog/template context) in parallel; first valid plan wins")
+        INBOX_PRIORITY: str = Field(default="high", description="Inbox lane for plans from this pipe (high, normal, bulk); interactive plans overtake bulk jobs")
+        IMPORT_STATUS_TIMEOUT: float = Field(default=10.0, description="Seconds to wait for Blender's import status and report it in the answer (0 = don't wait)")
+        SEND_PATCHES: bool = Field(default=True, description="On follow-ups, send only the delta against the previous node tree (schemas.plan_patch) instead of the whole tree")
         PROMPT_PREFIX: str = Field(
             default=(
                 "Return ONLY a single JSON object following this schema: "
@@ -120,7 +187,15 @@ class Pipe:
         OPENAI_API_KEY: str = Field(default="", description="API key if required; leave empty if not needed")
         OPENAI_MODEL: str = Field(default="gpt-4o-mini", description="Model name")
         LLM_TIMEOUT_SEC: int = Field(default=30, description="HTTP timeout for LLM request")
-        FALLBACK_SAMPLE_ON_ERROR: bool = Field(default=True, description="If LLM fails, write a small sample plan to test the pipeline")
+        CONTEXT_TOKEN_BUDGET: int = Field(default=3000, description="Max cl100k tokens of templates + GraphRAG context sent to the LLM (0 = unlimited)")
+        FALLBACK_SAMPLE_ON_ERROR: bool = Field(default=True, description="If LLM fails, write the nearest example template (or a small sample plan) to test the pipeline")
+
+        # Example templates (docs/examples_md) used as few-shot context
+        EXAMPLES_MODE: bool = Field(default=True, description="Retrieve the nearest example pipelines as few-shot templates")
+        EXAMPLES_DIR: str = Field(default="", description="Example descriptions directory (empty = <project root>/docs/examples_md)")
+        EXAMPLES_JSON_DIR: str = Field(default="", description="Optional directory with the examples' source JSON (<name>.json)")
+        EXAMPLES_TOP_K: int = Field(default=2, description="Number of example templates to feed to generation")
+        EXAMPLES_MIN_SCORE: float = Field(default=4.0, description="Minimum retrieval score for an example to count as a match")
 
         # Output inbox
         INBOX_DIR: str = Field(default=os.environ.get("BVTK_INBOX_DIR", os.path.expanduser("~/Developments/simulation/connect/bvtk-bridge/inbox")))
@@ -128,13 +203,15 @@ class Pipe:
 
     def __init__(self):
         self.valves = self.Valves()
+        self._conversations = ConversationStore() if ConversationStore is not None else None
 
     def pipes(self):
         return [
             {"id": "graphrag-to-bvtk-json", "name": "GraphRAG → BVTK JSON (Auto Save)"},
+            {"id": "examples-to-bvtk-json", "name": "Examples → BVTK JSON (Few-shot, Auto Save)"},
         ]
 
-    def _run_graphrag(self, question: str, method: str) -> str:
+    def _run_graphrag(self, question: str, method: str, cancel: Optional[threading.Event] = None) -> str:
         # Attach prefix/suffix so GraphRAG LLM按我们需求输出JSON
         full_query = f"{self.valves.PROMPT_PREFIX}\n\n{question}"
         if self.valves.PROMPT_SUFFIX:
@@ -152,24 +229,89 @@ class Pipe:
             "--query",
             full_query,
         ]
-        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=self.valves.GRAPHRAG_CWD)
-        stdout, stderr = process.communicate()
+        # Resolve the index snapshot once and pin it until the query finishes
+        lease = self._acquire_snapshot()
+        env = None
+        if lease is not None and lease.output_dir:
+            cmd += ["--data", lease.output_dir]
+            env = dict(os.environ, GRAPHRAG_OUTPUT_DIR=lease.output_dir)
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=self.valves.GRAPHRAG_CWD, env=env)
+            while True:
+                try:
+                    stdout, stderr = process.communicate(timeout=0.2)
+                    break
+                except subprocess.TimeoutExpired:
+                    if cancel is not None and cancel.is_set():
+                        process.kill()
+                        process.communicate()
+                        raise RuntimeError("GraphRAG cancelled")
+        finally:
+            if lease is not None:
+                lease.release()
         if process.returncode != 0:
             raise RuntimeError(f"GraphRAG failed: {stderr.strip()}")
         return stdout.strip()
 
-    def _llm_to_json(self, prompt: str, context: str) -> str:
+    def _retrieve_examples(self, question: str) -> list:
+        if not self.valves.EXAMPLES_MODE or load_examples is None:
+            return []
+        try:
+            index = load_examples(self.valves.EXAMPLES_DIR or None, self.valves.EXAMPLES_JSON_DIR or None)
+            hits = index.search(question, k=self.valves.EXAMPLES_TOP_K, min_score=self.valves.EXAMPLES_MIN_SCORE)
+        except Exception as e:
+            print(f"[graphrag-to-bvtk-json] Example retrieval failed: {e}")
+            return []
+        return [ex for _, ex in hits]
+
+    def _acquire_snapshot(self):
+        if not self.valves.USE_SNAPSHOTS or acquire_snapshot is None:
+            return None
+        root = os.path.join(os.path.expanduser(self.valves.GRAPHRAG_CWD), self.valves.RAG_ROOT)
+        try:
+            return acquire_snapshot(root)
+        except Exception as e:
+            print(f"[graphrag-to-bvtk-json] Snapshot lookup failed, using RAG_ROOT/output: {e}")
+            return None
+
+    def _budget_context(self, context: str, examples: list):
+        """Pack the GraphRAG context into what the templates leave of CONTEXT_TOKEN_BUDGET."""
+        budget = self.valves.CONTEXT_TOKEN_BUDGET
+        if budget <= 0 or pack_text is None or not context:
+            return context, None
+        used = sum(count_tokens(ex.to_prompt()) for ex in examples or [])
+        packed = pack_text(context, max(budget - used, 0), source="graphrag")
+        report = dict(packed.report(), templates=used)
+        print(f"[graphrag-to-bvtk-json] context tokens: {report}")
+        return packed.text, report
+
+    def _llm_to_json(self, prompt: str, context: str, examples: Optional[List[Any]] = None,
+                     cancel: Optional[threading.Event] = None, previous_plan: Optional[dict] = None,
+                     summary: str = "") -> str:
         headers = {"Content-Type": "application/json"}
         if self.valves.OPENAI_API_KEY:
             headers["Authorization"] = f"Bearer {self.valves.OPENAI_API_KEY}"
+        # Few-shot templates (and edits of a node tree) are node trees, so ask for one
+        node_tree = bool(examples) or bool(previous_plan and "nodes" in previous_plan)
+        system = NODE_TREE_INSTRUCTIONS if node_tree else SYSTEM_INSTRUCTIONS
+        templates = "\n\n".join(ex.to_prompt() for ex in examples or [])
+        if build_user_message is not None:
+            # Stable blocks first so consecutive turns share the prompt prefix
+            user = build_user_message(prompt, context, templates, previous_plan, summary)
+        else:
+            user = f"Request:\n{prompt}\n\nContext:\n{context}"
+            if templates:
+                user = f"Templates:\n{templates}\n\n{user}"
         payload = {
             "model": self.valves.OPENAI_MODEL,
             "messages": [
-                {"role": "system", "content": SYSTEM_INSTRUCTIONS},
-                {"role": "user", "content": f"Request:\n{prompt}\n\nContext:\n{context}"},
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
             ],
             "temperature": 0,
         }
+        if cancel is not None:
+            return self._stream_completion(payload, headers, cancel)
         r = requests.post(
             f"{self.valves.OPENAI_API_BASE_URL}/chat/completions",
             json=payload,
@@ -181,6 +323,91 @@ class Pipe:
         content = data["choices"][0]["message"]["content"]
         return content
 
+    def _stream_completion(self, payload: dict, headers: dict, cancel: threading.Event) -> str:
+        """Streamed completion that can be abandoned: closing the connection stops generation server-side."""
+        parts = []
+        with requests.post(
+            f"{self.valves.OPENAI_API_BASE_URL}/chat/completions",
+            json=dict(payload, stream=True),
+            headers=headers,
+            timeout=self.valves.LLM_TIMEOUT_SEC,
+            stream=True,
+        ) as r:
+            r.raise_for_status()
+            for line in r.iter_lines(decode_unicode=True):
+                if cancel.is_set():
+                    raise RuntimeError("LLM cancelled")
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta") or {}
+                parts.append(delta.get("content") or "")
+        return "".join(parts)
+
+    def _mentions(self, question: str) -> list:
+        """Node catalog entries named in the question."""
+        if load_catalog is None:
+            return []
+        try:
+            return load_catalog().mentions(question)
+        except Exception:
+            return []
+
+    def _cheap_context(self, question: str) -> str:
+        """Instant retrieval for the parallel LLM path: node catalog entries named in the question."""
+        entries = self._mentions(question) if LookupResult is not None else []
+        return LookupResult("properties", entries, "exact").to_markdown() if entries else ""
+
+    def _race_plans(self, question: str, method: str, examples: list, summary: str = ""):
+        """Run GraphRAG and a direct LLM call concurrently; first valid plan wins, the loser is cancelled.
+
+        Returns (plan, source, context): the context the winning plan was
+        generated from (GraphRAG's output, or the catalog context of the LLM
+        call), or GraphRAG's output with plan None when neither produced one.
+        """
+        cancel = threading.Event()
+        results: "queue.Queue" = queue.Queue()
+        llm_context = {}
+
+        def graphrag_task():
+            try:
+                results.put(("graphrag", self._run_graphrag(question, method, cancel), None))
+            except Exception as e:
+                results.put(("graphrag", None, e))
+
+        def llm_task():
+            try:
+                context, _ = self._budget_context(self._cheap_context(question), examples)
+                llm_context["context"] = context
+                results.put(("llm", self._llm_to_json(question, context, examples, cancel, summary=summary), None))
+            except Exception as e:
+                results.put(("llm", None, e))
+
+        for task in (graphrag_task, llm_task):
+            threading.Thread(target=task, daemon=True).start()
+
+        graphrag_context = ""
+        for _ in range(2):
+            source, output, error = results.get()
+            if error is not None:
+                if not cancel.is_set():
+                    print(f"[graphrag-to-bvtk-json] {source} path failed: {error}")
+                continue
+            if source == "graphrag":
+                graphrag_context = output
+                if not self.valves.GRAPHRAG_EMITS_JSON:
+                    continue
+            try:
+                plan = _parse_plan_json(try_extract_json_from_text(output) or output)
+            except Exception as e:
+                print(f"[graphrag-to-bvtk-json] {source} output is not a valid plan: {e}")
+                continue
+            cancel.set()
+            return plan, source, output if source == "graphrag" else llm_context.get("context", "")
+        return None, None, graphrag_context
+
     def _sample_plan(self) -> dict:
         return {
             "version": 1,
@@ -192,7 +419,38 @@ class Pipe:
             ],
         }
 
-    def pipe(self, body: Dict[str, Any]):
+    def _fallback_plan(self, examples: list):
+        """Nearest example template if any, otherwise the built-in sample plan."""
+        if examples:
+            return examples[0].template_plan(), f"example template '{examples[0].name}'"
+        return self._sample_plan(), "sample plan"
+
+    def _save(self, plan, turn: dict) -> Optional[str]:
+        """Save a generated plan and remember it as this turn's result.
+
+        When the chat already has a node tree in Blender, only the delta
+        against it is written (if smaller than the full tree). Returns the
+        written path, or None when the plan does not change that tree.
+        """
+        data = plan.model_dump(by_alias=True) if hasattr(plan, "model_dump") else plan
+        base = turn.get("base_plan")
+        if (self.valves.SEND_PATCHES and plan_diff is not None and base
+                and is_node_tree(base) and is_node_tree(data)):
+            patch = plan_diff(base, data)
+            turn["plan"] = data
+            if not patch["ops"]:
+                return None
+            if len(json.dumps(patch)) < len(json.dumps(data)):
+                path = save_validated_actions(patch, self.valves.INBOX_DIR, prefix=f"{self.valves.FILE_PREFIX}-patch", priority=self.valves.INBOX_PRIORITY)
+                turn["saved"] = path
+                turn["full_plan"] = plan  # resent if the worker lacks the base
+                return path
+        path = save_validated_actions(plan, self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX, priority=self.valves.INBOX_PRIORITY)
+        turn["plan"] = data
+        turn["saved"] = path
+        return path
+
+    def pipe(self, body: Dict[str, Any], __metadata__: Optional[dict] = None):
         messages = body.get("messages", [])
         if not messages:
             return {"answer": "No message provided"}
@@ -200,6 +458,28 @@ class Pipe:
         if not question:
             return {"answer": "Empty message"}
 
+        # Multi-turn: the previous validated plan and its retrieval results, per chat
+        key = state = None
+        if self.valves.MULTI_TURN and self._conversations is not None:
+            key = conversation_key(body, __metadata__)
+            state = self._conversations.get(key) if key is not None else None
+        turn: Dict[str, Any] = {"base_plan": state.plan if state is not None else None}
+        result = self._answer(question, body, state, turn)
+        if key is not None and "plan" in turn:
+            self._conversations.record(key, question, turn["plan"], turn.get("context", ""), turn.get("examples", []))
+        if turn.get("saved") and self.valves.IMPORT_STATUS_TIMEOUT > 0 and wait_for_status is not None:
+            # Tell the user whether Blender actually imported it, instead of just where it was written
+            timeout = self.valves.IMPORT_STATUS_TIMEOUT
+            record = wait_for_status(self.valves.INBOX_DIR, plan_id(turn["saved"]), timeout)
+            if record is not None and record.get("needs_full") and turn.get("full_plan") is not None:
+                # The patch went to a worker without the base plan: send the complete node tree
+                path = save_validated_actions(turn["full_plan"], self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX, priority=self.valves.INBOX_PRIORITY)
+                result["answer"] = f"{result['answer']}\n{format_status(record, timeout)}\nResent the full node tree to: {path}"
+                record = wait_for_status(self.valves.INBOX_DIR, plan_id(path), timeout)
+            result["answer"] = f"{result['answer']}\n{format_status(record, timeout)}"
+        return result
+
+    def _answer(self, question: str, body: Dict[str, Any], state, turn: dict):
         # choose method by model name suffix
         model_id = body.get("model", "")
         method = self.valves.DEFAULT_METHOD
@@ -208,7 +488,47 @@ class Pipe:
         elif "global" in model_id:
             method = "global"
 
-        if self.valves.ENABLE_GRAPHRAG:
+        # "Do X like example Y": the nearest complete templates replace the
+        # expensive global community search (and always serve as few-shot context)
+        examples = self._retrieve_examples(question)
+
+        previous_plan, summary = None, ""
+        if state is not None and is_follow_up(question, state, examples, self._mentions(question)):
+            # "Now add a clip filter to that": reuse the last retrieval, edit the last plan
+            previous_plan, summary = state.plan, state.summary()
+            examples, context = state.examples, state.context
+            turn.update(context=context, examples=examples)
+            return self._generate(question, context, examples, turn, previous_plan, summary)
+        if self.valves.MULTI_TURN and history_summary is not None:
+            summary = history_summary(body.get("messages", []))
+        turn["examples"] = examples
+        skip_graphrag = bool(examples) and (method == "global" or "examples-to-bvtk" in model_id)
+
+        # Pipelined: GraphRAG and a direct LLM call on instant catalog/template
+        # context race. Only when neither yields a plan and GraphRAG returned
+        # context does a second, sequential generation run, on that context.
+        pipelined = (self.valves.PIPELINED and self.valves.ENABLE_GRAPHRAG and not skip_graphrag
+                     and bool(self.valves.OPENAI_API_BASE_URL))
+        if pipelined:
+            plan, source, context = self._race_plans(question, method, examples, summary)
+            # The context the plan was actually built from; follow-ups reuse it
+            turn["context"] = context
+            if plan is not None:
+                try:
+                    path = self._save(plan, turn)
+                    if path is None:
+                        return {"answer": NO_CHANGES_ANSWER}
+                    return {"answer": f"Saved Blender actions (from {source}) to: {path}"}
+                except Exception as e:
+                    return {"answer": f"Failed to save JSON: {e}"}
+            if not context:
+                # Nothing new to retry the LLM with
+                if self.valves.FALLBACK_SAMPLE_ON_ERROR:
+                    plan, what = self._fallback_plan(examples)
+                    path = save_validated_actions(plan, self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX, priority=self.valves.INBOX_PRIORITY)
+                    return {"answer": f"No valid plan from GraphRAG or the LLM. Wrote {what} to: {path}"}
+                return {"answer": "No valid plan from GraphRAG or the LLM."}
+        elif self.valves.ENABLE_GRAPHRAG and not skip_graphrag:
             try:
                 context = self._run_graphrag(question, method)
             except Exception as e:
@@ -217,42 +537,56 @@ class Pipe:
                 print(f"[graphrag-to-bvtk-json] GraphRAG error (continuing without context): {e}")
         else:
             context = ""
+        turn["context"] = context
 
         # If GraphRAG 直接输出的是我们需要的 JSON，优先短路保存，完全不需要任何 API
-        if self.valves.ENABLE_GRAPHRAG and self.valves.GRAPHRAG_EMITS_JSON and context:
+        if self.valves.ENABLE_GRAPHRAG and self.valves.GRAPHRAG_EMITS_JSON and context and not skip_graphrag and not pipelined:
             candidate = try_extract_json_from_text(context) or context
             try:
-                plan = parse_actions_json(candidate)
-                path = save_validated_actions(plan, self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX)
+                plan = _parse_plan_json(candidate)
+                path = self._save(plan, turn)
+                if path is None:
+                    return {"answer": NO_CHANGES_ANSWER}
                 return {"answer": f"Saved Blender actions (from GraphRAG) to: {path}"}
             except Exception as e:
                 # 若解析失败，再走 LLM 或示例兜底
                 print(f"[graphrag-to-bvtk-json] Failed to parse GraphRAG JSON, falling back to LLM: {e}")
 
+        return self._generate(question, context, examples, turn, previous_plan, summary)
+
+    def _generate(self, question: str, context: str, examples: list, turn: dict,
+                  previous_plan: Optional[dict] = None, summary: str = ""):
+        """Direct LLM generation with fallbacks; the last step of every path."""
         if not self.valves.OPENAI_API_BASE_URL:
             if self.valves.FALLBACK_SAMPLE_ON_ERROR:
-                path = save_validated_actions(self._sample_plan(), self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX)
-                return {"answer": f"LLM not configured. Wrote sample plan to: {path}"}
+                plan, what = self._fallback_plan(examples)
+                path = save_validated_actions(plan, self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX, priority=self.valves.INBOX_PRIORITY)
+                return {"answer": f"LLM not configured. Wrote {what} to: {path}"}
             return {"answer": "LLM endpoint not configured (OPENAI_API_BASE_URL)."}
 
+        context, context_report = self._budget_context(context, examples)
         try:
-            raw = self._llm_to_json(question, context)
+            raw = self._llm_to_json(question, context, examples, previous_plan=previous_plan, summary=summary)
         except Exception as e:
             if self.valves.FALLBACK_SAMPLE_ON_ERROR:
-                path = save_validated_actions(self._sample_plan(), self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX)
-                return {"answer": f"LLM error: {e}. Wrote sample plan to: {path}"}
+                plan, what = self._fallback_plan(examples)
+                path = save_validated_actions(plan, self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX, priority=self.valves.INBOX_PRIORITY)
+                return {"answer": f"LLM error: {e}. Wrote {what} to: {path}"}
             return {"answer": f"LLM error: {e}"}
 
         candidate = try_extract_json_from_text(raw) or raw
         try:
-            plan = parse_actions_json(candidate)
+            plan = _parse_plan_json(candidate)
         except Exception as e:
             return {"answer": f"JSON validation failed: {e}\nRaw: {raw[:500]}"}
 
         try:
-            path = save_validated_actions(plan, self.valves.INBOX_DIR, prefix=self.valves.FILE_PREFIX)
+            path = self._save(plan, turn)
+            if path is None:
+                return {"answer": NO_CHANGES_ANSWER}
+            if context_report:
+                used = context_report["templates"] + context_report["tokens"]
+                return {"answer": f"Saved Blender actions to: {path} (context {used}/{self.valves.CONTEXT_TOKEN_BUDGET} tokens)"}
             return {"answer": f"Saved Blender actions to: {path}"}
         except Exception as e:
             return {"answer": f"Failed to save JSON: {e}"}
-
-
@@ -0,0 +1,5 @@
+"""Index-time tooling for the GraphRAG corpus under ``ragtest/``.
+
+Every module is runnable with ``python -m indexing.<module>`` from the project
+root and only needs the standard library unless stated otherwise.
+"""
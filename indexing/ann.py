@@ -0,0 +1,246 @@
+"""ANN index maintenance for the LanceDB vector store (``output/lancedb``).
+
+GraphRAG writes the text-unit, entity and community embeddings with
+``overwrite: True`` and no vector index, so every basic/local search scans all
+vectors. This step builds an IVF-PQ (or IVF-HNSW-SQ) index on each embedding
+table once it passes ``--threshold`` rows, and keeps it fresh:
+
+* no index yet, or the table grew by more than ``--rebuild-growth`` since the
+  last build: (re)train the index;
+* smaller growth: ``optimize()`` folds the new rows into the existing index.
+
+Search knobs (``nprobes``, ``refine_factor``) live in ``ann_config.json``
+next to the tables and are applied by :func:`search` / :func:`query`, which
+serve the query worker's ``/vector`` route (``retrieval.worker``). ``graphrag
+query`` itself opens LanceDB through GraphRAG's own vector store and does not
+read this file; it only benefits from the index. ``bench`` measures recall@k
+and latency against brute force on our own vectors and can write the fastest
+setting that reaches ``--target-recall`` back into that file.
+
+Requires ``lancedb`` and ``numpy`` (both come with graphrag).
+
+Usage::
+
+    python -m indexing.ann ensure --root ragtest
+    python -m indexing.ann bench --root ragtest --table default-text_unit-text --write-config
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+
+STATE_NAME = "ann_state.json"
+CONFIG_NAME = "ann_config.json"
+DEFAULT_THRESHOLD = 10000
+VECTOR_COLUMN = "vector"
+
+
+def default_db_uri(root: str) -> str:
+    from indexing.snapshots import resolve
+
+    return os.path.join(resolve(root) or os.path.join(root, "output"), "lancedb")
+
+
+def _read_json(path: str) -> dict:
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _vector_dim(table) -> int:
+    return table.schema.field(VECTOR_COLUMN).type.list_size
+
+
+def _has_vector_index(table) -> bool:
+    try:
+        return any(VECTOR_COLUMN in getattr(idx, "columns", []) for idx in table.list_indices())
+    except Exception:
+        return False
+
+
+def _index_params(rows: int, dim: int) -> Dict[str, int]:
+    # ~sqrt(N) partitions; PQ with 8-dim sub-vectors (largest divisor of dim not above dim // 8)
+    partitions = max(1, min(4096, int(rows ** 0.5)))
+    sub = next(d for d in range(max(1, dim // 8), 0, -1) if dim % d == 0)
+    return {"num_partitions": partitions, "num_sub_vectors": sub}
+
+
+def ensure_indexes(
+    db_uri: str,
+    threshold: int = DEFAULT_THRESHOLD,
+    index_type: str = "IVF_PQ",
+    metric: str = "cosine",
+    rebuild_growth: float = 0.2,
+    force: bool = False,
+) -> Dict[str, str]:
+    """Build or refresh vector indexes; returns the action taken per table."""
+    import lancedb
+
+    db = lancedb.connect(db_uri)
+    state_path = os.path.join(db_uri, STATE_NAME)
+    state = _read_json(state_path)
+    actions = {}
+    for name in db.table_names():
+        table = db.open_table(name)
+        if VECTOR_COLUMN not in table.schema.names:
+            continue
+        rows = table.count_rows()
+        built_rows = state.get(name, {}).get("rows", 0)
+        if rows < threshold and not force:
+            actions[name] = f"skip ({rows} rows < {threshold}, brute force)"
+            continue
+        if force or not _has_vector_index(table) or rows > built_rows * (1 + rebuild_growth):
+            params = _index_params(rows, _vector_dim(table))
+            t0 = time.time()
+            table.create_index(
+                metric=metric,
+                vector_column_name=VECTOR_COLUMN,
+                index_type=index_type,
+                replace=True,
+                **params,
+            )
+            state[name] = {"rows": rows, "index_type": index_type, "metric": metric, **params}
+            actions[name] = f"built {index_type} {params} in {time.time() - t0:.1f}s"
+        elif rows != built_rows:
+            table.optimize()
+            actions[name] = f"optimized ({rows - built_rows:+d} rows since build)"
+        else:
+            actions[name] = "up to date"
+    _write_json(state_path, state)
+    return actions
+
+
+def index_metric(db_uri: str, table_name: str, default: str = "cosine") -> str:
+    """Distance metric the table's index was built with (``ann_state.json``)."""
+    return _read_json(os.path.join(db_uri, STATE_NAME)).get(table_name, {}).get("metric") or default
+
+
+def search(table, vector, k: int = 10, db_uri: Optional[str] = None):
+    """Vector search honouring the index metric and the tuned nprobes/refine_factor of ``ann_config.json``."""
+    query = table.search(vector, vector_column_name=VECTOR_COLUMN).limit(k)
+    if db_uri:
+        query = query.distance_type(index_metric(db_uri, table.name))
+    config = _read_json(os.path.join(db_uri, CONFIG_NAME)).get(table.name, {}) if db_uri else {}
+    if config.get("nprobes"):
+        query = query.nprobes(config["nprobes"])
+    if config.get("refine_factor"):
+        query = query.refine_factor(config["refine_factor"])
+    return query
+
+
+def query(db_uri: str, table_name: str, vector, k: int = 10, columns=("id", "text")) -> List[dict]:
+    """Top-``k`` rows of ``table_name`` nearest to ``vector``, with the tuned search settings."""
+    import lancedb
+
+    table = lancedb.connect(db_uri).open_table(table_name)
+    columns = [c for c in columns if c in table.schema.names]
+    rows = search(table, vector, k, db_uri).select(columns + ["_distance"]).to_list()
+    return [dict({c: r[c] for c in columns}, distance=r.get("_distance")) for r in rows]
+
+
+def bench(
+    db_uri: str,
+    table_name: str,
+    k: int = 10,
+    queries: int = 50,
+    nprobes: Optional[List[int]] = None,
+    refine: Optional[List[int]] = None,
+    noise: float = 0.05,
+    seed: int = 0,
+) -> List[dict]:
+    """Recall@k and latency of each (nprobes, refine_factor) versus brute force, both in the index metric."""
+    import lancedb
+    import numpy as np
+
+    table = lancedb.connect(db_uri).open_table(table_name)
+    if not _has_vector_index(table):
+        raise RuntimeError(f"{table_name} has no vector index; run 'ensure --force' first")
+    metric = index_metric(db_uri, table_name)
+    vectors = table.to_arrow().column(VECTOR_COLUMN).to_pylist()
+    rng = random.Random(seed)
+    nrng = np.random.default_rng(seed)
+    sample = [np.asarray(vectors[rng.randrange(len(vectors))], dtype=np.float32) for _ in range(queries)]
+    # Perturbed stored vectors stand in for real query embeddings
+    sample = [v + nrng.normal(0, noise * (np.linalg.norm(v) / np.sqrt(len(v)) or 1.0), len(v)).astype(np.float32) for v in sample]
+
+    def timed(build):
+        ids, lat = [], []
+        for q in sample:
+            t0 = time.perf_counter()
+            rows = build(q).select(["id", "_distance"]).to_list()
+            lat.append((time.perf_counter() - t0) * 1000)
+            ids.append({r["id"] for r in rows})
+        lat.sort()
+        return ids, lat[len(lat) // 2], lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+
+    exact, p50, p95 = timed(lambda q: table.search(q, vector_column_name=VECTOR_COLUMN)
+                            .distance_type(metric).bypass_vector_index().limit(k))
+    results = [{"nprobes": None, "refine_factor": None, "recall": 1.0, "p50_ms": round(p50, 3), "p95_ms": round(p95, 3)}]
+    for n in nprobes or [5, 10, 20, 50]:
+        for r in refine or [0, 5, 10]:
+            def build(q, n=n, r=r):
+                query = table.search(q, vector_column_name=VECTOR_COLUMN).distance_type(metric).limit(k).nprobes(n)
+                return query.refine_factor(r) if r else query
+            got, p50, p95 = timed(build)
+            recall = sum(len(a & b) / max(len(b), 1) for a, b in zip(got, exact)) / len(exact)
+            results.append({"nprobes": n, "refine_factor": r or None, "recall": round(recall, 4),
+                            "p50_ms": round(p50, 3), "p95_ms": round(p95, 3)})
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain and benchmark LanceDB ANN indexes")
+    parser.add_argument("command", choices=["ensure", "bench"])
+    parser.add_argument("--root", default="ragtest", help="GraphRAG project root")
+    parser.add_argument("--db-uri", default=None, help="LanceDB directory (default: current snapshot's lancedb)")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD, help="Rows before a table gets an index")
+    parser.add_argument("--index-type", default="IVF_PQ", choices=["IVF_PQ", "IVF_HNSW_SQ", "IVF_HNSW_PQ"])
+    parser.add_argument("--rebuild-growth", type=float, default=0.2, help="Retrain after this relative growth")
+    parser.add_argument("--force", action="store_true", help="Index every table regardless of size")
+    parser.add_argument("--table", default="default-text_unit-text", help="Table to benchmark")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--write-config", action="store_true", help="Store the fastest setting reaching --target-recall")
+    args = parser.parse_args(argv)
+    db_uri = args.db_uri or default_db_uri(os.path.abspath(args.root))
+
+    if args.command == "ensure":
+        for name, action in ensure_indexes(db_uri, args.threshold, args.index_type,
+                                           rebuild_growth=args.rebuild_growth, force=args.force).items():
+            print(f"{name}: {action}")
+        return 0
+
+    results = bench(db_uri, args.table, k=args.k, queries=args.queries)
+    print(f"{'nprobes':>8} {'refine':>7} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in results:
+        print(f"{str(r['nprobes'] or 'exact'):>8} {str(r['refine_factor'] or '-'):>7} {r['recall']:>10.4f} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f}")
+    ok = [r for r in results[1:] if r["recall"] >= args.target_recall]
+    if args.write_config:
+        if not ok:
+            print(f"No setting reaches recall {args.target_recall}; config unchanged")
+            return 1
+        best = min(ok, key=lambda r: r["p50_ms"])
+        config_path = os.path.join(db_uri, CONFIG_NAME)
+        config = _read_json(config_path)
+        config[args.table] = {"nprobes": best["nprobes"], "refine_factor": best["refine_factor"],
+                              "recall": best["recall"], "k": args.k}
+        _write_json(config_path, config)
+        print(f"Wrote {config[args.table]} to {config_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,237 @@
+"""Structure-aware chunking of the input corpus before ``graphrag index``.
+
+GraphRAG's own chunker cuts every document into fixed 600-token windows, which
+splits ``### vtkXxx`` node entries of ``bvtk_nodes.txt`` down the middle. This
+stage splits each Markdown/text file on its heading structure instead:
+
+* one section per heading (up to ``split_level``, ``###`` by default);
+* consecutive sections are packed together up to ``budget`` tokens, so tiny
+  node entries share a unit; a new parent heading (e.g. the next ``##``
+  category) starts a new unit once the current one is at least half full;
+* a single section larger than the budget is split on paragraph boundaries.
+
+Each source file becomes one CSV (``id,title,text``) under the output
+directory, one row per unit. ``settings.yaml`` reads those CSVs with a chunk
+size above the budget, so every row is exactly one ``text_unit``.
+
+Usage::
+
+    python -m indexing.chunking --src ragtest/input --out ragtest/units
+"""
+
+import argparse
+import csv
+import hashlib
+import math
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from retrieval.context import count_tokens
+
+
+TEXT_EXTENSIONS = (".md", ".txt")
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+
+@dataclass
+class Section:
+    path: Tuple[str, ...]  # heading titles from the top level down to this section
+    level: int  # heading level of this section (0 = preamble before any heading)
+    body: str
+
+    @property
+    def title(self) -> str:
+        return self.path[-1] if self.path else ""
+
+
+@dataclass
+class Unit:
+    source: str
+    title: str
+    text: str
+    tokens: int
+
+    @property
+    def id(self) -> str:
+        return hashlib.sha256(f"{self.source}\n{self.text}".encode("utf-8")).hexdigest()
+
+
+def split_sections(text: str, split_level: int = 3) -> List[Section]:
+    """Split Markdown text into sections at headings of level <= split_level.
+
+    Headings inside fenced code blocks are ignored; deeper headings stay inside
+    the body of their enclosing section.
+    """
+    sections: List[Section] = []
+    stack: List[Tuple[int, str]] = []
+    level = 0
+    lines: List[str] = []
+    in_fence = False
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body or level:
+            sections.append(Section(tuple(t for _, t in stack), level, body))
+
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        m = None if in_fence else _HEADING_RE.match(line)
+        if m and len(m.group(1)) <= split_level:
+            flush()
+            lines = []
+            level = len(m.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, m.group(2)))
+            continue
+        lines.append(line)
+    flush()
+    return sections
+
+
+def _render(section: Section) -> str:
+    heading = "#" * section.level + " " + section.title if section.level else ""
+    return "\n".join(p for p in (heading, section.body) if p)
+
+
+def _split_oversized(text: str, budget: int) -> Iterable[str]:
+    """Split text on blank lines (then lines) into pieces of at most ~budget tokens."""
+    parts: List[str] = []
+    current: List[str] = []
+    size = 0
+    blocks = re.split(r"\n\s*\n", text)
+    pieces = []
+    for block in blocks:
+        if count_tokens(block) > budget:
+            pieces.extend(block.splitlines())
+        else:
+            pieces.append(block)
+    for piece in pieces:
+        n = count_tokens(piece)
+        if current and size + n > budget:
+            parts.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += n
+    if current:
+        parts.append("\n\n".join(current))
+    return parts
+
+
+def build_units(source: str, text: str, budget: int = 800, split_level: int = 3) -> List[Unit]:
+    """Turn one document into structure-aligned units of at most ``budget`` tokens."""
+    units: List[Unit] = []
+    group: List[Section] = []
+    group_tokens = 0
+    group_parent: Optional[Tuple[str, ...]] = None
+
+    def emit_group():
+        nonlocal group, group_tokens
+        if not group:
+            return
+        breadcrumb = " > ".join(group[0].path[:-1])
+        body = "\n\n".join(_render(s) for s in group)
+        text_ = f"{breadcrumb}\n\n{body}" if breadcrumb else body
+        titles = [s.title for s in group if s.title]
+        title = titles[0] if len(titles) <= 1 else f"{titles[0]} … {titles[-1]}"
+        units.append(Unit(source, f"{source}#{title}" if title else source, text_, count_tokens(text_)))
+        group, group_tokens = [], 0
+
+    for section in split_sections(text, split_level):
+        rendered = _render(section)
+        if not rendered:
+            continue
+        n = count_tokens(rendered)
+        parent = section.path[:-1]
+        # A new parent heading starts a new unit, unless the current one is
+        # still less than half full (small documents stay in one unit)
+        if group and (group_tokens + n > budget or (parent != group_parent and group_tokens >= budget // 2)):
+            emit_group()
+        if n > budget:
+            breadcrumb = " > ".join(section.path)
+            for i, piece in enumerate(_split_oversized(rendered, budget)):
+                piece_text = f"{breadcrumb}\n\n{piece}" if i and breadcrumb else piece
+                title = f"{source}#{section.title} ({i + 1})" if section.title else f"{source} ({i + 1})"
+                units.append(Unit(source, title, piece_text, count_tokens(piece_text)))
+            continue
+        group.append(section)
+        group_tokens += n
+        group_parent = parent
+    emit_group()
+    return units
+
+
+def iter_sources(src_dir: str) -> Iterable[Tuple[str, str]]:
+    """Yield (relative path, absolute path) of every text document under src_dir."""
+    for root, dirs, files in os.walk(src_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            if name.lower().endswith(TEXT_EXTENSIONS):
+                full = os.path.join(root, name)
+                yield os.path.relpath(full, src_dir), full
+
+
+def unit_csv_path(out_dir: str, rel: str) -> str:
+    return os.path.join(out_dir, rel + ".csv")
+
+
+def write_units(units: List[Unit], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "text"])
+        for u in units:
+            writer.writerow([u.id, u.title, u.text])
+    os.replace(tmp, path)
+
+
+def chunk_file(src_dir: str, rel: str, out_dir: str, budget: int = 800, split_level: int = 3) -> List[Unit]:
+    """Chunk one source file and (re)write its CSV; returns the units written."""
+    with open(os.path.join(src_dir, rel), "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    units = build_units(rel, text, budget=budget, split_level=split_level)
+    write_units(units, unit_csv_path(out_dir, rel))
+    return units
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Split the corpus into heading-aligned text units")
+    parser.add_argument("--src", default="ragtest/input", help="Corpus directory (Markdown / text)")
+    parser.add_argument("--out", default="ragtest/units", help="Output directory for the unit CSVs")
+    parser.add_argument("--budget", type=int, default=800, help="Max tokens per unit")
+    parser.add_argument("--split-level", type=int, default=3, help="Deepest heading level that starts a section")
+    parser.add_argument("--fixed-size", type=int, default=600, help="Baseline chunk size, for the comparison")
+    parser.add_argument("--fixed-overlap", type=int, default=50, help="Baseline chunk overlap, for the comparison")
+    args = parser.parse_args(argv)
+
+    expected = set()
+    total_units = total_tokens = baseline = 0
+    for rel, full in iter_sources(args.src):
+        units = chunk_file(args.src, rel, args.out, args.budget, args.split_level)
+        expected.add(os.path.normpath(unit_csv_path(args.out, rel)))
+        with open(full, "r", encoding="utf-8", errors="replace") as f:
+            doc_tokens = count_tokens(f.read())
+        total_units += len(units)
+        total_tokens += doc_tokens
+        baseline += max(1, math.ceil((doc_tokens - args.fixed_overlap) / (args.fixed_size - args.fixed_overlap)))
+        print(f"{rel}: {len(units)} units, {doc_tokens} tokens")
+
+    # Drop CSVs whose source document is gone
+    for root, _, files in os.walk(args.out):
+        for name in files:
+            path = os.path.normpath(os.path.join(root, name))
+            if name.endswith(".csv") and path not in expected:
+                os.remove(path)
+                print(f"removed stale {path}")
+
+    print(f"\n{total_units} units ({total_tokens} tokens); fixed {args.fixed_size}/{args.fixed_overlap} chunking ≈ {baseline} chunks")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,237 @@
+"""Build ``ragtest/input`` from ``docs/`` by content hash.
+
+``ragtest/input`` used to be a hand-made copy of ``docs/``: it carried the
+``images/*.png`` of ``docs_md`` and ``.txt`` copies of the Markdown files, so
+the same passages were embedded (and retrieved) more than once. This tool
+syncs it from the sources instead:
+
+* only text documents are copied (``.md`` is written as ``.txt``); binaries
+  such as images are dropped, including ones already sitting in the target;
+* exact duplicates (same normalized content) and near duplicates (word
+  shingle Jaccard >= ``--near``) are collapsed onto the first copy;
+* unchanged files are not rewritten, so mtimes stay stable for re-indexing;
+* text files placed in the target by hand (e.g. ``format_node.txt``) are
+  kept and listed with ``origin: local``;
+* ``manifest.json`` in the target records every document's sha256, size and
+  origin, plus what was dropped and why.
+
+Usage::
+
+    python -m indexing.corpus_sync --src docs --dst ragtest/input
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+MANIFEST_NAME = "manifest.json"
+TEXT_EXTENSIONS = {".md", ".txt", ".rst"}
+_SHINGLE = 5
+
+
+def normalize_text(raw: bytes) -> Optional[str]:
+    """Decode and normalize a document; None if it is not text."""
+    if b"\x00" in raw[:8192]:
+        return None
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip() + "\n"
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def shingles(text: str, size: int = _SHINGLE) -> Set[int]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {hash(" ".join(words))}
+    return {hash(" ".join(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def target_name(rel: str) -> str:
+    base, ext = os.path.splitext(rel)
+    return base + ".txt" if ext.lower() == ".md" else rel
+
+
+def load_manifest(dst: str) -> dict:
+    path = os.path.join(dst, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {"documents": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def hash_tree(root: str) -> Dict[str, str]:
+    """sha256 of the normalized content of every text document under root."""
+    out = {}
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name == MANIFEST_NAME or os.path.splitext(name)[1].lower() not in TEXT_EXTENSIONS:
+                continue
+            full = os.path.join(dirpath, name)
+            with open(full, "rb") as f:
+                text = normalize_text(f.read())
+            if text is not None:
+                out[os.path.relpath(full, root)] = sha256_text(text)
+    return out
+
+
+def _walk(root: str) -> List[str]:
+    rels = []
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            rels.append(os.path.relpath(os.path.join(dirpath, name), root))
+    return rels
+
+
+def sync(src: str, dst: str, near: float = 0.9, dry_run: bool = False) -> dict:
+    """Sync dst from src and return the new manifest."""
+    previous = load_manifest(dst)
+    managed_before = {rel for rel, doc in previous.get("documents", {}).items() if doc.get("origin") != "local"}
+
+    kept: Dict[str, dict] = {}
+    texts: Dict[str, str] = {}
+    by_hash: Dict[str, str] = {}
+    shingle_cache: Dict[str, Set[int]] = {}
+    duplicates: Dict[str, dict] = {}
+    binaries: List[str] = []
+
+    def is_duplicate(rel: str, text: str, digest: str) -> Optional[dict]:
+        if digest in by_hash:
+            return {"of": by_hash[digest], "kind": "exact", "similarity": 1.0}
+        if near >= 1.0:
+            return None
+        sh = shingle_cache.setdefault(rel, shingles(text))
+        for other, other_text in texts.items():
+            ratio = min(len(text), len(other_text)) / max(len(text), len(other_text), 1)
+            if ratio < near:
+                continue  # Jaccard cannot reach the threshold
+            sim = jaccard(sh, shingle_cache.setdefault(other, shingles(other_text)))
+            if sim >= near:
+                return {"of": other, "kind": "near", "similarity": round(sim, 4)}
+        return None
+
+    sources: Dict[str, Tuple[str, str]] = {}
+    for src_rel in _walk(src):
+        if os.path.splitext(src_rel)[1].lower() not in TEXT_EXTENSIONS:
+            continue
+        with open(os.path.join(src, src_rel), "rb") as f:
+            text = normalize_text(f.read())
+        if text is not None:
+            sources.setdefault(target_name(src_rel), (src_rel, text))
+
+    # 1) Hand-placed text files in the target win over copies from src
+    for rel in _walk(dst):
+        if rel == MANIFEST_NAME or rel in managed_before:
+            continue
+        if rel in sources and os.path.splitext(rel)[1].lower() in TEXT_EXTENSIONS:
+            continue  # a copy of a src document: managed from now on
+        with open(os.path.join(dst, rel), "rb") as f:
+            text = normalize_text(f.read())
+        if text is None or os.path.splitext(rel)[1].lower() not in TEXT_EXTENSIONS:
+            binaries.append(rel)
+            continue
+        digest = sha256_text(text)
+        dup = is_duplicate(rel, text, digest)
+        if dup:
+            duplicates[rel] = dict(dup, origin="local")
+            continue
+        kept[rel] = {"sha256": digest, "bytes": len(text.encode("utf-8")), "origin": "local"}
+        texts[rel] = text
+        by_hash[digest] = rel
+
+    # 2) Documents from src
+    for rel, (src_rel, text) in sources.items():
+        if rel in kept:
+            continue  # hand-placed file with the same name takes precedence
+        digest = sha256_text(text)
+        dup = is_duplicate(rel, text, digest)
+        if dup:
+            duplicates[rel] = dict(dup, source=os.path.join(src, src_rel))
+            continue
+        kept[rel] = {
+            "sha256": digest,
+            "bytes": len(text.encode("utf-8")),
+            "origin": "src",
+            "source": os.path.join(src, src_rel),
+        }
+        texts[rel] = text
+        by_hash[digest] = rel
+
+    manifest = {
+        "version": 1,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "src": src,
+        "documents": kept,
+        "duplicates": duplicates,
+        "dropped_binaries": binaries,
+    }
+    if dry_run:
+        return manifest
+
+    # 3) Apply: write changed documents, remove binaries, duplicates and stale copies
+    for rel, doc in kept.items():
+        path = os.path.join(dst, rel)
+        if doc["origin"] == "src":
+            current = None
+            if os.path.isfile(path):
+                with open(path, "rb") as f:
+                    current = normalize_text(f.read())
+            if current != texts[rel]:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(texts[rel])
+    removals = set(binaries) | {r for r in duplicates if os.path.exists(os.path.join(dst, r))}
+    removals |= {r for r in managed_before if r not in kept}
+    for rel in sorted(removals):
+        path = os.path.join(dst, rel)
+        if os.path.isfile(path):
+            os.remove(path)
+    for dirpath, dirs, files in os.walk(dst, topdown=False):
+        if dirpath != dst and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+    tmp = os.path.join(dst, MANIFEST_NAME + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(dst, MANIFEST_NAME))
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the GraphRAG input corpus from docs/")
+    parser.add_argument("--src", default="docs", help="Source documentation directory")
+    parser.add_argument("--dst", default="ragtest/input", help="GraphRAG input directory")
+    parser.add_argument("--near", type=float, default=0.9, help="Near-duplicate Jaccard threshold (1.0 = exact only)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args(argv)
+
+    manifest = sync(args.src, args.dst, near=args.near, dry_run=args.dry_run)
+    total = sum(d["bytes"] for d in manifest["documents"].values())
+    print(f"{len(manifest['documents'])} documents ({total} bytes)")
+    for rel, dup in manifest["duplicates"].items():
+        print(f"  duplicate ({dup['kind']}, {dup['similarity']}): {rel} -> {dup['of']}")
+    for rel in manifest["dropped_binaries"]:
+        print(f"  binary dropped: {rel}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
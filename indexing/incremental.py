@@ -0,0 +1,236 @@
+"""Incremental re-indexing driven by a content-hash manifest of ``ragtest/input``.
+
+Instead of a blind ``graphrag index`` on every doc change, this driver:
+
+1. hashes ``<root>/input`` and diffs it against the manifest recorded by the
+   last successful run (``<root>/output/index_manifest.json``);
+2. re-chunks the added/changed documents into ``<root>/units`` (see
+   ``indexing.chunking``), plus any document whose units are missing (units/
+   is not versioned, so a fresh checkout has none), and drops the units of
+   removed ones;
+3. runs ``graphrag update`` when documents were only added, and
+   ``graphrag index`` when something changed or disappeared (GraphRAG's
+   update workflow cannot retract documents). In both cases unchanged text
+   units, entities and communities produce byte-identical LLM/embedding
+   requests, so they are served from ``<root>/cache/{extract_graph,
+   text_embedding,community_reporting}`` and only the touched parts are
+   actually recomputed;
+4. reports per-stage cache hit rates, refreshes the LanceDB ANN indexes
+   (``indexing.ann``), the memory-mappable Arrow tables
+   (``retrieval.tables``) and the CSR entity graph (``retrieval.graph_index``),
+   and writes the new manifest.
+
+Cache hits are measured through file access times: before the run every cache
+entry's atime is reset below its mtime, so any read during the run bumps it
+(this works with the default ``relatime`` mount option, not with ``noatime``).
+
+Usage::
+
+    python -m indexing.incremental --root ragtest [--dry-run] [--full]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from indexing import chunking
+from indexing.corpus_sync import hash_tree
+
+
+MANIFEST_NAME = "index_manifest.json"
+REPORT_NAME = "incremental_report.json"
+
+
+def load_indexed_manifest(output_dir: str) -> Dict[str, str]:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("documents", {})
+
+
+def diff_manifests(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, List[str]]:
+    return {
+        "added": sorted(set(new) - set(old)),
+        "changed": sorted(k for k in set(new) & set(old) if new[k] != old[k]),
+        "removed": sorted(set(old) - set(new)),
+    }
+
+
+class CacheProbe:
+    """Counts per-stage cache hits (entries read) and misses (entries written)."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.before: Dict[str, set] = {}
+        self.started = 0.0
+        self.atime_supported = False
+
+    def _stages(self) -> List[str]:
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return sorted(d for d in os.listdir(self.cache_dir) if os.path.isdir(os.path.join(self.cache_dir, d)))
+
+    def _entries(self, stage: str) -> List[str]:
+        d = os.path.join(self.cache_dir, stage)
+        return [os.path.join(d, n) for n in os.listdir(d)] if os.path.isdir(d) else []
+
+    def _check_atime(self) -> bool:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        probe = os.path.join(self.cache_dir, ".atime-probe")
+        with open(probe, "w") as f:
+            f.write("x")
+        try:
+            os.utime(probe, (0, os.stat(probe).st_mtime))
+            with open(probe) as f:
+                f.read()
+            return os.stat(probe).st_atime > 0
+        finally:
+            os.remove(probe)
+
+    def start(self) -> None:
+        self.atime_supported = self._check_atime()
+        self.started = time.time()
+        for stage in self._stages():
+            entries = self._entries(stage)
+            self.before[stage] = set(entries)
+            if self.atime_supported:
+                for path in entries:
+                    os.utime(path, (0, os.stat(path).st_mtime))
+
+    def report(self) -> Dict[str, dict]:
+        out = {}
+        for stage in self._stages():
+            entries = self._entries(stage)
+            old = self.before.get(stage, set())
+            misses = sum(1 for p in entries if p not in old)
+            hits = None
+            if self.atime_supported:
+                hits = sum(1 for p in entries if p in old and os.stat(p).st_atime >= self.started - 1)
+            total = (hits or 0) + misses
+            out[stage] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / total, 4) if hits is not None and total else None,
+                "entries": len(entries),
+            }
+        return out
+
+
+def run_graphrag(python: str, command: str, root: str, cwd: Optional[str] = None) -> int:
+    cmd = [python, "-m", "graphrag", command, "--root", root]
+    print(f"[incremental] {' '.join(cmd)}")
+    return subprocess.call(cmd, cwd=cwd)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-index only what changed in <root>/input")
+    parser.add_argument("--root", default="ragtest", help="GraphRAG project root")
+    parser.add_argument("--graphrag-python", default=os.environ.get("GRAPHRAG_PYTHON", sys.executable),
+                        help="Python interpreter with graphrag installed")
+    parser.add_argument("--graphrag-cwd", default=None, help="Working directory for the graphrag CLI")
+    parser.add_argument("--budget", type=int, default=800, help="Token budget per unit (indexing.chunking)")
+    parser.add_argument("--output-dir", default=None,
+                        help="Index output directory (default <root>/output; set by indexing.snapshots)")
+    parser.add_argument("--ann-threshold", type=int, default=None,
+                        help="Rows before an embedding table gets an ANN index (default: indexing.ann)")
+    parser.add_argument("--full", action="store_true", help="Re-chunk everything and run a full index")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the document diff")
+    args = parser.parse_args(argv)
+
+    root = os.path.abspath(args.root)
+    input_dir = os.path.join(root, "input")
+    units_dir = os.path.join(root, "units")
+    output_dir = os.path.abspath(args.output_dir) if args.output_dir else os.path.join(root, "output")
+
+    current = hash_tree(input_dir)
+    previous = {} if args.full else load_indexed_manifest(output_dir)
+    diff = diff_manifests(previous, current)
+    for kind in ("added", "changed", "removed"):
+        for rel in diff[kind]:
+            print(f"  {kind:8s}{rel}")
+    touched = diff["added"] + diff["changed"]
+    # settings.yaml reads units/, so every document needs its CSV even when the index is current
+    unchunked = [rel for rel in sorted(current)
+                 if rel not in touched and not os.path.isfile(chunking.unit_csv_path(units_dir, rel))]
+    for rel in unchunked:
+        print(f"  {'unchunked':8s} {rel}")
+    if not touched and not diff["removed"]:
+        if not args.dry_run:
+            for rel in unchunked:
+                chunking.chunk_file(input_dir, rel, units_dir, budget=args.budget)
+        print("[incremental] index is up to date")
+        return 0
+    if args.dry_run:
+        return 0
+
+    t0 = time.time()
+    for rel in touched + unchunked:
+        chunking.chunk_file(input_dir, rel, units_dir, budget=args.budget)
+    for rel in diff["removed"]:
+        stale = chunking.unit_csv_path(units_dir, rel)
+        if os.path.isfile(stale):
+            os.remove(stale)
+    chunk_time = time.time() - t0
+
+    command = "update" if previous and not diff["changed"] and not diff["removed"] else "index"
+    probe = CacheProbe(os.path.join(root, "cache"))
+    probe.start()
+    t1 = time.time()
+    code = run_graphrag(args.graphrag_python, command, root, cwd=args.graphrag_cwd)
+    index_time = time.time() - t1
+    cache = probe.report()
+
+    report = {
+        "command": command,
+        "returncode": code,
+        "diff": diff,
+        "chunk_seconds": round(chunk_time, 3),
+        "index_seconds": round(index_time, 3),
+        "cache": cache,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, REPORT_NAME), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for stage, s in cache.items():
+        rate = s["hit_rate"]
+        if rate is None:
+            rate = "n/a (noatime)" if s["hits"] is None else "n/a"
+        print(f"  cache {stage:22s} hits={s['hits']} misses={s['misses']} hit_rate={rate}")
+    if code != 0:
+        print(f"[incremental] graphrag {command} failed with exit code {code}; manifest not updated")
+        return code
+
+    try:
+        from indexing import ann
+
+        threshold = args.ann_threshold if args.ann_threshold is not None else ann.DEFAULT_THRESHOLD
+        for name, action in ann.ensure_indexes(os.path.join(output_dir, "lancedb"), threshold).items():
+            print(f"  ann {name}: {action}")
+    except ImportError:
+        print("[incremental] lancedb not importable here; skipping ANN index maintenance")
+    try:
+        from retrieval import tables
+
+        for name, action in tables.convert(output_dir).items():
+            print(f"  arrow {name}: {action}")
+        from retrieval import graph_index
+
+        if graph_index.build(output_dir):
+            print("  graph CSR index rebuilt")
+    except ImportError:
+        print("[incremental] pyarrow/numpy not importable here; skipping Arrow conversion and graph index")
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"indexed_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "documents": current}, f, indent=2)
+    print(f"[incremental] {command} done in {index_time:.1f}s ({len(touched)} re-chunked, {len(diff['removed'])} removed)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,237 @@
+"""Versioned index snapshots with atomic publish, for re-indexing without downtime.
+
+Layout under the GraphRAG root::
+
+    ragtest/
+      snapshots/<id>/output/      one complete index (parquet + lancedb)
+      snapshots/<id>/leases/      one file per in-flight query reading it
+      current -> snapshots/<id>   symlink swapped with an atomic rename
+
+``settings.yaml`` points ``output`` and the LanceDB ``db_uri`` at
+``${GRAPHRAG_OUTPUT_DIR}`` (``output`` by default, see ``ragtest/.env``), so
+the indexer and the query CLI can be aimed at a snapshot through the
+environment. Queries resolve ``current`` once per request and hold a lease
+for its duration; a new index is built side by side and published by
+renaming a fresh symlink over ``current``. Snapshots that are neither current
+nor among the newest ``--keep`` are garbage-collected once no live lease
+references them.
+
+Usage::
+
+    python -m indexing.snapshots build --root ragtest   # incremental build + publish
+    python -m indexing.snapshots adopt --root ragtest   # move ragtest/output into a first snapshot
+    python -m indexing.snapshots gc --root ragtest
+    python -m indexing.snapshots status --root ragtest
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+import uuid
+from typing import List, Optional
+
+
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_LINK = "current"
+BUILDING_SUFFIX = ".building"
+DEFAULT_LEASE_TTL = 3600.0
+
+
+def _snapshots_dir(root: str) -> str:
+    return os.path.join(root, SNAPSHOTS_DIR)
+
+
+def current_id(root: str) -> Optional[str]:
+    link = os.path.join(root, CURRENT_LINK)
+    if not os.path.islink(link):
+        return None
+    return os.path.basename(os.readlink(link).rstrip("/"))
+
+
+def resolve(root: str) -> Optional[str]:
+    """Absolute output directory of the current snapshot, or None (plain layout)."""
+    snap = current_id(root)
+    if snap is None:
+        return None
+    return os.path.join(os.path.abspath(_snapshots_dir(root)), snap, "output")
+
+
+class Lease:
+    """Pins one snapshot for the duration of a query; ``output_dir`` is None without snapshots."""
+
+    def __init__(self, root: str):
+        self.output_dir: Optional[str] = None
+        self._path: Optional[str] = None
+        for _ in range(3):
+            snap = current_id(root)
+            if snap is None:
+                return
+            snap_path = os.path.join(os.path.abspath(_snapshots_dir(root)), snap)
+            try:
+                os.makedirs(os.path.join(snap_path, "leases"), exist_ok=True)
+                self._path = os.path.join(snap_path, "leases", f"{os.getpid()}-{uuid.uuid4().hex}")
+                with open(self._path, "w") as f:
+                    f.write(str(time.time()))
+            except OSError:
+                continue
+            if os.path.isdir(os.path.join(snap_path, "output")):
+                self.output_dir = os.path.join(snap_path, "output")
+                return
+            # Swapped out and collected between readlink and the lease: retry
+            self.release()
+
+    def release(self) -> None:
+        if self._path:
+            try:
+                os.remove(self._path)
+            except FileNotFoundError:
+                pass
+            self._path = None
+
+    def __enter__(self) -> "Lease":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def acquire(root: str) -> Lease:
+    return Lease(root)
+
+
+def new_snapshot(root: str, seed: bool = True) -> str:
+    """Create ``snapshots/<id>.building``, seeded with a copy of the current output."""
+    snap_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+    path = os.path.join(_snapshots_dir(root), snap_id + BUILDING_SUFFIX)
+    os.makedirs(path)
+    source = resolve(root) or os.path.join(root, "output")
+    if seed and os.path.isdir(source):
+        shutil.copytree(source, os.path.join(path, "output"))
+    else:
+        os.makedirs(os.path.join(path, "output"))
+    return path
+
+
+def publish(root: str, building_path: str) -> str:
+    """Finalize a built snapshot and atomically point ``current`` at it."""
+    final = building_path[: -len(BUILDING_SUFFIX)] if building_path.endswith(BUILDING_SUFFIX) else building_path
+    if final != building_path:
+        os.rename(building_path, final)
+    snap_id = os.path.basename(final)
+    tmp_link = os.path.join(root, f".{CURRENT_LINK}.{os.getpid()}.tmp")
+    os.symlink(os.path.join(SNAPSHOTS_DIR, snap_id), tmp_link)
+    os.replace(tmp_link, os.path.join(root, CURRENT_LINK))
+    return snap_id
+
+
+def _live_leases(snap_path: str, ttl: float) -> int:
+    leases = os.path.join(snap_path, "leases")
+    if not os.path.isdir(leases):
+        return 0
+    now = time.time()
+    live = 0
+    for name in os.listdir(leases):
+        path = os.path.join(leases, name)
+        try:
+            age = now - os.path.getmtime(path)
+        except FileNotFoundError:
+            continue
+        if age < ttl:
+            live += 1
+        else:
+            os.remove(path)  # lease of a crashed query
+    return live
+
+
+def gc(root: str, keep: int = 2, lease_ttl: float = DEFAULT_LEASE_TTL) -> List[str]:
+    """Delete unreferenced old snapshots; returns the removed ids."""
+    base = _snapshots_dir(root)
+    if not os.path.isdir(base):
+        return []
+    cur = current_id(root)
+    now = time.time()
+    finished = sorted((n for n in os.listdir(base) if not n.endswith(BUILDING_SUFFIX)), reverse=True)
+    protected = set(finished[:keep]) | {cur}
+    removed = []
+    for name in os.listdir(base):
+        path = os.path.join(base, name)
+        if name in protected:
+            continue
+        if name.endswith(BUILDING_SUFFIX):
+            if now - os.path.getmtime(path) < lease_ttl:
+                continue  # a build may still be running
+        elif _live_leases(path, lease_ttl):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(name)
+    return removed
+
+
+def adopt(root: str) -> str:
+    """Move an existing ``<root>/output`` into the first snapshot and publish it."""
+    if current_id(root):
+        raise RuntimeError(f"{root} already uses snapshots (current -> {current_id(root)})")
+    path = new_snapshot(root, seed=False)
+    os.rmdir(os.path.join(path, "output"))
+    shutil.move(os.path.join(root, "output"), os.path.join(path, "output"))
+    return publish(root, path)
+
+
+def build(root: str, argv: List[str]) -> int:
+    """Run the incremental indexer into a new snapshot and publish it on success."""
+    from indexing import incremental
+
+    path = new_snapshot(root)
+    output_dir = os.path.join(path, "output")
+    stale_report = os.path.join(output_dir, incremental.REPORT_NAME)
+    if os.path.isfile(stale_report):
+        os.remove(stale_report)
+    os.environ["GRAPHRAG_OUTPUT_DIR"] = output_dir
+    code = incremental.main(["--root", root, "--output-dir", output_dir] + argv)
+    report = os.path.join(output_dir, incremental.REPORT_NAME)
+    if code != 0 or not os.path.isfile(report):
+        # Failed, or nothing to do: the published snapshot stays as it is
+        shutil.rmtree(path, ignore_errors=True)
+        return code
+    snap_id = publish(root, path)
+    print(f"[snapshots] published {snap_id}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage versioned GraphRAG index snapshots")
+    parser.add_argument("command", choices=["build", "adopt", "publish", "gc", "status"])
+    parser.add_argument("path", nargs="?", help="Snapshot directory (publish)")
+    parser.add_argument("--root", default="ragtest", help="GraphRAG project root")
+    parser.add_argument("--keep", type=int, default=2, help="Finished snapshots always kept by gc")
+    parser.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL, help="Seconds before a lease is considered dead")
+    args, rest = parser.parse_known_args(argv)
+    root = os.path.abspath(args.root)
+
+    if args.command == "build":
+        code = build(root, rest)
+        gc(root, args.keep, args.lease_ttl)
+        return code
+    if args.command == "adopt":
+        print(f"[snapshots] adopted output as {adopt(root)}")
+    elif args.command == "publish":
+        if not args.path:
+            parser.error("publish needs the snapshot directory")
+        print(f"[snapshots] published {publish(root, os.path.abspath(args.path))}")
+    elif args.command == "gc":
+        for name in gc(root, args.keep, args.lease_ttl):
+            print(f"[snapshots] removed {name}")
+    else:
+        cur = current_id(root)
+        base = _snapshots_dir(root)
+        for name in sorted(os.listdir(base)) if os.path.isdir(base) else []:
+            leases = os.path.join(base, name, "leases")
+            n = len(os.listdir(leases)) if os.path.isdir(leases) else 0
+            print(f"{'*' if name == cur else ' '} {name}  leases={n}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""Query-time helpers shared by the Open-WebUI pipes.
+
+The pipes import these modules the same way they import ``schemas``: from the
+project root (``CONNECT_PROJECT_ROOT``), falling back to plain GraphRAG when
+the package is not importable.
+"""
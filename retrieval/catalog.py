@@ -0,0 +1,286 @@
+"""In-memory lookup over the BVTK node catalog (``docs/bvtk_nodes.md``).
+
+Many chat questions are plain lookups ("what properties does vtkContourFilter
+have", "which bl_idname is the cone source"). Those are answered here from a
+prebuilt index in well under a millisecond; anything that does not look like a
+lookup, or does not hit the index, returns ``None`` so the caller can fall back
+to a GraphRAG search.
+"""
+
+import bisect
+import difflib
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_CATALOG_PATH = os.environ.get("BVTK_NODES_MD") or str(
+    Path(__file__).resolve().parents[1] / "docs" / "bvtk_nodes.md"
+)
+
+# Words that signal the question is a catalog lookup rather than a request to
+# build a pipeline. Each maps to the field the answer should focus on.
+_INTENT_WORDS = (
+    ("properties", ("propert", "attribute", "param", "属性", "参数")),
+    ("bl_idname", ("bl_idname", "idname", "id name", "标识")),
+    ("category", ("category", "categor", "分类", "类别")),
+    ("module", ("module", "模块", "defined in", "source file")),
+    ("summary", ("what is", "which node", "what node", "is there a node", "什么节点", "哪个节点", "介绍")),
+)
+
+# A request to build something is never a lookup, even when it names a node
+# or says "parameters"; neither is anything longer than a short question.
+_BUILD_RE = re.compile(
+    r"\b(build|generate|create|make|construct|pipelines?|render|visuali[sz]e|read|load|import|apply|set up)\b"
+    r"|生成|创建|构建|搭建|管线|流程|读取|加载|导入|可视化|渲染",
+    re.IGNORECASE,
+)
+_MAX_LOOKUP_WORDS = 16
+_MAX_LOOKUP_CHARS = 160
+
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "does", "do", "what", "which", "how", "have",
+    "has", "of", "for", "to", "in", "on", "node", "nodes", "vtk", "bvtk",
+    "property", "properties", "idname", "bl_idname", "category", "module",
+    "there", "its", "it", "and", "or", "with", "me", "tell", "show", "list",
+}
+
+_TERM_RE = re.compile(r"`([^`]+)`|\b((?:vtk|VTK|BVTK_)\w+)\b")
+_WORD_RE = re.compile(r"[A-Za-z0-9_]+")
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+@dataclass
+class NodeEntry:
+    name: str
+    bl_idname: str = ""
+    category: str = ""
+    module: str = ""
+    properties: List[str] = field(default_factory=list)
+
+    def keys(self) -> List[str]:
+        """Normalized lookup keys: display name and idname, with/without prefixes."""
+        name = _norm(self.name)
+        keys = {name}
+        if name.startswith("vtk"):
+            keys.add(name[3:])
+        idname = _norm(self.bl_idname)
+        if idname:
+            keys.add(idname)
+            stem = idname[:-4] if idname.endswith("type") else idname
+            for prefix in ("bvtknode", "vtk"):
+                if stem.startswith(prefix):
+                    stem = stem[len(prefix):]
+                    break
+            keys.add(stem)
+        return [k for k in keys if k]
+
+
+@dataclass
+class LookupResult:
+    intent: str
+    entries: List[NodeEntry]
+    match: str  # "exact" | "prefix" | "fuzzy"
+
+    def to_markdown(self) -> str:
+        lines = []
+        if self.match != "exact":
+            lines.append(f"_({self.match} match)_\n")
+        names = [e.name for e in self.entries]
+        for e in self.entries:
+            # Nodes defined both in custom_nodes/ and generated_nodes/ share a name
+            name = f"{e.name} ({e.module})" if names.count(e.name) > 1 and e.module else e.name
+            if self.intent == "properties":
+                props = ", ".join(f"`{p}`" for p in e.properties) or "(none)"
+                lines.append(f"**{name}** (`{e.bl_idname}`) properties: {props}")
+            elif self.intent == "bl_idname":
+                lines.append(f"**{name}** → `{e.bl_idname}`")
+            elif self.intent == "category":
+                lines.append(f"**{name}** category: {e.category or 'Uncategorized'}")
+            elif self.intent == "module":
+                lines.append(f"**{e.name}** is defined in `{e.module}`")
+            else:
+                props = ", ".join(f"`{p}`" for p in e.properties) or "(none)"
+                lines.append(
+                    f"### {name}\n"
+                    f"- **bl_idname**: `{e.bl_idname}`\n"
+                    f"- **category**: {e.category or 'Uncategorized'}\n"
+                    f"- **module**: `{e.module}`\n"
+                    f"- **properties**: {props}"
+                )
+        return "\n".join(lines)
+
+
+class NodeCatalog:
+    """Exact / prefix / fuzzy index over node names and bl_idnames."""
+
+    def __init__(self, entries: List[NodeEntry]):
+        self.entries = entries
+        self._by_key: Dict[str, List[NodeEntry]] = {}
+        for e in entries:
+            for k in e.keys():
+                bucket = self._by_key.setdefault(k, [])
+                if e not in bucket:
+                    bucket.append(e)
+        self._sorted_keys = sorted(self._by_key)
+        # Fuzzy matching only compares keys sharing the first character
+        self._by_initial: Dict[str, List[str]] = {}
+        for k in self._sorted_keys:
+            self._by_initial.setdefault(k[0], []).append(k)
+
+    @classmethod
+    def from_markdown(cls, text: str) -> "NodeCatalog":
+        entries: List[NodeEntry] = []
+        category = ""
+        current: Optional[NodeEntry] = None
+        for raw in text.splitlines():
+            line = raw.strip()
+            if line.startswith("### "):
+                current = NodeEntry(name=line[4:].strip(), category=category)
+                entries.append(current)
+            elif line.startswith("## "):
+                category = line[3:].strip()
+                if category.lower() == "uncategorized":
+                    category = ""
+                current = None
+            elif current is not None and line.startswith("- **"):
+                key, _, value = line[4:].partition("**:")
+                values = re.findall(r"`([^`]*)`", value)
+                if key == "bl_idname" and values:
+                    current.bl_idname = values[0]
+                elif key == "module" and values:
+                    current.module = values[0]
+                elif key == "properties":
+                    current.properties = values
+        return cls(entries)
+
+    def get(self, term: str) -> List[NodeEntry]:
+        return list(self._by_key.get(_norm(term), []))
+
+    def prefix(self, term: str, limit: int = 8) -> List[NodeEntry]:
+        key = _norm(term)
+        if not key:
+            return []
+        out: List[NodeEntry] = []
+        i = bisect.bisect_left(self._sorted_keys, key)
+        while i < len(self._sorted_keys) and self._sorted_keys[i].startswith(key):
+            for e in self._by_key[self._sorted_keys[i]]:
+                if e not in out:
+                    out.append(e)
+            if len(out) >= limit:
+                break
+            i += 1
+        return out[:limit]
+
+    def fuzzy(self, term: str, limit: int = 3, cutoff: float = 0.82) -> List[NodeEntry]:
+        key = _norm(term)
+        if len(key) < 4:
+            return []
+        candidates = [k for k in self._by_initial.get(key[0], []) if abs(len(k) - len(key)) <= 3]
+        out: List[NodeEntry] = []
+        for k in difflib.get_close_matches(key, candidates, n=limit, cutoff=cutoff):
+            for e in self._by_key[k]:
+                if e not in out:
+                    out.append(e)
+        return out[:limit]
+
+    def find(self, term: str) -> Tuple[List[NodeEntry], str]:
+        hits = self.get(term)
+        if hits:
+            return hits, "exact"
+        hits = self.prefix(term)
+        if hits:
+            return hits, "prefix"
+        return self.fuzzy(term), "fuzzy"
+
+    def _free_text(self, question: str):
+        """Exact hits for word n-grams ("the cone source"), longest first.
+
+        Exact keys only, so ordinary words do not fuzzy-match node names.
+        """
+        words = [w for w in _WORD_RE.findall(question)]
+        for n in (3, 2, 1):
+            for i in range(len(words) - n + 1):
+                gram = words[i:i + n]
+                if n == 1 and (gram[0].lower() in _STOPWORDS or len(gram[0]) < 4):
+                    continue
+                if gram[0].lower() in _STOPWORDS or gram[-1].lower() in _STOPWORDS:
+                    continue
+                hits = self.get("".join(gram))
+                if hits:
+                    yield hits
+
+    def lookup(self, question: str) -> Optional[LookupResult]:
+        """Answer a lookup-style question, or return None to fall back to GraphRAG."""
+        intent = detect_intent(question)
+        if intent is None:
+            return None
+
+        # 1) Explicit identifiers (`VTKConeSourceType`, vtkContourFilter, ...)
+        explicit = [a or b for a, b in _TERM_RE.findall(question)]
+        for term in explicit:
+            hits, how = self.find(term)
+            if hits:
+                return LookupResult(intent, hits, how)
+
+        # 2) Free-text names
+        for hits in self._free_text(question):
+            return LookupResult(intent, hits, "exact")
+        return None
+
+    def mentions(self, question: str) -> List[NodeEntry]:
+        """Every node a request names (identifiers and exact free-text names), whatever its intent.
+
+        Context for plan generation, where :meth:`lookup` declines to answer.
+        """
+        out: List[NodeEntry] = []
+        groups = [self.get(a or b) for a, b in _TERM_RE.findall(question)]
+        for hits in groups + list(self._free_text(question)):
+            out.extend(e for e in hits if e not in out)
+        return out
+
+
+def detect_intent(question: str) -> Optional[str]:
+    """Lookup intent of a short question, None for anything else (requests to build, long text)."""
+    if (_BUILD_RE.search(question) or len(question) > _MAX_LOOKUP_CHARS
+            or len(_WORD_RE.findall(question)) > _MAX_LOOKUP_WORDS):
+        return None
+    q = question.lower()
+    for intent, needles in _INTENT_WORDS:
+        if any(n in q for n in needles):
+            return intent
+    return None
+
+
+_CACHE: Dict[str, Tuple[float, NodeCatalog]] = {}
+
+
+def load_catalog(path: Optional[str] = None) -> NodeCatalog:
+    """Load (and memoize per file mtime) the catalog at ``path``."""
+    path = os.path.expanduser(path or DEFAULT_CATALOG_PATH)
+    mtime = os.path.getmtime(path)
+    cached = _CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = NodeCatalog.from_markdown(f.read())
+    _CACHE[path] = (mtime, catalog)
+    return catalog
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    cat = load_catalog()
+    question = " ".join(sys.argv[1:]) or "what properties does vtkContourFilter have"
+    t0 = time.perf_counter()
+    result = cat.lookup(question)
+    dt = (time.perf_counter() - t0) * 1000
+    print(result.to_markdown() if result else "(miss: fall back to GraphRAG)")
+    print(f"\n[{len(cat.entries)} nodes, lookup {dt:.3f} ms]")
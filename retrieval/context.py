@@ -0,0 +1,142 @@
+"""Token-budgeted context assembly with a cached ``cl100k_base`` tokenizer.
+
+Contexts sent to the chat model (the GraphRAG answer that
+``to_bvtk_json_pipe`` forwards as ``Context:``, few-shot templates, global
+search reports) used to be unbounded. :func:`pack` greedily takes the
+highest-ranked units until ``budget`` tokens are used, skipping units that
+overlap an already packed one (word-shingle containment) and truncating the
+last unit that only partly fits. The returned :class:`PackedContext` reports
+how many tokens were used and what was dropped.
+
+Token counts come from the ``encoding_model`` of ``settings.yaml``
+(``cl100k_base``); the encoder is loaded once per process and counts are
+memoized per text. Without ``tiktoken`` a conservative character estimate is
+used. ``indexing.chunking`` shares the same counter.
+"""
+
+import functools
+import math
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Set
+
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@functools.lru_cache(maxsize=4)
+def get_encoder(name: str = DEFAULT_ENCODING):
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(name)
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=16384)
+def count_tokens(text: str, encoding: str = DEFAULT_ENCODING) -> int:
+    """Token count of ``text``; a conservative estimate without tiktoken."""
+    enc = get_encoder(encoding)
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 3.5) + (len(text) - ascii_chars)
+
+
+def truncate(text: str, max_tokens: int, encoding: str = DEFAULT_ENCODING) -> str:
+    """Longest prefix of ``text`` within ``max_tokens``."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, encoding) <= max_tokens:
+        return text
+    enc = get_encoder(encoding)
+    if enc is not None:
+        return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid], encoding) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+def _shingles(text: str, size: int = 4) -> Set[str]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+@dataclass
+class ContextUnit:
+    text: str
+    score: float = 0.0
+    source: str = ""
+
+
+@dataclass
+class PackedContext:
+    units: List[ContextUnit]
+    tokens: int
+    budget: int
+    dropped: int = 0
+    duplicates: int = 0
+    truncated: bool = False
+    separator: str = "\n\n"
+
+    @property
+    def text(self) -> str:
+        return self.separator.join(u.text for u in self.units)
+
+    def report(self) -> dict:
+        return {"tokens": self.tokens, "budget": self.budget, "units": len(self.units),
+                "dropped": self.dropped, "duplicates": self.duplicates, "truncated": self.truncated}
+
+
+def split_paragraphs(text: str, source: str = "") -> List[ContextUnit]:
+    """Blank-line separated blocks, ranked by position (earlier = higher)."""
+    blocks = [b.strip() for b in re.split(r"\n\s*\n", text or "") if b.strip()]
+    return [ContextUnit(b, float(len(blocks) - i), source) for i, b in enumerate(blocks)]
+
+
+def pack(
+    units: Iterable[ContextUnit],
+    budget: int,
+    encoding: str = DEFAULT_ENCODING,
+    overlap: float = 0.8,
+    separator: str = "\n\n",
+    min_tail: int = 64,
+) -> PackedContext:
+    """Greedily pack the highest-scoring units into ``budget`` tokens."""
+    ranked = sorted(units, key=lambda u: -u.score)
+    result = PackedContext([], 0, budget, separator=separator)
+    sep_tokens = count_tokens(separator, encoding)
+    seen: List[Set[str]] = []
+    for unit in ranked:
+        sh = _shingles(unit.text)
+        if sh and any(len(sh & other) / len(sh) >= overlap for other in seen):
+            result.duplicates += 1
+            continue
+        cost = count_tokens(unit.text, encoding) + (sep_tokens if result.units else 0)
+        room = budget - result.tokens
+        if cost <= room:
+            result.units.append(unit)
+            result.tokens += cost
+            seen.append(sh)
+        elif room - sep_tokens >= min_tail and not result.truncated:
+            part = truncate(unit.text, room - (sep_tokens if result.units else 0), encoding)
+            result.units.append(ContextUnit(part, unit.score, unit.source))
+            result.tokens += count_tokens(part, encoding) + (sep_tokens if len(result.units) > 1 else 0)
+            result.truncated = True
+            seen.append(sh)
+        else:
+            result.dropped += 1
+    return result
+
+
+def pack_text(text: str, budget: int, encoding: str = DEFAULT_ENCODING, source: str = "") -> PackedContext:
+    """:func:`pack` over the paragraphs of one text (keeps the leading ones)."""
+    return pack(split_paragraphs(text, source), budget, encoding)
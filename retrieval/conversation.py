@@ -0,0 +1,192 @@
+"""Multi-turn state for the plan-generating pipes.
+
+A follow-up such as "now add a clip filter to that" only makes sense together
+with the plan produced by the previous turn. :class:`ConversationStore` keeps,
+per Open-WebUI chat, the last validated plan, the retrieval results that
+produced it and a compact summary of the turns so far. :func:`is_follow_up`
+decides whether a new question refers back to that state, in which case the
+pipe reuses the stored retrieval instead of searching again. Only explicit
+back-references count ("to that", "the previous plan", "把它"), and a question
+that retrieves a template or names nodes the plan does not have is treated
+as a new request unless it attaches them to the existing plan.
+
+:func:`build_user_message` lays the prompt out from the most stable part to
+the most volatile one (templates, retrieved context, previous plan,
+conversation summary, request), so consecutive turns share the longest
+possible prefix and the local model can reuse its KV/prefix cache.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+_EDIT_VERBS = r"(add|remove|delete|drop|change|modify|update|tweak|adjust|increase|decrease|replace|rename|set|make|use|connect)"
+
+# Explicit references to something from an earlier turn
+_FOLLOW_UP_RE = re.compile(
+    r"\b(to|from|in|into|on|onto|of|after|before|with|about)\s+(it|that|this|them)\b"
+    r"|\b(make|set|change|turn|color|colour|scale|move|rename|remove|delete|keep)\s+(it|that|this|them)\b"
+    r"|\bits\s+(input|output|port|propert|setting|value|color|colour)"
+    r"|^\s*(now|also|then|and)\s+" + _EDIT_VERBS + r"\b"
+    r"|\bthe\s+(previous|last|current|existing|same)\s+(plan|pipeline|tree|node ?tree|one|result)\b"
+    r"|把它|把这|把那|给它|它的|刚才|上一个|上一步|之前的|上面的|在此基础上|在这个基础上|再加|再添加|去掉|改成|换成",
+    re.IGNORECASE,
+)
+
+# Back-references that attach new nodes to the existing plan ("add a clip filter to that")
+_ATTACH_RE = re.compile(
+    r"\b(to|into|onto|after|before)\s+(it|that|this|them)\b"
+    r"|\bthe\s+(previous|last|current|existing|same)\s+(plan|pipeline|tree|node ?tree)\b"
+    r"|^\s*(now|also|then|and)\s+add\b"
+    r"|给它|在此基础上|在这个基础上|再加|再添加",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Turn:
+    question: str
+    result: str
+
+
+@dataclass
+class ConversationState:
+    key: str
+    turns: List[Turn] = field(default_factory=list)
+    plan: Optional[dict] = None
+    context: str = ""
+    examples: List[Any] = field(default_factory=list)
+    updated: float = 0.0
+
+    def summary(self, max_turns: int = 6, max_chars: int = 160) -> str:
+        lines = []
+        for turn in self.turns[-max_turns:]:
+            q = " ".join(turn.question.split())
+            q = q if len(q) <= max_chars else q[: max_chars - 3] + "..."
+            lines.append(f"- user: {q}\n  result: {turn.result}")
+        return "\n".join(lines)
+
+
+def conversation_key(body: Dict[str, Any], metadata: Optional[dict] = None) -> Optional[str]:
+    """Open-WebUI chat id, None without one (two chats opening alike must not share state)."""
+    chat_id = (metadata or {}).get("chat_id") or body.get("chat_id")
+    return str(chat_id) if chat_id else None
+
+
+def plan_summary(plan: Optional[dict]) -> str:
+    """One line describing a plan: node names and link count, or the action list."""
+    if not plan:
+        return "no plan"
+    if isinstance(plan.get("nodes"), list):
+        names = [f"{n.get('name')} ({n.get('bl_idname')})" for n in plan["nodes"][:12]]
+        more = f" +{len(plan['nodes']) - 12} more" if len(plan["nodes"]) > 12 else ""
+        return f"node tree: {', '.join(names)}{more}; {len(plan.get('links') or [])} links"
+    actions = plan.get("actions") or []
+    return "actions: " + ", ".join(f"{a.get('type')} {a.get('name') or a.get('object') or ''}".strip() for a in actions[:12])
+
+
+def refers_back(question: str) -> bool:
+    """Whether the wording points at something from an earlier turn ("that", "now add", "把它")."""
+    return bool(_FOLLOW_UP_RE.search(question))
+
+
+def _plan_idnames(plan: dict) -> set:
+    names = set()
+    for node in plan.get("nodes") or []:
+        names.update(str(node.get(k) or "").lower() for k in ("bl_idname", "name"))
+    return names - {""}
+
+
+def is_follow_up(
+    question: str,
+    state: Optional[ConversationState],
+    examples: Optional[list] = None,
+    mentioned: Optional[list] = None,
+) -> bool:
+    """True when there is a previous plan and the question explicitly refers back to it.
+
+    ``examples`` are the templates the question retrieves and ``mentioned``
+    the catalog entries it names (anything with ``name``/``bl_idname``). A
+    template the previous turn did not use means a new pipeline; nodes the
+    plan lacks only count as an edit when the wording attaches them to it.
+    """
+    if state is None or not state.plan or not refers_back(question):
+        return False
+    known = {ex.name for ex in state.examples}
+    if any(ex.name not in known for ex in examples or []):
+        return False
+    present = _plan_idnames(state.plan)
+    new_nodes = [e for e in mentioned or []
+                 if e.bl_idname.lower() not in present and e.name.lower() not in present]
+    return not new_nodes or bool(_ATTACH_RE.search(question))
+
+
+def build_user_message(
+    request: str,
+    context: str = "",
+    templates: str = "",
+    previous_plan: Optional[dict] = None,
+    summary: str = "",
+) -> str:
+    """User prompt ordered from the most stable block to the most volatile one."""
+    parts = []
+    if templates:
+        parts.append(f"Templates:\n{templates}")
+    parts.append(f"Context:\n{context}")
+    if previous_plan:
+        parts.append(
+            "Current plan (already applied in Blender; return the complete updated plan):\n"
+            + json.dumps(previous_plan, ensure_ascii=False, separators=(",", ":"))
+        )
+    if summary:
+        parts.append(f"Conversation so far:\n{summary}")
+    parts.append(f"Request:\n{request}")
+    return "\n\n".join(parts)
+
+
+class ConversationStore:
+    """In-process LRU of :class:`ConversationState`, expiring after ``ttl`` seconds."""
+
+    def __init__(self, capacity: int = 256, ttl: float = 6 * 3600):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._states: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[ConversationState]:
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return None
+            if time.time() - state.updated > self.ttl:
+                del self._states[key]
+                return None
+            self._states.move_to_end(key)
+            return state
+
+    def record(self, key: str, question: str, plan: Optional[dict], context: str, examples: list) -> ConversationState:
+        with self._lock:
+            state = self._states.get(key) or ConversationState(key)
+            state.turns.append(Turn(question, plan_summary(plan)))
+            if plan is not None:
+                state.plan = plan
+            state.context = context
+            state.examples = list(examples)
+            state.updated = time.time()
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.capacity:
+                self._states.popitem(last=False)
+            return state
+
+
+def history_summary(messages: List[dict], max_turns: int = 6, max_chars: int = 160) -> str:
+    """Summary of earlier user turns taken from the chat history (used when no state is stored)."""
+    questions = [str(m.get("content", "")) for m in messages[:-1] if m.get("role") == "user"]
+    turns = [Turn(q, "(earlier turn)") for q in questions]
+    return ConversationState("", turns).summary(max_turns, max_chars)
@@ -0,0 +1,270 @@
+"""Persistent query-embedding cache in front of the embedding endpoint.
+
+Every basic/local search embeds its query through ``default_embedding_model``
+(``nomic-embed-text`` over HTTP), so repeated questions pay the network and
+model cost each time. :class:`EmbeddingCache` stores vectors in SQLite keyed
+by ``(model, normalized text)`` with LRU eviction, and :meth:`embed` only
+sends the misses upstream, in one batch.
+
+Because the pipes run ``graphrag query`` as a subprocess, the cache is also
+exposed as a tiny OpenAI-compatible proxy (``POST /v1/embeddings``); point a
+query-side model entry in ``settings.yaml`` (``query_embedding_model``, used
+as the searches' ``embedding_model_id``) at it and every query embedding goes
+through the cache. Indexing keeps the real endpoint: the proxy only caches
+single-input requests and forwards multi-input batches untouched, so bulk
+text-unit embeddings cannot evict the query entries. At startup the proxy can
+prefetch the embeddings of common templated prompts in one batch.
+
+Only the standard library is used.
+
+Usage::
+
+    python -m retrieval.embedding_cache serve --upstream http://localhost:11434/v1 \\
+        --port 11435 --prefetch ragtest/prompts/common_queries.txt
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+import urllib.request
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+
+DEFAULT_CACHE_PATH = os.environ.get("BVTK_EMBED_CACHE") or str(
+    Path(__file__).resolve().parents[1] / "ragtest" / "cache" / "query_embeddings.sqlite"
+)
+
+
+def normalize(text: str) -> str:
+    """Cache-key normalization: NFKC, trimmed, internal whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 50000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, model TEXT, vector BLOB, last_used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings(last_used)")
+        self._db.commit()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        keys = [cache_key(model, t) for t in texts]
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE embeddings SET last_used=? WHERE key=?", [(now, k) for k in found])
+                self._db.commit()
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += sum(1 for k in keys if k not in found)
+        return [found.get(k) for k in keys]
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        now = time.time()
+        rows = [(cache_key(model, t), model, array("f", v).tobytes(), now) for t, v in zip(texts, vectors)]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                # Evict least recently used down to 90% of the cap
+                excess = count - int(self.max_entries * 0.9)
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+                )
+            self._db.commit()
+
+    def embed(
+        self,
+        texts: Sequence[str],
+        model: str,
+        api_base: str,
+        api_key: str = "",
+        timeout: float = 60.0,
+    ) -> List[List[float]]:
+        """Embeddings for ``texts``; only cache misses are sent upstream (one batch)."""
+        cached = self.get_many(model, texts)
+        # One upstream input per distinct key: "a  b" and "a b" are embedded once
+        missing: Dict[str, str] = {}
+        for text, vec in zip(texts, cached):
+            if vec is None:
+                missing.setdefault(cache_key(model, text), normalize(text))
+        if missing:
+            fetched = request_embeddings(list(missing.values()), model, api_base, api_key, timeout)
+            self.put_many(model, list(missing.values()), fetched)
+            by_key = dict(zip(missing, fetched))
+            cached = [v if v is not None else by_key[cache_key(model, t)] for t, v in zip(texts, cached)]
+        return cached
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        total = self.hits + self.misses
+        return {"entries": count, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None}
+
+
+def request_embeddings(texts: Sequence[str], model: str, api_base: str, api_key: str = "",
+                       timeout: float = 60.0) -> List[List[float]]:
+    """POST an OpenAI-compatible /embeddings request."""
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    req = urllib.request.Request(
+        f"{api_base.rstrip('/')}/embeddings",
+        data=json.dumps({"model": model, "input": list(texts)}).encode("utf-8"),
+        headers=headers,
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        data = json.loads(resp.read())
+    items = sorted(data["data"], key=lambda d: d.get("index", 0))
+    return [d["embedding"] for d in items]
+
+
+def prefetch(cache: EmbeddingCache, templates: Sequence[str], model: str, api_base: str,
+             api_key: str = "", batch_size: int = 64) -> int:
+    """Warm the cache with common prompts; returns how many were fetched."""
+    todo = [t for t, v in zip(templates, cache.get_many(model, templates)) if v is None]
+    for i in range(0, len(todo), batch_size):
+        batch = todo[i:i + batch_size]
+        cache.put_many(model, batch, request_embeddings(batch, model, api_base, api_key))
+    return len(todo)
+
+
+def load_templates(path: str, prefix: str = "") -> List[str]:
+    """One prompt per line; with ``prefix`` the pipe-style ``prefix + "\\n\\n" + line`` is added too."""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return lines + ([f"{prefix}\n\n{line}" for line in lines] if prefix else [])
+
+
+def make_handler(cache: EmbeddingCache, upstream: str):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, payload: bytes, content_type: str = "application/json"):
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _forward(self, body: Optional[bytes]):
+            path = self.path[3:] if self.path.startswith("/v1") else self.path
+            req = urllib.request.Request(upstream.rstrip("/") + path, data=body, method=self.command,
+                                         headers={k: v for k, v in self.headers.items() if k.lower() != "host"})
+            try:
+                with urllib.request.urlopen(req, timeout=600) as resp:
+                    self._send(resp.status, resp.read(), resp.headers.get("Content-Type", "application/json"))
+            except urllib.error.HTTPError as e:
+                self._send(e.code, e.read())
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                return self._send(200, json.dumps(cache.stats()).encode("utf-8"))
+            self._forward(None)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not self.path.rstrip("/").endswith("/embeddings"):
+                return self._forward(body)
+            try:
+                req = json.loads(body)
+                inputs = req["input"]
+                single = isinstance(inputs, str)
+                texts = [inputs] if single else list(inputs)
+                if not all(isinstance(t, str) for t in texts):
+                    return self._forward(body)  # token-id inputs: not cacheable
+                if len(texts) > 1:
+                    return self._forward(body)  # indexing batches: keep them out of the query cache
+                auth = self.headers.get("Authorization", "")
+                api_key = auth[7:] if auth.startswith("Bearer ") else ""
+                vectors = cache.embed(texts, req["model"], upstream, api_key)
+            except urllib.error.HTTPError as e:
+                return self._send(e.code, e.read())
+            except Exception as e:
+                return self._send(400, json.dumps({"error": {"message": str(e)}}).encode("utf-8"))
+            payload = {
+                "object": "list",
+                "model": req["model"],
+                "data": [{"object": "embedding", "index": i, "embedding": v} for i, v in enumerate(vectors)],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+            self._send(200, json.dumps(payload).encode("utf-8"))
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query-embedding cache / caching proxy")
+    parser.add_argument("command", choices=["serve", "prefetch", "stats"])
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="SQLite cache file")
+    parser.add_argument("--max-entries", type=int, default=50000, help="LRU capacity")
+    parser.add_argument("--upstream", default="http://localhost:11434/v1", help="Real embedding endpoint")
+    parser.add_argument("--model", default="nomic-embed-text", help="Model used for prefetching")
+    parser.add_argument("--api-key", default=os.environ.get("GRAPHRAG_API_KEY", ""))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--prefetch", default=None, help="File with one common prompt per line")
+    parser.add_argument("--prefix", default="", help="Pipe PROMPT_PREFIX to also prefetch prefix+prompt")
+    args = parser.parse_args(argv)
+
+    cache = EmbeddingCache(args.cache, args.max_entries)
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+        return 0
+
+    def warm():
+        try:
+            n = prefetch(cache, load_templates(args.prefetch, args.prefix), args.model, args.upstream, args.api_key)
+            print(f"[embedding-cache] prefetched {n} prompt embeddings")
+        except Exception as e:
+            print(f"[embedding-cache] prefetch failed: {e}")
+
+    if args.command == "prefetch":
+        if not args.prefetch:
+            parser.error("prefetch needs --prefetch FILE")
+        warm()
+        return 0
+
+    if args.prefetch:
+        threading.Thread(target=warm, daemon=True).start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(cache, args.upstream))
+    print(f"[embedding-cache] serving http://{args.host}:{args.port}/v1 -> {args.upstream} ({args.cache})")
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,216 @@
+"""Retrieval over the worked BVTK example pipelines (``docs/examples_md``).
+
+Each example describes a complete, known-good node tree (nodes, links,
+sources/sinks). For a question like "make stream tracers like the cubeflow
+example" the nearest one or two examples are returned as few-shot templates,
+which is both cheaper and more reliable than a ``global`` community search.
+
+When the source JSON of an example is available (``BVTK_EXAMPLES_JSON_DIR`` or
+``json_dir``, one ``<name>.json`` per example) it is used verbatim as the
+template; otherwise a skeleton plan is rebuilt from the Markdown description.
+"""
+
+import json
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+_PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_EXAMPLES_DIR = os.environ.get("BVTK_EXAMPLES_DIR") or str(_PROJECT_ROOT / "docs" / "examples_md")
+DEFAULT_EXAMPLES_JSON_DIR = os.environ.get("BVTK_EXAMPLES_JSON_DIR", "")
+
+# Node keys that only describe editor layout; dropped from few-shot JSON
+_LAYOUT_KEYS = {"color", "height", "width", "hide", "location", "show_options", "show_preview", "label", "mute"}
+
+_LINK_RE = re.compile(r"`([^`]+)`:`([^`]+)`\s*→\s*`([^`]+)`:`([^`]+)`")
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "like", "as", "by",
+    "me", "make", "create", "show", "use", "using", "do", "please", "example", "examples",
+    "vtk", "bvtk", "node", "nodes", "blender", "json", "mesh", "type", "m",
+}
+
+
+def _tokens(text: str) -> List[str]:
+    """Lowercase word tokens, splitting camelCase / snake_case and naive plurals."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    out = []
+    for w in re.findall(r"[A-Za-z]+", text):
+        w = w.lower()
+        if w.startswith("vtk") and len(w) > 3:
+            w = w[3:]
+        if len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        if len(w) > 1 and w not in _STOPWORDS:
+            out.append(w)
+    return out
+
+
+@dataclass
+class ExampleNode:
+    name: str
+    bl_idname: str = ""
+    properties: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Example:
+    name: str
+    nodes: List[ExampleNode] = field(default_factory=list)
+    links: List[Tuple[str, str, str, str]] = field(default_factory=list)
+    sources: List[str] = field(default_factory=list)
+    sinks: List[str] = field(default_factory=list)
+    source_json: Optional[dict] = None
+
+    @classmethod
+    def from_markdown(cls, text: str) -> "Example":
+        ex = cls(name="")
+        section = ""
+        node: Optional[ExampleNode] = None
+        for raw in text.splitlines():
+            line = raw.strip()
+            if line.startswith("# "):
+                ex.name = line[2:].strip()
+            elif line.startswith("## "):
+                section = line[3:].strip()
+                node = None
+            elif section == "节点" and line.startswith("### "):
+                node = ExampleNode(name=line[4:].strip())
+                ex.nodes.append(node)
+            elif node is not None and line.startswith("- **"):
+                key, _, value = line[4:].partition("**:")
+                values = re.findall(r"`([^`]*)`", value)
+                if key == "bl_idname" and values:
+                    node.bl_idname = values[0]
+                elif key == "properties":
+                    node.properties = values
+            elif section == "连接":
+                m = _LINK_RE.search(line)
+                if m:
+                    ex.links.append(m.groups())
+            elif section == "总览" and line.startswith("- **"):
+                key, _, value = line[4:].partition("**:")
+                values = re.findall(r"`([^`]*)`", value)
+                if key == "源节点":
+                    ex.sources = values
+                elif key == "汇节点":
+                    ex.sinks = values
+        return ex
+
+    def index_tokens(self) -> List[str]:
+        toks = _tokens(self.name.replace("_", " ")) * 2  # the example name weighs double
+        for n in self.nodes:
+            toks += _tokens(n.name)
+        return toks
+
+    def template_plan(self) -> dict:
+        """The example as an importable ``{links, nodes}`` plan."""
+        if self.source_json is not None:
+            return self.source_json
+        return {
+            "links": [
+                {
+                    "from_node_name": a,
+                    "from_socket_identifier": a_sock,
+                    "to_node_name": b,
+                    "to_socket_identifier": b_sock,
+                }
+                for a, a_sock, b, b_sock in self.links
+            ],
+            "nodes": [{"bl_idname": n.bl_idname, "name": n.name} for n in self.nodes],
+        }
+
+    def to_prompt(self) -> str:
+        """Compact few-shot block for the generation prompt."""
+        plan = self.template_plan()
+        nodes = [
+            {k: v for k, v in node.items() if k not in _LAYOUT_KEYS}
+            for node in plan.get("nodes", [])
+        ]
+        compact = {"links": plan.get("links", []), "nodes": nodes}
+        topology = " ; ".join(f"{a}:{a_s} -> {b}:{b_s}" for a, a_s, b, b_s in self.links)
+        return (
+            f"### Example `{self.name}`\n"
+            f"Topology: {topology}\n"
+            f"```json\n{json.dumps(compact, ensure_ascii=False, separators=(',', ':'))}\n```"
+        )
+
+
+class ExampleIndex:
+    """Small TF-IDF style ranker over example names and their node lists."""
+
+    def __init__(self, examples: List[Example]):
+        self.examples = examples
+        self._docs = [ex.index_tokens() for ex in examples]
+        df: Dict[str, int] = {}
+        for toks in self._docs:
+            for t in set(toks):
+                df[t] = df.get(t, 0) + 1
+        n = max(len(examples), 1)
+        self._idf = {t: math.log(1 + n / c) for t, c in df.items()}
+
+    def search(self, question: str, k: int = 2, min_score: float = 1.0) -> List[Tuple[float, Example]]:
+        q = set(_tokens(question))
+        lowered = question.lower()
+        scored = []
+        for ex, toks in zip(self.examples, self._docs):
+            score = sum(self._idf[t] * min(toks.count(t), 2) for t in q if t in self._idf)
+            # "like example cone" / "像 cubeflow_contours 那样": explicit reference wins
+            if ex.name.lower() in lowered:
+                score += 10.0
+            if score >= min_score:
+                scored.append((score, ex))
+        scored.sort(key=lambda s: -s[0])
+        return scored[:k]
+
+
+_CACHE: Dict[Tuple[str, str], Tuple[float, ExampleIndex]] = {}
+
+
+def _dir_mtime(path: str) -> float:
+    if not path or not os.path.isdir(path):
+        return 0.0
+    return max([os.path.getmtime(path)] + [e.stat().st_mtime for e in os.scandir(path)])
+
+
+def load_examples(examples_dir: Optional[str] = None, json_dir: Optional[str] = None) -> ExampleIndex:
+    """Load (and memoize per directory mtime) the example index."""
+    examples_dir = os.path.expanduser(examples_dir or DEFAULT_EXAMPLES_DIR)
+    json_dir = os.path.expanduser(json_dir or DEFAULT_EXAMPLES_JSON_DIR)
+    key = (examples_dir, json_dir)
+    stamp = max(_dir_mtime(examples_dir), _dir_mtime(json_dir))
+    cached = _CACHE.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    examples = []
+    for name in sorted(os.listdir(examples_dir)):
+        if not name.endswith((".md", ".txt")):
+            continue
+        with open(os.path.join(examples_dir, name), "r", encoding="utf-8") as f:
+            ex = Example.from_markdown(f.read())
+        ex.name = ex.name or os.path.splitext(name)[0]
+        src = os.path.join(json_dir, f"{ex.name}.json") if json_dir else ""
+        if src and os.path.isfile(src):
+            try:
+                with open(src, "r", encoding="utf-8") as f:
+                    ex.source_json = json.load(f)
+            except Exception as e:
+                print(f"[examples] Ignoring unreadable {src}: {e}")
+        examples.append(ex)
+    index = ExampleIndex(examples)
+    _CACHE[key] = (stamp, index)
+    return index
+
+
+if __name__ == "__main__":
+    import sys
+
+    question = " ".join(sys.argv[1:]) or "stream tracers with tubes like the cubeflow example"
+    for score, ex in load_examples().search(question):
+        print(f"[{score:.2f}] {ex.name}")
+        print(ex.to_prompt()[:600])
+        print()
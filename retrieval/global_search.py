@@ -0,0 +1,311 @@
+"""Global search with a pruned and cached map phase.
+
+``graphrag query --method global`` runs the map prompt over every community
+report on every question, which with a small local model is by far the
+slowest path. This module answers the same question with the same prompts
+(``global_search.map_prompt`` / ``reduce_prompt`` of ``settings.yaml``) but:
+
+* keeps a per-community keyword profile (TF-IDF over title, summary and
+  findings, ``<output>/global/community_profiles.json``) and only maps the
+  communities whose profile matches the question (``max_communities``,
+  ``min_score``; falls back to the highest-rated reports);
+* caches every map output in ``<output>/global/map_cache.sqlite`` keyed by
+  (report, normalized query intent, map prompt, model), so a repeated or
+  rephrased question with the same intent reuses previous map results;
+* always runs the reduce step fresh, with the analyst points packed into
+  ``data_max_tokens`` (``retrieval.context``); each mapped report is cut to
+  ``max_context_tokens``. Both budgets, the prompts and the chat model come
+  from the ``global_search`` section of ``settings.yaml``, as for
+  ``graphrag query --method global``.
+
+The query intent is the sorted set of content terms of the question, so
+"how do I slice data with a plane" and "slice the data with a plane" share
+map results.
+
+Usage::
+
+    python -m retrieval.global_search --root ragtest "What kinds of filters are documented?"
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from retrieval import context as ctx
+from retrieval import llm
+from retrieval import tables as arrow_tables
+
+
+GLOBAL_DIR = "global"
+PROFILE_NAME = "community_profiles.json"
+MAP_CACHE_NAME = "map_cache.sqlite"
+_PROFILE_TERMS = 64
+
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "as", "by", "is", "are", "be",
+    "it", "its", "this", "that", "these", "those", "from", "at", "into", "can", "could", "should", "would",
+    "how", "what", "which", "who", "why", "when", "where", "do", "does", "did", "i", "we", "you", "me",
+    "my", "our", "your", "please", "about", "there", "their", "all", "any", "some", "use", "using", "used",
+}
+
+
+def terms(text: str) -> List[str]:
+    """Content terms: lowercase words without stopwords/plurals, CJK as character bigrams."""
+    out = []
+    for w in re.findall(r"[a-z0-9]+", text.lower()):
+        if len(w) < 2 or w in _STOPWORDS:
+            continue
+        if len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        out.append(w)
+    for run in re.findall(r"[一-鿿]+", text):
+        out.extend(run[i:i + 2] for i in range(max(len(run) - 1, 1)))
+    return out
+
+
+def intent_key(question: str) -> str:
+    return " ".join(sorted(set(terms(question))))
+
+
+@dataclass
+class CommunityProfile:
+    id: str
+    ref: str
+    title: str
+    rating: float
+    weights: Dict[str, float] = field(default_factory=dict)
+
+
+def _global_dir(output_dir: str) -> str:
+    return os.path.join(output_dir, GLOBAL_DIR)
+
+
+def build_profiles(output_dir: str, force: bool = False) -> Optional[str]:
+    """Write the keyword profiles; returns None if they are newer than the reports."""
+    src = os.path.join(output_dir, "community_reports.parquet")
+    path = os.path.join(_global_dir(output_dir), PROFILE_NAME)
+    if not force and os.path.isfile(path) and os.path.isfile(src) and os.path.getmtime(path) >= os.path.getmtime(src):
+        return None
+    reports = arrow_tables.load(output_dir)["community_reports"]
+    rows = reports.select([c for c in ("id", "human_readable_id", "title", "summary", "findings", "rank")
+                           if c in reports.column_names]).to_pylist()
+    docs = []
+    for r in rows:
+        findings = " ".join(f"{f.get('summary', '')} {f.get('explanation', '')}" for f in r.get("findings") or [])
+        docs.append(Counter(terms(f"{r.get('title', '')} {r.get('title', '')} {r.get('summary', '')} {findings}")))
+    df = Counter(t for d in docs for t in d)
+    idf = {t: math.log(1 + len(docs) / c) for t, c in df.items()}
+    profiles = []
+    for r, tf in zip(rows, docs):
+        w = {t: (1 + math.log(c)) * idf[t] for t, c in tf.items()}
+        top = dict(sorted(w.items(), key=lambda kv: -kv[1])[:_PROFILE_TERMS])
+        norm = math.sqrt(sum(v * v for v in top.values())) or 1.0
+        profiles.append(CommunityProfile(
+            id=str(r["id"]), ref=str(r.get("human_readable_id", r["id"])), title=r.get("title") or "",
+            rating=float(r.get("rank") or 0.0), weights={t: round(v / norm, 5) for t, v in top.items()},
+        ))
+    os.makedirs(_global_dir(output_dir), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"idf": idf, "profiles": [asdict(p) for p in profiles]}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+class MapCache:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS map_results ("
+            " key TEXT PRIMARY KEY, report_id TEXT, intent TEXT, points TEXT, created REAL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def key(report_id: str, intent: str, prompt_hash: str, model: str) -> str:
+        return hashlib.sha256("\x00".join((report_id, intent, prompt_hash, model)).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        with self._lock:
+            row = self._db.execute("SELECT points FROM map_results WHERE key=?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, report_id: str, intent: str, points: List[dict]) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO map_results VALUES (?, ?, ?, ?, ?)",
+                             (key, report_id, intent, json.dumps(points, ensure_ascii=False), time.time()))
+            self._db.commit()
+
+
+def _parse_points(text: str) -> List[dict]:
+    match = re.search(r"\{.*\}", text, re.S)
+    try:
+        points = json.loads(match.group(0) if match else text).get("points") or []
+    except (ValueError, AttributeError):
+        return [{"description": text.strip(), "score": 50}] if text.strip() else []
+    out = []
+    for p in points:
+        try:
+            out.append({"description": str(p["description"]), "score": int(p.get("score", 0))})
+        except (KeyError, TypeError, ValueError):
+            continue
+    return out
+
+
+class GlobalSearch:
+    def __init__(
+        self,
+        output_dir: str,
+        root: str = "ragtest",
+        max_communities: int = 8,
+        min_score: float = 0.05,
+        fallback: int = 3,
+        concurrency: int = 4,
+        max_length: int = 500,
+        response_type: str = "multiple paragraphs",
+        max_context_tokens: Optional[int] = None,
+        data_max_tokens: Optional[int] = None,
+    ):
+        self.output_dir = os.path.abspath(output_dir)
+        conf = llm.load_settings(root).get("global_search") or {}
+        self.settings = llm.load_model_settings(root, conf.get("chat_model_id") or "default_chat_model")
+        self.max_communities = max_communities
+        self.min_score = min_score
+        self.fallback = fallback
+        self.concurrency = concurrency
+        self.max_length = max_length
+        self.response_type = response_type
+        # Same budgets as `graphrag query --method global` (GraphRAG's defaults when unset)
+        self.max_context_tokens = int(max_context_tokens or conf.get("max_context_tokens") or 12000)
+        self.data_max_tokens = int(data_max_tokens or conf.get("data_max_tokens") or 12000)
+        map_prompt = conf.get("map_prompt") or "prompts/global_search_map_system_prompt.txt"
+        reduce_prompt = conf.get("reduce_prompt") or "prompts/global_search_reduce_system_prompt.txt"
+        with open(os.path.join(root, map_prompt), "r", encoding="utf-8") as f:
+            self.map_prompt = f.read()
+        with open(os.path.join(root, reduce_prompt), "r", encoding="utf-8") as f:
+            self.reduce_prompt = f.read()
+        # Map outputs depend on how much of each report was shown, so the budget is part of the key
+        self.prompt_hash = hashlib.sha256(
+            f"{self.map_prompt}\x00{self.max_context_tokens}".encode("utf-8")).hexdigest()[:16]
+        build_profiles(self.output_dir)
+        with open(os.path.join(_global_dir(self.output_dir), PROFILE_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.idf: Dict[str, float] = data["idf"]
+        self.profiles = [CommunityProfile(**p) for p in data["profiles"]]
+        self.cache = MapCache(os.path.join(_global_dir(self.output_dir), MAP_CACHE_NAME))
+        self._reports: Optional[Dict[str, dict]] = None
+
+    def reports(self) -> Dict[str, dict]:
+        if self._reports is None:
+            table = arrow_tables.load(self.output_dir)["community_reports"]
+            self._reports = {str(r["id"]): r for r in table.select(["id", "title", "full_content"]).to_pylist()}
+        return self._reports
+
+    def prune(self, question: str) -> List[Tuple[float, CommunityProfile]]:
+        tf = Counter(t for t in terms(question) if t in self.idf)
+        q = {t: (1 + math.log(c)) * self.idf[t] for t, c in tf.items()}
+        norm = math.sqrt(sum(v * v for v in q.values())) or 1.0
+        scored = [(sum(w * p.weights.get(t, 0.0) for t, w in q.items()) / norm, p) for p in self.profiles]
+        kept = sorted((s for s in scored if s[0] >= self.min_score), key=lambda s: (-s[0], -s[1].rating))
+        if not kept:
+            kept = sorted(scored, key=lambda s: -s[1].rating)[: self.fallback]
+        return kept[: self.max_communities]
+
+    def _map(self, question: str, profile: CommunityProfile) -> List[dict]:
+        report = self.reports().get(profile.id, {})
+        content = ctx.truncate(report.get("full_content") or "", self.max_context_tokens, self.settings.encoding_model)
+        context = f"-----Reports-----\nid|title|content\n{profile.ref}|{profile.title}|{content}"
+        system = self.map_prompt.format(context_data=context, max_length=1000)
+        answer = llm.chat(self.settings, [{"role": "system", "content": system},
+                                          {"role": "user", "content": question}], json_mode=True)
+        return _parse_points(answer)
+
+    def search(self, question: str) -> dict:
+        t0 = time.time()
+        intent = intent_key(question)
+        selected = self.prune(question)
+        points: Dict[str, List[dict]] = {}
+        todo = []
+        for _, profile in selected:
+            key = MapCache.key(profile.id, intent, self.prompt_hash, self.settings.model)
+            cached = self.cache.get(key)
+            if cached is None:
+                todo.append((key, profile))
+            else:
+                points[profile.id] = cached
+        if todo:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                results = pool.map(lambda kp: self._map(question, kp[1]), todo)
+                for (key, profile), result in zip(todo, results):
+                    self.cache.put(key, profile.id, intent, result)
+                    points[profile.id] = result
+        map_seconds = time.time() - t0
+
+        ranked = [ctx.ContextUnit(f"Importance Score: {p['score']}\n{p['description']}", p["score"])
+                  for ps in points.values() for p in ps if p["score"] > 0]
+        packed = ctx.pack(ranked, self.data_max_tokens, self.settings.encoding_model)
+        if not packed.units:
+            answer = "I am sorry but I am unable to answer this question given the provided data."
+        else:
+            report_data = "\n\n".join(f"----Analyst {i + 1}----\n{u.text}" for i, u in enumerate(packed.units))
+            system = self.reduce_prompt.format(report_data=report_data, response_type=self.response_type,
+                                               max_length=self.max_length)
+            answer = llm.chat(self.settings, [{"role": "system", "content": system},
+                                              {"role": "user", "content": question}], temperature=0.0)
+        return {
+            "answer": answer,
+            "intent": intent,
+            "communities": [{"id": p.ref, "title": p.title, "score": round(s, 4)} for s, p in selected],
+            "total_communities": len(self.profiles),
+            "map_cache_hits": len(selected) - len(todo),
+            "map_calls": len(todo),
+            "map_seconds": round(map_seconds, 3),
+            "reduce_context": packed.report(),
+            "seconds": round(time.time() - t0, 3),
+        }
+
+
+_SEARCHERS: Dict[str, GlobalSearch] = {}
+
+
+def load(output_dir: str, root: str = "ragtest") -> GlobalSearch:
+    """Shared :class:`GlobalSearch` for ``output_dir`` (profiles rebuilt when the reports change)."""
+    output_dir = os.path.abspath(output_dir)
+    arrow_tables.evict_missing(_SEARCHERS)
+    if build_profiles(output_dir) is not None or output_dir not in _SEARCHERS:
+        _SEARCHERS[output_dir] = GlobalSearch(output_dir, root)
+    return _SEARCHERS[output_dir]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Global search with pruned, cached map phase")
+    parser.add_argument("question")
+    parser.add_argument("--root", default="ragtest", help="GraphRAG project root")
+    parser.add_argument("--output-dir", default=None, help="Index output directory (default: current snapshot)")
+    parser.add_argument("--max-communities", type=int, default=8)
+    parser.add_argument("--min-score", type=float, default=0.05)
+    args = parser.parse_args(argv)
+    root = os.path.abspath(args.root)
+    output_dir = args.output_dir or arrow_tables.default_output_dir(root)
+    searcher = GlobalSearch(output_dir, root, max_communities=args.max_communities, min_score=args.min_score)
+    result = searcher.search(args.question)
+    print(result.pop("answer"))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,232 @@
+"""Compressed-sparse-row adjacency over ``entities`` / ``relationships``.
+
+Local search expands from matched entities to their relationships and text
+units by filtering the whole relationships frame once per hop (O(E)). This
+module precomputes, next to the index in ``<output>/graph/``:
+
+* ``indptr.npy`` / ``indices.npy`` (int32): undirected entity adjacency, each
+  row sorted by relationship rank (``combined_degree``) so top-k is a slice;
+* ``weight.npy`` / ``rank.npy`` (float32) and ``edge.npy`` (int32, row of the
+  relationship in ``relationships``) aligned with ``indices``;
+* ``unit_indptr.npy`` / ``unit_indices.npy`` (int32): entity -> text unit rows;
+* ``nodes.json``: entity titles (the relationship endpoints) in id order.
+
+Arrays are loaded with ``mmap_mode="r"`` so worker processes share them like
+the Arrow tables. Neighbourhood queries are O(degree); :meth:`CSRGraph.expand`
+does k-hop expansion with a node budget.
+
+Requires ``numpy`` and ``pyarrow`` (both come with graphrag).
+
+Usage::
+
+    python -m retrieval.graph_index build --root ragtest
+    python -m retrieval.graph_index bench --root ragtest
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from retrieval import tables as arrow_tables
+
+
+GRAPH_DIR = "graph"
+_ARRAYS = ("indptr", "indices", "weight", "rank", "edge", "unit_indptr", "unit_indices")
+
+
+def graph_dir(output_dir: str) -> str:
+    return os.path.join(output_dir, GRAPH_DIR)
+
+
+def _csr(rows, cols, n: int, order=None):
+    """CSR (indptr, permutation) of (rows, cols) pairs, rows stable-sorted by ``order`` descending."""
+    import numpy as np
+
+    perm = np.lexsort((-order, rows)) if order is not None else np.argsort(rows, kind="stable")
+    counts = np.bincount(rows, minlength=n)
+    indptr = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, perm
+
+
+def build(output_dir: str, force: bool = False) -> Optional[str]:
+    """Write ``<output>/graph``; returns None if it is already newer than the tables."""
+    import numpy as np
+
+    out = graph_dir(output_dir)
+    src = os.path.join(output_dir, "relationships.parquet")
+    marker = os.path.join(out, "nodes.json")
+    if not force and os.path.isfile(marker) and os.path.isfile(src) and os.path.getmtime(marker) >= os.path.getmtime(src):
+        return None
+
+    tset = arrow_tables.load(output_dir)
+    entities = tset["entities"]
+    rels = tset["relationships"]
+    titles = entities["title"].to_pylist()
+    node_of: Dict[str, int] = {t: i for i, t in enumerate(titles)}
+    for t in rels["source"].to_pylist() + rels["target"].to_pylist():
+        if t not in node_of:
+            node_of[t] = len(titles)
+            titles.append(t)
+    n = len(titles)
+
+    src_ids = np.array([node_of[t] for t in rels["source"].to_pylist()], dtype=np.int32)
+    dst_ids = np.array([node_of[t] for t in rels["target"].to_pylist()], dtype=np.int32)
+    weight = np.asarray(rels["weight"].to_numpy(zero_copy_only=False), dtype=np.float32)
+    if "combined_degree" in rels.column_names:
+        rank = np.asarray(rels["combined_degree"].to_numpy(zero_copy_only=False), dtype=np.float32)
+    else:
+        rank = weight
+    edge = np.arange(rels.num_rows, dtype=np.int32)
+
+    # Undirected: each relationship appears in both endpoint rows
+    rows = np.concatenate([src_ids, dst_ids])
+    cols = np.concatenate([dst_ids, src_ids])
+    ranks = np.concatenate([rank, rank])
+    indptr, perm = _csr(rows, cols, n, ranks)
+    arrays = {
+        "indptr": indptr,
+        "indices": cols[perm].astype(np.int32),
+        "weight": np.concatenate([weight, weight])[perm],
+        "rank": ranks[perm],
+        "edge": np.concatenate([edge, edge])[perm],
+    }
+
+    unit_row = {u: i for i, u in enumerate(tset["text_units"]["id"].to_pylist())}
+    pairs: List[Tuple[int, int]] = []
+    for ent, unit_ids in enumerate(entities["text_unit_ids"].to_pylist()):
+        pairs.extend((ent, unit_row[u]) for u in unit_ids or [] if u in unit_row)
+    u_rows = np.array([p[0] for p in pairs], dtype=np.int32)
+    u_cols = np.array([p[1] for p in pairs], dtype=np.int32)
+    unit_indptr, unit_perm = _csr(u_rows, u_cols, n)
+    arrays["unit_indptr"] = unit_indptr
+    arrays["unit_indices"] = u_cols[unit_perm]
+
+    tmp = f"{out}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), arr)
+    with open(os.path.join(tmp, "nodes.json"), "w", encoding="utf-8") as f:
+        json.dump(titles, f, ensure_ascii=False)
+    if os.path.isdir(out):
+        old = f"{out}.{os.getpid()}.old"
+        os.rename(out, old)
+        os.rename(tmp, out)
+        for name in os.listdir(old):
+            os.remove(os.path.join(old, name))
+        os.rmdir(old)
+    else:
+        os.rename(tmp, out)
+    return out
+
+
+class CSRGraph:
+    def __init__(self, path: str):
+        import numpy as np
+
+        self.path = path
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        with open(os.path.join(path, "nodes.json"), "r", encoding="utf-8") as f:
+            self.titles: List[str] = json.load(f)
+        self._ids = {t: i for i, t in enumerate(self.titles)}
+        self._upper = {t.upper(): i for i, t in enumerate(self.titles)}
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def node_id(self, title: str) -> Optional[int]:
+        found = self._ids.get(title)
+        return found if found is not None else self._upper.get(title.upper())
+
+    def degree(self, node: int) -> int:
+        return int(self.indptr[node + 1] - self.indptr[node])
+
+    def neighbors(self, node: int, k: Optional[int] = None):
+        """(neighbour ids, weights, ranks, relationship rows), highest rank first."""
+        lo, hi = int(self.indptr[node]), int(self.indptr[node + 1])
+        if k is not None:
+            hi = min(hi, lo + k)
+        return self.indices[lo:hi], self.weight[lo:hi], self.rank[lo:hi], self.edge[lo:hi]
+
+    def text_units(self, nodes: Iterable[int]):
+        import numpy as np
+
+        parts = [self.unit_indices[self.unit_indptr[n]:self.unit_indptr[n + 1]] for n in nodes]
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int32)
+
+    def expand(self, seeds: Iterable[int], hops: int = 1, per_node: Optional[int] = None,
+               max_nodes: int = 200) -> Dict[int, int]:
+        """k-hop neighbourhood: node id -> hop distance, visiting top ``per_node`` edges per node."""
+        seen = {int(s): 0 for s in seeds}
+        frontier = list(seen)
+        for hop in range(1, hops + 1):
+            nxt = []
+            for node in frontier:
+                for nb in self.neighbors(node, per_node)[0]:
+                    nb = int(nb)
+                    if nb not in seen:
+                        seen[nb] = hop
+                        nxt.append(nb)
+                        if len(seen) >= max_nodes:
+                            return seen
+            frontier = nxt
+        return seen
+
+
+_GRAPHS: Dict[str, CSRGraph] = {}
+
+
+def load(output_dir: str) -> CSRGraph:
+    """Shared :class:`CSRGraph` for ``output_dir``, building it first if missing or stale."""
+    output_dir = os.path.abspath(output_dir)
+    arrow_tables.evict_missing(_GRAPHS)
+    if build(output_dir) is not None or output_dir not in _GRAPHS:
+        _GRAPHS[output_dir] = CSRGraph(graph_dir(output_dir))
+    return _GRAPHS[output_dir]
+
+
+def bench(output_dir: str, queries: int = 200) -> dict:
+    """Per-hop neighbour lookup: CSR slice versus a full relationships filter."""
+    import pyarrow.compute as pc
+
+    graph = load(output_dir)
+    rels = arrow_tables.load(output_dir)["relationships"]
+    nodes = [i for i in range(len(graph)) if graph.degree(i)] or [0]
+    nodes = (nodes * (queries // len(nodes) + 1))[:queries]
+
+    t0 = time.perf_counter()
+    for n in nodes:
+        graph.neighbors(n)
+    csr = (time.perf_counter() - t0) / len(nodes) * 1e6
+
+    t0 = time.perf_counter()
+    for n in nodes:
+        title = graph.titles[n]
+        rels.filter(pc.or_(pc.equal(rels["source"], title), pc.equal(rels["target"], title)))
+    scan = (time.perf_counter() - t0) / len(nodes) * 1e6
+    return {"nodes": len(graph), "edges": rels.num_rows, "csr_us": round(csr, 2), "scan_us": round(scan, 2),
+            "speedup": round(scan / csr, 1) if csr else None}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or benchmark the CSR entity graph")
+    parser.add_argument("command", choices=["build", "bench"])
+    parser.add_argument("--root", default="ragtest", help="GraphRAG project root")
+    parser.add_argument("--output-dir", default=None, help="Index output directory (default: current snapshot)")
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args(argv)
+    output_dir = args.output_dir or arrow_tables.default_output_dir(os.path.abspath(args.root))
+
+    if args.command == "build":
+        path = build(output_dir, force=args.force)
+        print(f"built {path}" if path else "graph index up to date")
+    else:
+        print(json.dumps(bench(output_dir), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+"""Minimal OpenAI-compatible chat client configured from ``ragtest/settings.yaml``.
+
+Query-side helpers that call the chat model themselves (rather than through
+the ``graphrag`` CLI) use the same endpoint, model and key as GraphRAG:
+``models.<id>`` of ``settings.yaml``, with ``${VAR}`` expanded from the
+environment and ``<root>/.env``. Only the standard library is needed; YAML is
+read with ``pyyaml`` when available (it comes with graphrag).
+"""
+
+import json
+import os
+import re
+import urllib.request
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class ModelSettings:
+    api_base: str = "http://localhost:11434/v1"
+    model: str = "llama3"
+    api_key: str = ""
+    encoding_model: str = "cl100k_base"
+    request_timeout: float = 600.0
+
+
+def _read_env(root: str) -> Dict[str, str]:
+    env = {}
+    path = os.path.join(root, ".env")
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and not key.startswith("#"):
+                    env[key.strip()] = value.strip().strip('"').strip("'")
+    return env
+
+
+def load_settings(root: str = "ragtest") -> dict:
+    """``settings.yaml`` with ``${VAR}`` expanded; empty when the file or pyyaml is missing."""
+    path = os.path.join(root, "settings.yaml")
+    try:
+        import yaml
+
+        with open(path, "r", encoding="utf-8") as f:
+            raw = f.read()
+    except (ImportError, OSError):
+        return {}
+    env = {**_read_env(root), **os.environ}
+    raw = re.sub(r"\$\{(\w+)\}", lambda m: env.get(m.group(1), ""), raw)
+    return yaml.safe_load(raw) or {}
+
+
+def load_model_settings(root: str = "ragtest", model_id: str = "default_chat_model") -> ModelSettings:
+    """Settings of ``models.<model_id>``; defaults when the file or pyyaml is missing."""
+    conf = (load_settings(root).get("models") or {}).get(model_id) or {}
+    defaults = ModelSettings()
+    return ModelSettings(
+        api_base=conf.get("api_base") or defaults.api_base,
+        model=conf.get("model") or defaults.model,
+        api_key=conf.get("api_key") or "",
+        encoding_model=conf.get("encoding_model") or defaults.encoding_model,
+        request_timeout=float(conf.get("request_timeout") or defaults.request_timeout),
+    )
+
+
+def chat(settings: ModelSettings, messages: List[dict], json_mode: bool = False,
+         temperature: float = 0.0, timeout: Optional[float] = None) -> str:
+    """One non-streaming ``/chat/completions`` call; returns the message content."""
+    body = {"model": settings.model, "messages": messages, "temperature": temperature}
+    if json_mode:
+        body["response_format"] = {"type": "json_object"}
+    headers = {"Content-Type": "application/json"}
+    if settings.api_key:
+        headers["Authorization"] = f"Bearer {settings.api_key}"
+    req = urllib.request.Request(
+        f"{settings.api_base.rstrip('/')}/chat/completions",
+        data=json.dumps(body).encode("utf-8"),
+        headers=headers,
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=timeout or settings.request_timeout) as resp:
+        data = json.loads(resp.read())
+    return data["choices"][0]["message"]["content"] or ""
@@ -0,0 +1,164 @@
+"""Memory-mapped Arrow copies of the GraphRAG output tables.
+
+The query side used to decode ``entities.parquet``, ``relationships.parquet``,
+``community_reports.parquet`` and ``text_units.parquet`` into pandas frames in
+every process. :func:`convert` writes each table once as an uncompressed
+Arrow IPC (Feather v2) file under ``<output>/arrow/``; :func:`load` then maps
+those files read-only. Nothing is decoded or copied, so opening is near
+instant, and every worker process shares the same physical pages through the
+page cache (they show up as file-backed RSS, not anonymous memory).
+
+Conversion is skipped for tables whose ``.arrow`` file is newer than the
+parquet, and files are replaced atomically, so it is safe to run from several
+processes or straight after ``indexing.incremental``. A long-running process
+notices an index rewritten in place: :func:`load` keys its cache on the
+parquet files' mtimes and sizes, and reconverts and remaps when they change.
+
+Requires ``pyarrow`` (comes with graphrag).
+
+Usage::
+
+    python -m retrieval.tables --root ragtest [--force]
+"""
+
+import argparse
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+TABLES = ("entities", "relationships", "community_reports", "communities", "text_units")
+ARROW_DIR = "arrow"
+
+
+def default_output_dir(root: str) -> str:
+    from indexing.snapshots import resolve
+
+    return resolve(root) or os.path.join(root, "output")
+
+
+def arrow_path(output_dir: str, name: str) -> str:
+    return os.path.join(output_dir, ARROW_DIR, f"{name}.arrow")
+
+
+def convert(output_dir: str, names: Iterable[str] = TABLES, force: bool = False) -> Dict[str, str]:
+    """Write ``<output>/arrow/<name>.arrow`` for each parquet table; returns the action per table."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.join(output_dir, ARROW_DIR), exist_ok=True)
+    actions = {}
+    for name in names:
+        src = os.path.join(output_dir, f"{name}.parquet")
+        dst = arrow_path(output_dir, name)
+        if not os.path.isfile(src):
+            actions[name] = "missing"
+            continue
+        if not force and os.path.isfile(dst) and os.path.getmtime(dst) >= os.path.getmtime(src):
+            actions[name] = "up to date"
+            continue
+        table = pq.read_table(src)
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        # Uncompressed so the mapped buffers are used as-is
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=64 * 1024)
+        os.replace(tmp, dst)
+        actions[name] = f"converted ({table.num_rows} rows)"
+    return actions
+
+
+def open_table(path: str):
+    """Zero-copy ``pyarrow.Table`` backed by a read-only memory map of ``path``."""
+    import pyarrow as pa
+
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+class TableSet:
+    """The mapped tables of one output directory, opened lazily by name."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self._tables: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tables or os.path.isfile(arrow_path(self.output_dir, name))
+
+    def __getitem__(self, name: str):
+        with self._lock:
+            if name not in self._tables:
+                # No-op unless the .arrow file is missing or older than the parquet
+                convert(self.output_dir, [name])
+                self._tables[name] = open_table(arrow_path(self.output_dir, name))
+            return self._tables[name]
+
+    def rows(self) -> Dict[str, int]:
+        return {name: self[name].num_rows for name in TABLES if name in self}
+
+
+def parquet_signature(output_dir: str) -> tuple:
+    """``(mtime_ns, size)`` of every parquet table; changes when the index is rewritten."""
+    signature = []
+    for name in TABLES:
+        try:
+            st = os.stat(os.path.join(output_dir, f"{name}.parquet"))
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def evict_missing(cache: dict) -> None:
+    """Drop the entries of output directories that no longer exist (collected snapshots)."""
+    for key in [k for k in cache if not os.path.isdir(k)]:
+        del cache[key]
+
+
+_SETS: Dict[str, Tuple[tuple, TableSet]] = {}
+_SETS_LOCK = threading.Lock()
+
+
+def load(output_dir: str, convert_missing: bool = True) -> TableSet:
+    """Shared :class:`TableSet` for ``output_dir``, reconverted and remapped when its parquet files change."""
+    output_dir = os.path.abspath(output_dir)
+    signature = parquet_signature(output_dir)
+    with _SETS_LOCK:
+        evict_missing(_SETS)
+        cached = _SETS.get(output_dir)
+        if cached is None or cached[0] != signature:
+            if convert_missing:
+                convert(output_dir)
+            _SETS[output_dir] = (signature, TableSet(output_dir))
+        return _SETS[output_dir][1]
+
+
+def memory_usage() -> Dict[str, int]:
+    """RSS split into anonymous and file-backed (shared page cache) kB, from /proc."""
+    out = {}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "RssFile", "RssShmem"):
+                    out[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert GraphRAG parquet outputs to memory-mappable Arrow files")
+    parser.add_argument("--root", default="ragtest", help="GraphRAG project root")
+    parser.add_argument("--output-dir", default=None, help="Index output directory (default: current snapshot)")
+    parser.add_argument("--force", action="store_true", help="Rewrite even if up to date")
+    args = parser.parse_args(argv)
+    output_dir = args.output_dir or default_output_dir(os.path.abspath(args.root))
+    for name, action in convert(output_dir, force=args.force).items():
+        print(f"{name}: {action}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,223 @@
+"""Long-running query worker over the memory-mapped GraphRAG tables.
+
+One parent process converts the current snapshot's parquet tables to Arrow
+(``retrieval.tables``), binds the HTTP port and forks ``--workers`` children
+that all accept on the same socket. Each child maps the Arrow files lazily on
+first use, so the children share a single physical copy of the tables through
+the page cache and their anonymous RSS does not grow with the corpus.
+
+The current snapshot (``indexing.snapshots``) is resolved per request; when a
+new one is published the next request maps its tables. Mappings of a
+collected snapshot stay valid until they are dropped, since unlinked files
+remain readable while mapped.
+
+Endpoints (GET, JSON)::
+
+    /health                       snapshot directory and row counts
+    /stats                        RSS split into anonymous / file-backed kB
+    /entities?q=<text>&k=10       entities whose title contains q, by degree
+    /text_units?id=<id>&id=...    text units by id
+    /neighbors?entity=<title>&k=  top-k related entities by relationship rank
+    /expand?entity=<title>&hops=2 k-hop neighbourhood plus its text unit ids
+    /global?q=<question>          global search, pruned + cached map phase
+    /vector?q=<text>&k=10&table=  nearest rows of a LanceDB embedding table, using
+                                  the ANN settings tuned by ``indexing.ann bench``
+
+Usage::
+
+    python -m retrieval.worker --root ragtest --port 8765 --workers 4
+"""
+
+import argparse
+import json
+import os
+import signal
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from retrieval import embedding_cache, global_search, graph_index, llm
+from retrieval import tables as arrow_tables
+
+
+DEFAULT_URL = os.environ.get("BVTK_WORKER_URL", "http://127.0.0.1:8765")
+DEFAULT_VECTOR_TABLE = "default-text_unit-text"
+
+
+class QueryWorker:
+    def __init__(self, root: str, output_dir: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.fixed_output_dir = output_dir
+        self.routes: Dict[str, Callable[[Dict[str, List[str]]], object]] = {
+            "/health": self.health,
+            "/stats": self.stats,
+            "/entities": self.entities,
+            "/text_units": self.text_units,
+            "/neighbors": self.neighbors,
+            "/expand": self.expand,
+            "/global": self.global_search,
+            "/vector": self.vector,
+        }
+        self._embedder = None
+
+    def output_dir(self) -> str:
+        return self.fixed_output_dir or arrow_tables.default_output_dir(self.root)
+
+    def tables(self) -> arrow_tables.TableSet:
+        return arrow_tables.load(self.output_dir())
+
+    def health(self, params) -> dict:
+        return {"pid": os.getpid(), "output_dir": self.output_dir(), "rows": self.tables().rows()}
+
+    def stats(self, params) -> dict:
+        return {"pid": os.getpid(), "memory_kb": arrow_tables.memory_usage()}
+
+    def entities(self, params) -> List[dict]:
+        import pyarrow.compute as pc
+
+        table = self.tables()["entities"]
+        q = (params.get("q") or [""])[0].strip().lower()
+        k = int((params.get("k") or ["10"])[0])
+        if q:
+            table = table.filter(pc.match_substring(pc.utf8_lower(table["title"]), q))
+        if "degree" in table.column_names:
+            table = table.sort_by([("degree", "descending")])
+        return table.slice(0, k).select(
+            [c for c in ("id", "title", "type", "description", "degree") if c in table.column_names]
+        ).to_pylist()
+
+    def text_units(self, params) -> List[dict]:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        ids = params.get("id") or []
+        table = self.tables()["text_units"]
+        hits = table.filter(pc.is_in(table["id"], value_set=pa.array(ids, type=table.schema.field("id").type)))
+        return hits.select([c for c in ("id", "text", "n_tokens") if c in hits.column_names]).to_pylist()
+
+    def _seeds(self, graph, params) -> List[int]:
+        seeds = [graph.node_id(t) for t in params.get("entity") or []]
+        return [s for s in seeds if s is not None]
+
+    def neighbors(self, params) -> List[dict]:
+        graph = graph_index.load(self.output_dir())
+        k = int((params.get("k") or ["10"])[0])
+        out = []
+        for seed in self._seeds(graph, params):
+            ids, weights, ranks, _ = graph.neighbors(seed, k)
+            out.extend({"entity": graph.titles[seed], "neighbor": graph.titles[int(n)],
+                        "weight": float(w), "rank": float(r)} for n, w, r in zip(ids, weights, ranks))
+        return out
+
+    def expand(self, params) -> dict:
+        graph = graph_index.load(self.output_dir())
+        hops = int((params.get("hops") or ["1"])[0])
+        per_node = int((params.get("per_node") or ["10"])[0])
+        max_nodes = int((params.get("max_nodes") or ["200"])[0])
+        reached = graph.expand(self._seeds(graph, params), hops, per_node, max_nodes)
+        units = graph.text_units(reached)
+        unit_ids = self.tables()["text_units"]["id"].take(units).to_pylist() if len(units) else []
+        return {"entities": {graph.titles[n]: hop for n, hop in reached.items()}, "text_unit_ids": unit_ids}
+
+    def global_search(self, params) -> dict:
+        question = (params.get("q") or [""])[0]
+        if not question.strip():
+            raise ValueError("missing q")
+        return global_search.load(self.output_dir(), self.root).search(question)
+
+    def embed(self, text: str) -> List[float]:
+        """Query embedding through the persistent cache, with GraphRAG's embedding model."""
+        if self._embedder is None:
+            # Created lazily so every forked child opens its own SQLite connection
+            self._embedder = (embedding_cache.EmbeddingCache(),
+                              llm.load_model_settings(self.root, "default_embedding_model"))
+        cache, settings = self._embedder
+        return cache.embed([text], settings.model, settings.api_base, settings.api_key)[0]
+
+    def vector(self, params) -> List[dict]:
+        from indexing import ann
+
+        q = (params.get("q") or [""])[0]
+        if not q.strip():
+            raise ValueError("missing q")
+        table = (params.get("table") or [DEFAULT_VECTOR_TABLE])[0]
+        k = int((params.get("k") or ["10"])[0])
+        return ann.query(os.path.join(self.output_dir(), "lancedb"), table, self.embed(q), k)
+
+
+def make_handler(worker: QueryWorker):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, data) -> None:
+            payload = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            route = worker.routes.get(url.path.rstrip("/") or "/health")
+            if route is None:
+                return self._send(404, {"error": f"unknown endpoint {url.path}"})
+            try:
+                self._send(200, route(urllib.parse.parse_qs(url.query)))
+            except Exception as e:
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def request(path: str, base_url: str = DEFAULT_URL, timeout: float = 5.0, **params):
+    """Client helper: GET ``path`` on a running worker and decode the JSON answer."""
+    query = urllib.parse.urlencode(params, doseq=True)
+    with urllib.request.urlopen(f"{base_url.rstrip('/')}{path}?{query}", timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+def serve(worker: QueryWorker, host: str, port: int, workers: int = 1) -> None:
+    # Convert once in the parent; children only map the files
+    for name, action in arrow_tables.convert(worker.output_dir()).items():
+        print(f"[worker] {name}: {action}")
+    if graph_index.build(worker.output_dir()):
+        print("[worker] graph CSR index rebuilt")
+    server = ThreadingHTTPServer((host, port), make_handler(worker))
+    print(f"[worker] serving http://{host}:{port} with {workers} process(es)")
+    if workers <= 1:
+        server.serve_forever()
+        return
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query worker over memory-mapped GraphRAG tables")
+    parser.add_argument("--root", default="ragtest", help="GraphRAG project root")
+    parser.add_argument("--output-dir", default=None, help="Pin an output directory instead of the current snapshot")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="Pre-forked processes sharing the mapped tables")
+    args = parser.parse_args(argv)
+    serve(QueryWorker(args.root, args.output_dir), args.host, args.port, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,11 @@
+"""JSON formats exchanged between the Open-WebUI functions and the Blender addon.
+
+``blender_actions``: the actions plan schema and the inbox helpers the pipes
+import (``try_extract_json_from_text``, ``parse_actions_json``,
+``save_validated_actions``).
+``plan_patch``: deltas between two BVTK node trees; standard library only, so
+the addon can import it inside Blender.
+``bridge``: client for the addon's length-prefixed JSON socket bridge.
+``import_status``: the addon's per-plan import status records and the helpers
+the pipes use to wait on them.
+"""
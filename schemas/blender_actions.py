@@ -0,0 +1,162 @@
+"""Blender actions plan schema and the inbox helpers used by the pipes.
+
+A plan is ``{version, doc?, actions: [...]}`` where every action is one of
+``create_object``, ``add_modifier``, ``set_shade_smooth``, ``create_texture``
+or ``import_file`` (discriminated by ``type``). BVTK node trees
+(``{links, nodes}``) and plan patches (``schemas.plan_patch``) are saved
+through the same :func:`save_validated_actions`, which hands them to the
+addon's socket bridge (``schemas.bridge``) when Blender is listening and
+falls back to the inbox directory otherwise.
+"""
+
+import json
+import os
+import time
+import uuid
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from . import bridge
+
+
+Vec3 = Tuple[float, float, float]
+# Inbox lanes (inbox/<lane>/), drained by the addon in this order, oldest first
+PRIORITIES = ("high", "normal", "bulk")
+
+
+class _Action(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+
+class CreateObject(_Action):
+    type: Literal["create_object"]
+    object_type: Literal["MESH"] = "MESH"
+    primitive: Literal["CUBE", "PLANE", "UV_SPHERE"]
+    name: Optional[str] = None
+    location: Optional[Vec3] = None
+    rotation: Optional[Vec3] = None
+    scale: Optional[Vec3] = None
+
+
+class AddModifier(_Action):
+    type: Literal["add_modifier"]
+    object_name: str = Field(alias="object")
+    modifier: Literal["SUBSURF", "DISPLACE"]
+    levels: Optional[int] = None
+    strength: Optional[float] = None
+    texture: Optional[str] = None
+
+
+class SetShadeSmooth(_Action):
+    type: Literal["set_shade_smooth"]
+    object_name: str = Field(alias="object")
+
+
+class CreateTexture(_Action):
+    type: Literal["create_texture"]
+    name: str
+    kind: Literal["NOISE", "VORONOI"]
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ImportFile(_Action):
+    type: Literal["import_file"]
+    kind: Literal["OBJ", "FBX", "GLTF", "GLB"]
+    path: str
+    into_collection: Optional[str] = None
+
+
+Action = Annotated[
+    Union[CreateObject, AddModifier, SetShadeSmooth, CreateTexture, ImportFile],
+    Field(discriminator="type"),
+]
+
+
+class BlenderActionPlan(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    version: int = 1
+    doc: Optional[str] = None
+    actions: List[Action]
+
+
+def try_extract_json_from_text(text: str) -> Optional[str]:
+    """First JSON object in ``text``: a fenced block if any, else the outermost braces."""
+    for fence in ("```json", "```JSON", "```"):
+        start = text.find(fence)
+        while start != -1:
+            body_start = start + len(fence)
+            end = text.find("```", body_start)
+            if end == -1:
+                break
+            candidate = text[body_start:end].strip()
+            try:
+                json.loads(candidate)
+                return candidate
+            except ValueError:
+                start = text.find(fence, end + 3)
+    try:
+        candidate = text[text.index("{"): text.rindex("}") + 1]
+        json.loads(candidate)
+        return candidate
+    except ValueError:
+        return None
+
+
+def parse_actions_json(json_str: str) -> BlenderActionPlan:
+    """Validate an actions plan; raises ``ValueError`` (pydantic ``ValidationError``) if invalid."""
+    return BlenderActionPlan.model_validate_json(json_str)
+
+
+def _dump(plan: Union[BlenderActionPlan, Dict[str, Any]]) -> Dict[str, Any]:
+    if hasattr(plan, "model_dump"):
+        return plan.model_dump(mode="json", by_alias=True, exclude_none=True)
+    return plan
+
+
+def deliver_plan(
+    plan: Union[BlenderActionPlan, Dict[str, Any]],
+    inbox_dir: str,
+    prefix: str = "task",
+    bridge_addr: Optional[str] = None,
+    priority: str = "normal",
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Send a plan over the socket bridge, else write it to ``inbox_dir/<priority>/``.
+
+    Returns ``(path, ack)``: the processed/failed file and the bridge ack, or
+    the inbox file and ``None`` when Blender was not reachable.
+    ``bridge_addr`` defaults to ``BVTK_BRIDGE_ADDR``; ``""`` disables the bridge.
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    name = f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}.json"
+    data = _dump(plan)
+    try:
+        ack = bridge.deliver(data, name, bridge_addr, priority=priority)
+    except bridge.BridgeUnavailable:
+        pass
+    else:
+        print(f"[blender-bridge] {name}: {ack.get('status')} in {ack.get('roundtrip_ms')} ms")
+        return ack.get("path") or name, ack
+
+    # The file is written under a dot-name and renamed into place, so the
+    # Blender addon never picks up a partially written JSON
+    lane_dir = os.path.join(inbox_dir, priority)
+    os.makedirs(lane_dir, exist_ok=True)
+    path = os.path.join(lane_dir, name)
+    tmp = os.path.join(lane_dir, f".{name}.part")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path, None
+
+
+def save_validated_actions(
+    plan: Union[BlenderActionPlan, Dict[str, Any]],
+    inbox_dir: str,
+    prefix: str = "task",
+    priority: str = "normal",
+) -> str:
+    """Deliver a plan, node tree or patch to Blender; returns the file path."""
+    return deliver_plan(plan, inbox_dir, prefix, priority=priority)[0]
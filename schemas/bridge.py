@@ -0,0 +1,117 @@
+"""Client for the socket bridge served by the Blender autoload addon.
+
+The addon (``docker-version/bvtk-json-autoload.py``) listens on
+``BVTK_BRIDGE_ADDR`` (``host:port`` or ``unix:/path``; default
+``127.0.0.1:8766``) next to its polling inbox. Every message is a 4-byte
+big-endian length followed by a UTF-8 JSON object, in both directions::
+
+    -> {"token": ..., "name": "bvtk-20250101-120000-abc123.json", "plan": {...}, "priority": "high"}
+    <- {"ok": true, "status": "processed", "id": ..., "path": ...,
+        "timings": {"queue_ms": 0.4, "read_ms": 0.1, "import_ms": 35.2, ...}}
+
+The ack is the import status record (``schemas.import_status``). Plans can
+run Python inside Blender, so every frame carries the shared secret
+``BVTK_BRIDGE_TOKEN``; the addon answers ``"status": "rejected"`` to frames
+without it and does not serve the bridge at all when no token is set.
+
+:func:`deliver` returns the ack (plus ``roundtrip_ms``) and raises
+:class:`BridgeUnavailable` only when nothing was imported (no token, not
+listening, rejected), so callers can fall back to the inbox without risking
+a duplicate import.
+
+Standard library only.
+"""
+
+import json
+import os
+import socket
+import struct
+import time
+from typing import Optional, Tuple
+
+
+DEFAULT_ADDR = os.environ.get("BVTK_BRIDGE_ADDR", "127.0.0.1:8766")
+DEFAULT_TOKEN = os.environ.get("BVTK_BRIDGE_TOKEN", "")
+MAX_FRAME = 64 << 20
+
+
+class BridgeUnavailable(OSError):
+    """Blender is not listening; nothing was delivered."""
+
+
+def parse_addr(addr: str) -> Tuple[int, object]:
+    if addr.startswith("unix:"):
+        return socket.AF_UNIX, addr[len("unix:"):]
+    host, _, port = addr.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("bridge closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+
+def write_frame(sock: socket.socket, obj: dict) -> None:
+    data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(data)) + data)
+
+
+def read_frame(sock: socket.socket) -> dict:
+    (size,) = struct.unpack(">I", _recv_exact(sock, 4))
+    if size > MAX_FRAME:
+        raise ValueError(f"frame of {size} bytes exceeds {MAX_FRAME}")
+    return json.loads(_recv_exact(sock, size).decode("utf-8"))
+
+
+def _connect(addr: str, timeout: float, token: str) -> socket.socket:
+    if not addr:
+        raise BridgeUnavailable("bridge disabled")
+    if not token:
+        raise BridgeUnavailable("BVTK_BRIDGE_TOKEN not set")
+    family, address = parse_addr(addr)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(address)
+    except OSError as e:
+        sock.close()
+        raise BridgeUnavailable(f"{addr}: {e}") from e
+    return sock
+
+
+def deliver(plan: dict, name: str, addr: Optional[str] = None, timeout: float = 30.0,
+            connect_timeout: float = 0.25, priority: str = "high", token: Optional[str] = None) -> dict:
+    """Send one plan to Blender and wait for its import ack."""
+    started = time.perf_counter()
+    token = DEFAULT_TOKEN if token is None else token
+    sock = _connect(DEFAULT_ADDR if addr is None else addr, connect_timeout, token)
+    with sock:
+        try:
+            write_frame(sock, {"token": token, "name": name, "plan": plan, "priority": priority})
+        except OSError as e:
+            raise BridgeUnavailable(f"send failed: {e}") from e
+        sock.settimeout(timeout)
+        try:
+            ack = read_frame(sock)
+        except (OSError, ValueError) as e:
+            # Sent but unacknowledged: Blender may still import it
+            ack = {"ok": None, "status": "pending", "name": name, "error": str(e)}
+    if ack.get("status") == "rejected":
+        raise BridgeUnavailable(ack.get("error") or "rejected by the bridge")
+    ack["roundtrip_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return ack
+
+
+def ping(addr: Optional[str] = None, timeout: float = 1.0, token: Optional[str] = None) -> bool:
+    token = DEFAULT_TOKEN if token is None else token
+    try:
+        with _connect(DEFAULT_ADDR if addr is None else addr, timeout, token) as sock:
+            write_frame(sock, {"token": token, "ping": True})
+            return read_frame(sock).get("status") == "pong"
+    except (OSError, ValueError):
+        return False
@@ -0,0 +1,94 @@
+"""Import status records written by the Blender autoload addon.
+
+For every plan it picks up (inbox file or socket bridge) the addon writes
+``bvtk-bridge/status/<plan id>.json``, where the plan id is the file name
+without ``.json``: first with ``"status": "processing"``, then once more with
+the outcome::
+
+    {"id": ..., "status": "processed" | "failed" | "superseded", "ok": true | false,
+     "kind": "node_tree" | "patch" | "actions", "nodes": 3, "links": 2,
+     "timings": {"queue_ms", "read_ms", "import_ms", "update_ms", "total_ms"},
+     "error": ..., "traceback": ..., "path": ...}
+
+Actions plans (``schemas.blender_actions``) report ``"actions"`` (count) and
+``"objects"`` (names) instead of nodes and links. A patch the worker could
+not apply because it does not hold the patch's base plan fails with
+``"needs_full": true``; the sender should then send the full node tree.
+A full node tree followed by another one in the same import batch is not
+imported at all: it is filed as ``"superseded"`` with ``"superseded_by"``.
+
+The pipes wait on it with a bounded timeout (:func:`watch_status`,
+:func:`wait_for_status`) and put :func:`format_status` into the chat.
+
+Standard library only.
+"""
+
+import json
+import os
+import time
+from typing import Iterator, Optional
+
+
+FINAL = ("processed", "failed", "superseded")
+
+
+def status_dir(inbox_dir: str) -> str:
+    """``status/`` next to the inbox."""
+    return os.path.join(os.path.dirname(os.path.normpath(inbox_dir)), "status")
+
+
+def plan_id(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def read_status(inbox_dir: str, pid: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(status_dir(inbox_dir), f"{pid}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def watch_status(inbox_dir: str, pid: str, timeout: float = 10.0, poll: float = 0.1) -> Iterator[dict]:
+    """Yield each new state of a plan's record until it is final or ``timeout`` expires."""
+    deadline = time.monotonic() + timeout
+    last = None
+    while True:
+        record = read_status(inbox_dir, pid)
+        if record is not None and record.get("status") != last:
+            last = record.get("status")
+            yield record
+            if last in FINAL:
+                return
+        if time.monotonic() >= deadline:
+            return
+        time.sleep(poll)
+
+
+def wait_for_status(inbox_dir: str, pid: str, timeout: float = 10.0, poll: float = 0.1) -> Optional[dict]:
+    """Final record, the last intermediate one on timeout, or ``None`` if Blender never saw the plan."""
+    record = None
+    for record in watch_status(inbox_dir, pid, timeout, poll):
+        pass
+    return record
+
+
+def format_status(record: Optional[dict], timeout: float = 10.0) -> str:
+    if record is None:
+        return f"Blender has not picked up the plan after {timeout:g}s (is the autoload addon running?)"
+    timings = record.get("timings") or {}
+    if record.get("status") not in FINAL:
+        return "Blender is importing the plan…"
+    phases = ", ".join(f"{k[:-3]} {v:g} ms" for k, v in timings.items() if k != "total_ms")
+    total = f" in {timings['total_ms']:g} ms" if "total_ms" in timings else ""
+    detail = f" ({phases})" if phases else ""
+    if record.get("status") == "superseded":
+        return f"Blender skipped the plan: a newer node tree ({record.get('superseded_by')}) replaced it in the same batch"
+    if not record.get("ok"):
+        return f"Blender import failed{total}: {record.get('error', 'unknown error')}{detail}"
+    what = f"{record.get('nodes', 0)} nodes, {record.get('links', 0)} links"
+    if record.get("kind") == "actions":
+        what = f"{record.get('actions', 0)} actions → {len(record.get('objects') or [])} objects"
+    elif record.get("kind") == "patch":
+        what = f"patch of {record.get('ops', 0)} ops → {what}"
+    return f"Blender imported {what}{total}{detail}"
@@ -0,0 +1,183 @@
+"""Deltas between two BVTK node trees (``{links, nodes}``).
+
+An iterative edit ("change the contour value", "add a glyph") used to
+regenerate the whole tree and ``bvtk_node_tree_import`` rebuilt every node.
+:func:`diff` turns the previous and the new plan into a small patch::
+
+    {"kind": "bvtk_patch", "version": 1,
+     "base": "<plan_hash(old)>", "target": "<plan_hash(new)>",
+     "ops": [
+       {"op": "remove_link", "link": {...}},
+       {"op": "remove_node", "name": "Glyph"},
+       {"op": "add_node", "node": {"bl_idname": ..., "name": ..., ...}},
+       {"op": "update_node", "name": "Contour", "set": {"m_ContourValues": [0.5]}, "unset": []},
+       {"op": "add_link", "link": {...}}
+     ]}
+
+Ops are ordered so they can be applied one by one (links are removed before
+their nodes, nodes are added before their links). A relink is a
+``remove_link`` plus an ``add_link``. :func:`apply` replays a patch on a plan,
+refusing it when the plan is not the patch's ``base``; :func:`affected_nodes`
+lists the nodes that must be re-executed (changed nodes and everything
+downstream of them).
+
+Standard library only, so the Blender addon can import it.
+"""
+
+import copy
+import hashlib
+import json
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+PATCH_KIND = "bvtk_patch"
+PATCH_VERSION = 1
+OPS = ("remove_link", "remove_node", "add_node", "update_node", "add_link")
+# Editor-only node keys: changing them does not require re-executing VTK
+LAYOUT_KEYS = {"location", "color", "width", "height", "hide", "show_options", "show_preview", "label", "mute"}
+_LINK_FIELDS = ("from_node_name", "from_socket_identifier", "to_node_name", "to_socket_identifier")
+
+
+class PatchError(ValueError):
+    pass
+
+
+def is_node_tree(data) -> bool:
+    return isinstance(data, dict) and isinstance(data.get("nodes"), list) and isinstance(data.get("links"), list)
+
+
+def is_patch(data) -> bool:
+    return isinstance(data, dict) and data.get("kind") == PATCH_KIND
+
+
+def link_key(link: dict) -> Tuple[str, ...]:
+    return tuple(str(link.get(f, "")) for f in _LINK_FIELDS)
+
+
+def plan_hash(plan: dict) -> str:
+    """Order-independent sha256 of a node tree."""
+    canonical = {
+        "nodes": sorted(plan.get("nodes") or [], key=lambda n: str(n.get("name"))),
+        "links": sorted(plan.get("links") or [], key=link_key),
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def diff(old: dict, new: dict) -> dict:
+    """Patch turning node tree ``old`` into ``new``."""
+    old_nodes = {n["name"]: n for n in old.get("nodes") or []}
+    new_nodes = {n["name"]: n for n in new.get("nodes") or []}
+    old_links = {link_key(l): l for l in old.get("links") or []}
+    new_links = {link_key(l): l for l in new.get("links") or []}
+
+    # A node whose type changed is replaced, not updated
+    replaced = {name for name in old_nodes.keys() & new_nodes.keys()
+                if old_nodes[name].get("bl_idname") != new_nodes[name].get("bl_idname")}
+    removed = (old_nodes.keys() - new_nodes.keys()) | replaced
+    added = (new_nodes.keys() - old_nodes.keys()) | replaced
+
+    ops: List[dict] = []
+    for key in sorted(old_links):
+        link = old_links[key]
+        if key not in new_links or link["from_node_name"] in removed or link["to_node_name"] in removed:
+            ops.append({"op": "remove_link", "link": link})
+    ops += [{"op": "remove_node", "name": name} for name in sorted(removed)]
+    ops += [{"op": "add_node", "node": new_nodes[name]} for name in sorted(added)]
+    for name in sorted((old_nodes.keys() & new_nodes.keys()) - replaced):
+        before, after = old_nodes[name], new_nodes[name]
+        changed = {k: v for k, v in after.items() if k != "name" and before.get(k) != v}
+        unset = sorted(k for k in before if k not in after)
+        if changed or unset:
+            ops.append({"op": "update_node", "name": name, "set": changed, "unset": unset})
+    for key in sorted(new_links):
+        link = new_links[key]
+        if key not in old_links or link["from_node_name"] in removed or link["to_node_name"] in removed:
+            ops.append({"op": "add_link", "link": link})
+    return {"kind": PATCH_KIND, "version": PATCH_VERSION, "base": plan_hash(old), "target": plan_hash(new), "ops": ops}
+
+
+def validate_patch(patch: dict) -> None:
+    if not is_patch(patch):
+        raise PatchError(f"not a {PATCH_KIND}")
+    if patch.get("version") != PATCH_VERSION:
+        raise PatchError(f"unsupported patch version {patch.get('version')}")
+    for i, op in enumerate(patch.get("ops") or []):
+        kind = op.get("op")
+        if kind not in OPS:
+            raise PatchError(f"op {i}: unknown op {kind!r}")
+        if kind in ("remove_link", "add_link") and not all(f in op.get("link", {}) for f in _LINK_FIELDS):
+            raise PatchError(f"op {i}: link needs {', '.join(_LINK_FIELDS)}")
+        if kind == "add_node" and not {"bl_idname", "name"} <= set(op.get("node", {})):
+            raise PatchError(f"op {i}: node needs bl_idname and name")
+        if kind in ("remove_node", "update_node") and not op.get("name"):
+            raise PatchError(f"op {i}: missing node name")
+
+
+def apply(plan: dict, patch: dict, check_base: bool = True) -> dict:
+    """New plan with ``patch`` applied; ``plan`` is left untouched."""
+    validate_patch(patch)
+    if check_base and patch.get("base") and plan_hash(plan) != patch["base"]:
+        raise PatchError("patch base does not match the current plan; send the full node tree")
+    result = copy.deepcopy(plan)
+    nodes = {n["name"]: n for n in result.get("nodes") or []}
+    links = {link_key(l): l for l in result.get("links") or []}
+    for op in patch.get("ops") or []:
+        kind = op["op"]
+        if kind == "remove_link":
+            links.pop(link_key(op["link"]), None)
+        elif kind == "remove_node":
+            if nodes.pop(op["name"], None) is None:
+                raise PatchError(f"remove_node: no node {op['name']!r}")
+        elif kind == "add_node":
+            nodes[op["node"]["name"]] = copy.deepcopy(op["node"])
+        elif kind == "update_node":
+            node = nodes.get(op["name"])
+            if node is None:
+                raise PatchError(f"update_node: no node {op['name']!r}")
+            node.update(copy.deepcopy(op.get("set") or {}))
+            for key in op.get("unset") or []:
+                node.pop(key, None)
+        else:
+            link = op["link"]
+            for end in ("from_node_name", "to_node_name"):
+                if link[end] not in nodes:
+                    raise PatchError(f"add_link: no node {link[end]!r}")
+            links[link_key(link)] = copy.deepcopy(link)
+    result["nodes"] = list(nodes.values())
+    result["links"] = list(links.values())
+    return result
+
+
+def downstream(plan: dict, names: Iterable[str]) -> Set[str]:
+    """``names`` plus every node reachable from them along links."""
+    out: Dict[str, List[str]] = {}
+    for link in plan.get("links") or []:
+        out.setdefault(link["from_node_name"], []).append(link["to_node_name"])
+    seen = set(names)
+    stack = list(seen)
+    while stack:
+        for nxt in out.get(stack.pop(), []):
+            if nxt not in seen:
+                seen.add(nxt)
+                stack.append(nxt)
+    return seen
+
+
+def affected_nodes(plan: dict, patch: dict) -> Set[str]:
+    """Nodes of the patched ``plan`` that need re-execution."""
+    touched = set()
+    for op in patch.get("ops") or []:
+        if op["op"] == "add_node":
+            touched.add(op["node"]["name"])
+        elif op["op"] == "update_node" and (set(op.get("set") or {}) | set(op.get("unset") or [])) - LAYOUT_KEYS:
+            touched.add(op["name"])
+        elif op["op"] in ("add_link", "remove_link"):
+            touched.add(op["link"]["to_node_name"])
+    existing = {n["name"] for n in plan.get("nodes") or []}
+    return downstream(plan, touched & existing) & existing
+
+
+def sinks(plan: dict, names: Set[str]) -> List[str]:
+    """Nodes of ``names`` with no outgoing link into ``names`` (updating them pulls the rest)."""
+    feeding = {l["from_node_name"] for l in plan.get("links") or [] if l["to_node_name"] in names}
+    return sorted(names - feeding)